@@ -0,0 +1,80 @@
+"""Accuracy and speed of the BEAM carbon integrators
+
+Runs Dice2010 with BEAM carbon under each integrator setting, and reports
+the largest relative error in M_AT and T_AT against a converged solution
+(the explicit scheme at 20000 substeps, extrapolated with 10000) and
+against the fixed 20-step scheme that has been the default, with loop()
+and finite-difference obj_loop() times.
+
+Usage:
+    python benchmarks/beam_carbon.py [repeat]
+"""
+from __future__ import division, print_function
+import os
+import sys
+import timeit
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from webdice.dice import Dice2010
+from webdice.dice.equations_ne.loop import LoopOpt
+
+SETTINGS = [
+    ('explicit', 10), ('explicit', 20), ('explicit', 40),
+    ('implicit', 1e-3), ('implicit', 1e-4), ('implicit', 1e-5),
+    ('implicit', 1e-6),
+]
+
+
+def dice(integrator, value):
+    d = Dice2010()
+    d.params.carbon_model = 'beam_carbon'
+    d.params.beam_integrator = integrator
+    if integrator == 'explicit':
+        d.params.beam_substeps = value
+    else:
+        d.params.beam_tol = value
+    return d
+
+
+def paths(integrator, value):
+    d = dice(integrator, value)
+    d.loop(scc=False)
+    return np.array([d.vars.mass_atmosphere, d.vars.temp_atmosphere])
+
+
+def error(a, b):
+    return np.max(np.abs(a - b) / np.abs(b), axis=1)
+
+
+def times(integrator, value, repeat):
+    d = dice(integrator, value)
+    loop = min(timeit.repeat(d.loop, number=3, repeat=repeat)) / 3
+    d = dice(integrator, value)
+    d.eq = LoopOpt(d.params)
+    d.eq.set_models(d.params)
+    x0 = d.opt_x0
+    fd = min(timeit.repeat(
+        lambda: d.obj_loop(x0), number=3, repeat=repeat)) / 3
+    return loop, fd
+
+
+def main(repeat=5):
+    warnings.simplefilter('ignore')
+    exact = 2 * paths('explicit', 20000) - paths('explicit', 10000)
+    legacy = paths('explicit', 20)
+    print('{:18s}{:>22s}{:>22s}{:>10s}{:>10s}'.format(
+        '', 'error M_AT / T_AT', 'vs 20 steps', 'loop', 'FD'))
+    for integrator, value in SETTINGS:
+        p = paths(integrator, value)
+        e, l = error(p, exact), error(p, legacy)
+        loop, fd = times(integrator, value, repeat)
+        print('{:18s}{:>11.1e}{:>11.1e}{:>11.1e}{:>11.1e}{:>8.1f}ms'
+              '{:>8.1f}ms'.format(
+                  '{} {:g}'.format(integrator, value), e[0], e[1], l[0],
+                  l[1], loop * 1e3, fd * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,65 @@
+"""Compare two benchmark result files from suite.py
+
+Prints the ratio of median loop() times, head over base, for each case
+in both files. A case counts as slower or faster when its median moved by
+more than the threshold and the two sample ranges do not overlap, which
+keeps noisy cases from flagging. Exits with status 1 if any case got
+slower, so it can gate a CI job.
+
+Usage:
+    python benchmarks/compare.py base.json head.json [-t 0.05]
+"""
+from __future__ import division, print_function
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data, dict(
+        (r['name'], r) for r in data['results'] if 'median' in r)
+
+
+def verdict(base, head, threshold):
+    ratio = head['median'] / base['median']
+    if ratio > 1 + threshold and head['min'] > base['max']:
+        return ratio, 'slower'
+    if ratio < 1 - threshold and head['max'] < base['min']:
+        return ratio, 'faster'
+    return ratio, ''
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('-t', '--threshold', type=float, default=.05,
+                        help='Relative change to report (default 0.05)')
+    args = parser.parse_args(argv)
+    base_data, base = load(args.base)
+    head_data, head = load(args.head)
+    print('base {} ({})'.format(base_data['environment']['commit'],
+                                base_data['environment']['time']))
+    print('head {} ({})'.format(head_data['environment']['commit'],
+                                head_data['environment']['time']))
+    print('{:70s}{:>10s}{:>10s}{:>8s}'.format(
+        '', 'base ms', 'head ms', 'ratio'))
+    counts = dict(slower=0, faster=0)
+    for name in sorted(set(base) & set(head)):
+        ratio, change = verdict(base[name], head[name], args.threshold)
+        if change:
+            counts[change] += 1
+        print('{:70s}{:>10.2f}{:>10.2f}{:>8.2f} {}'.format(
+            name, base[name]['median'] * 1e3, head[name]['median'] * 1e3,
+            ratio, change))
+    only = set(base) ^ set(head)
+    if only:
+        print('{} cases timed in only one file'.format(len(only)))
+    print('{} slower, {} faster'.format(counts['slower'], counts['faster']))
+    return 1 if counts['slower'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
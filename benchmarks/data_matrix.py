@@ -0,0 +1,102 @@
+"""Attribute-access overhead of DiceDataMatrix
+
+Compares the current DiceDataMatrix (name -> row index map, plain ndarray
+row views) with the previous implementation, which bound 34 attributes in
+__new__ and copied them with getattr in __array_finalize__ on every view.
+
+Usage:
+    python benchmarks/data_matrix.py [repeat]
+"""
+from __future__ import division, print_function
+import os
+import sys
+import timeit
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import webdice.dice
+import webdice.dice.params
+from webdice.dice import Dice2010
+from webdice.dice.params import DiceDataMatrix
+from webdice.dice.equations_ne.loop import LoopOpt
+
+
+class LegacyDataMatrix(np.ndarray):
+    """The previous DiceDataMatrix, for comparison."""
+    names = DiceDataMatrix.names
+
+    def __new__(cls, input_array):
+        obj = np.asarray(input_array).view(cls)
+        for row, name in enumerate(cls.names):
+            setattr(obj, name, input_array[row])
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None: return
+        for name in self.names:
+            setattr(self, name, getattr(obj, name, None))
+
+    def tile(self, n, dtype=None):
+        return LegacyDataMatrix(
+            np.repeat(np.asarray(self)[..., np.newaxis], n, axis=-1))
+
+
+def micro(cls, repeat):
+    """Seconds per call for the row accesses used inside step()."""
+    one = cls(np.zeros((34, 60)))
+    # Built like the matrix in Dice.obj_loop
+    fd = cls(np.tile(one, (61, 1, 1)).transpose(1, 2, 0))
+    cases = [
+        ('df.miu[i]', lambda: one.miu[7]),
+        ('df.miu[i] (61 cols)', lambda: fd.miu[7]),
+        ('df.miu[i, :] (61 cols)', lambda: fd.miu[7, :]),
+        ('df.utility_discounted[:, :60]',
+         lambda: fd.utility_discounted[:, :60]),
+    ]
+    return [
+        (label, min(timeit.repeat(f, number=10000, repeat=repeat)) / 10000)
+        for label, f in cases
+    ]
+
+
+def per_step(cls, repeat):
+    """Seconds per step() for a scalar loop and a finite-difference loop."""
+    webdice.dice.DiceDataMatrix = cls
+    webdice.dice.params.DiceDataMatrix = cls
+    try:
+        d = Dice2010()
+        d.vars = d.params.vars = cls(np.asarray(d.params.vars))
+        loop = min(timeit.repeat(
+            lambda: d.loop(scc=False), number=5, repeat=repeat)) / 5
+        d = Dice2010()
+        d.vars = d.params.vars = cls(np.asarray(d.params.vars))
+        d.eq = LoopOpt(d.params)
+        d.eq.set_models(d.params)
+        x0 = d.opt_x0
+        fd = min(timeit.repeat(
+            lambda: d.obj_loop(x0), number=3, repeat=repeat)) / 3
+    finally:
+        webdice.dice.DiceDataMatrix = DiceDataMatrix
+        webdice.dice.params.DiceDataMatrix = DiceDataMatrix
+    return [('Dice.step', loop / d.params.tmax),
+            ('Dice.step (61 cols, FD)', fd / d.params.tmax)]
+
+
+def main(repeat=5):
+    warnings.simplefilter('ignore')
+    rows = []
+    for measure in (micro, per_step):
+        before = measure(LegacyDataMatrix, repeat)
+        after = measure(DiceDataMatrix, repeat)
+        for (label, b), (_, a) in zip(before, after):
+            rows.append((label, b, a))
+    print('{:34s}{:>12s}{:>12s}{:>9s}'.format(
+        '', 'before', 'after', 'ratio'))
+    for label, b, a in rows:
+        print('{:34s}{:>10.2f}us{:>10.2f}us{:>8.1f}x'.format(
+            label, b * 1e6, a * 1e6, b / a))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
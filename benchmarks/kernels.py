@@ -0,0 +1,75 @@
+"""Speed of the loop kernels, and their agreement with step()
+
+Runs loop(scc=False) for every version, productivity, carbon, damages and
+policy combination, through its kernel and with step(), and reports both
+times. Each kernel run is also checked against step() (Dice.check_kernel),
+and any value that differs is reported. Run this after changing a model,
+since the kernel snippets repeat each model's equations and don't follow
+edits to them, and before setting Dice.use_kernel on a new numpy build.
+Exits with status 1 if any kernel differs from step().
+
+Usage:
+    python benchmarks/kernels.py [repeat]
+"""
+from __future__ import division, print_function
+import itertools
+import os
+import sys
+import timeit
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from suite import CARBON, DAMAGES, VERSIONS, configure
+
+PRODUCTIVITY = (None, 'dice_backstop_2013')
+POLICIES = ('none', 'treaty', 'carbon_tax')
+
+
+def dice(version, productivity, carbon, damages, policy, kernel=True):
+    d = configure(version, carbon, damages, policy)
+    if productivity is not None:
+        d.params.productivity_model = productivity
+    d.use_kernel = kernel
+    return d
+
+
+def check(case):
+    """Error message if the kernel differs from step(), else None."""
+    d = dice(*case)
+    d.check_kernel = True
+    try:
+        d.loop(scc=False)
+    except AssertionError as e:
+        return str(e)
+
+
+def seconds(case, kernel, repeat):
+    d = dice(*case, kernel=kernel)
+    return min(timeit.repeat(
+        lambda: d.loop(scc=False), number=3, repeat=repeat)) / 3
+
+
+def main(repeat=3):
+    warnings.simplefilter('ignore')
+    print('{:70s}{:>10s}{:>10s}{:>8s}'.format(
+        '', 'kernel', 'step', 'ratio'))
+    failed = 0
+    for case in itertools.product(
+            sorted(VERSIONS), PRODUCTIVITY, CARBON, DAMAGES, POLICIES):
+        name = '/'.join(c or 'default' for c in case)
+        error = check(case)
+        if error is not None:
+            failed += 1
+            print('{:70s} {}'.format(name, error))
+            continue
+        k = seconds(case, True, repeat)
+        s = seconds(case, False, repeat)
+        print('{:70s}{:>8.2f}ms{:>8.2f}ms{:>7.1f}x'.format(
+            name, k * 1e3, s * 1e3, s / k))
+    if failed:
+        print('{} kernels differ from step()'.format(failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*[int(a) for a in sys.argv[1:]]))
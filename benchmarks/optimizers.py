@@ -0,0 +1,102 @@
+"""Iterations and wall time of the optimizer backends
+
+Optimizes miu for Dice2010 with a few carbon and damages models under each
+installed backend and setting, and reports the status, iterations,
+objective and gradient evaluations, the forward simulations the
+evaluation cache left to run, seconds per optimization, and the
+welfare and largest miu difference against a tightly converged solution
+(scipy, 1000 iterations, tol 1e-9). Settings with knots optimize a
+piecewise-linear miu through that many knots first (Dice.opt_knots), then
+every period unless refine is off. Backends that aren't installed are
+skipped.
+
+Usage:
+    python benchmarks/optimizers.py [repeat]
+"""
+from __future__ import division, print_function
+import os
+import sys
+import timeit
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from webdice.dice import Dice2010
+from webdice.dice.optimizers import BACKENDS
+
+MODELS = [
+    ('dice_2010', 'dice_2010'),
+    ('beam_carbon', 'dice_2010'),
+    ('dice_2010', 'tipping_point'),
+]
+SETTINGS = [
+    ('ipopt', dict()),
+    ('scipy', dict(max_iter=30)),
+    ('scipy', dict()),
+    ('scipy', dict(max_iter=300, tol=1e-7)),
+    ('ipopt', dict(knots=8)),
+    ('scipy', dict(knots=6, refine=False)),
+    ('scipy', dict(knots=8, refine=False)),
+    ('scipy', dict(knots=8)),
+    ('scipy', dict(knots=8, max_iter=300, tol=1e-7)),
+]
+REFERENCE = ('scipy', dict(max_iter=1000, tol=1e-9))
+
+
+def dice(carbon, damages, backend, options):
+    d = Dice2010()
+    d.params.carbon_model = carbon
+    d.params.damages_model = damages
+    d.opt_backend = backend
+    d.opt_options = dict(options)
+    for k in ('tol', 'knots', 'refine'):
+        if k in options:
+            setattr(d, 'opt_{}'.format(k), d.opt_options.pop(k))
+    return d
+
+
+def optimize(carbon, damages, backend, options):
+    d = dice(carbon, damages, backend, options)
+    d.loop(scc=False, opt=True)
+    return d
+
+
+def welfare(d):
+    return d.vars.utility_discounted.sum()
+
+
+def label(backend, options):
+    return ' '.join([backend] + ['{}={}'.format(k, v)
+                                 for k, v in sorted(options.items())])
+
+
+def main(repeat=3):
+    warnings.simplefilter('ignore')
+    print('{:40s}{:>8s}{:>6s}{:>7s}{:>7s}{:>7s}{:>10s}{:>12s}{:>10s}'.format(
+        '', 'status', 'iter', 'f', 'grad', 'sims', 'time', 'welfare-ref',
+        'miu-ref'))
+    for carbon, damages in MODELS:
+        print('{} / {}'.format(carbon, damages))
+        ref = optimize(carbon, damages, *REFERENCE)
+        for backend, options in SETTINGS:
+            if not BACKENDS[backend].available():
+                print('  {:38s}{:>8s}'.format(
+                    label(backend, options), 'skipped'))
+                continue
+            d = optimize(carbon, damages, backend, options)
+            t = min(timeit.repeat(
+                lambda: optimize(carbon, damages, backend, options),
+                number=1, repeat=repeat))
+            s = d.opt_stats
+            print('  {:38s}{:>8d}{:>6s}{:>7d}{:>7d}{:>7d}{:>8.2f} s'
+                  '{:>12.2e}{:>10.1e}'.format(
+                      label(backend, options), s['status'],
+                      str(s['iterations'] if s['iterations'] is not None
+                          else '-'), s['f_evals'], s['grad_evals'],
+                      s['simulations'], t,
+                      welfare(d) - welfare(ref),
+                      np.abs(d.vars.miu - ref.vars.miu).max()))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
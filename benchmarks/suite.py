@@ -0,0 +1,164 @@
+"""End-to-end timings of Dice.loop()
+
+Times loop() for Dice2007 and Dice2010 with every carbon and damages
+model, in each policy mode, with SCC on and off, and writes the results
+to a JSON file. Compare two result files with compare.py.
+
+Optimized cases use IPOPT where pyipopt is installed and scipy otherwise,
+recorded with each case, and are skipped if neither is installed. Trees
+from before webdice.dice.optimizers only run them with pyipopt.
+Cases that raise are recorded with their error.
+
+Usage:
+    python benchmarks/suite.py [-o results.json] [-r repeat] [-k filter]
+"""
+from __future__ import division, print_function
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import warnings
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from webdice.dice import Dice2007, Dice2010
+try:
+    from webdice.dice.optimizers import get_optimizer
+except ImportError:
+    # Commits before the optimizer backends only have IPOPT.
+    get_optimizer = None
+
+VERSIONS = {'dice_2007': Dice2007, 'dice_2010': Dice2010}
+CARBON = ('dice_2010', 'beam_carbon', 'linear_carbon')
+DAMAGES = ('dice_2010', 'tipping_point', 'incommensurable_damages',
+           'productivity_fraction', 'exponential_map')
+POLICIES = ('none', 'treaty', 'carbon_tax', 'optimized')
+
+
+def cases():
+    """Every (version, carbon, damages, policy, scc) combination."""
+    return itertools.product(
+        sorted(VERSIONS), CARBON, DAMAGES, POLICIES, (True, False))
+
+
+def case_name(version, carbon, damages, policy, scc):
+    return '{}/{}/{}/{}/{}'.format(
+        version, carbon, damages, policy, 'scc' if scc else 'no_scc')
+
+
+def configure(version, carbon, damages, policy):
+    """Dice object set up for a case, with the front-end's policy values."""
+    d = VERSIONS[version]()
+    d.params.carbon_model = carbon
+    d.params.damages_model = damages
+    if policy == 'treaty':
+        d.params.treaty = True
+        d.params.e2050, d.params.e2100, d.params.e2150 = .2, .5, .7
+        d.params.p2050, d.params.p2100, d.params.p2150 = .5, .8, 1.
+    elif policy == 'carbon_tax':
+        d.params.carbon_tax = True
+        d.params.c2050, d.params.c2100, d.params.c2150 = 50., 120., 300.
+    return d
+
+
+def summarize(times):
+    times = np.asarray(times)
+    return dict(
+        n=len(times),
+        min=times.min(),
+        median=float(np.median(times)),
+        mean=times.mean(),
+        stdev=times.std(ddof=1) if len(times) > 1 else 0.,
+        max=times.max(),
+    )
+
+
+def run_case(version, carbon, damages, policy, scc, repeat, number):
+    """Seconds per loop() over `repeat` samples of `number` loops each."""
+    d = configure(version, carbon, damages, policy)
+    opt = policy == 'optimized'
+    d.loop(scc=scc, opt=opt)
+    times = timeit.repeat(
+        lambda: d.loop(scc=scc, opt=opt), number=number, repeat=repeat)
+    return [t / number for t in times]
+
+
+def opt_backend():
+    """Name of the optimizer 'auto' picks, or None if none is installed."""
+    try:
+        if get_optimizer is None:
+            import pyipopt
+            return 'ipopt'
+        return get_optimizer('auto').name
+    except ImportError:
+        return None
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+            stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(
+        commit=commit,
+        time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        platform=platform.platform(),
+        machine=platform.machine(),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', default='benchmark.json',
+                        help='Result file (default benchmark.json)')
+    parser.add_argument('-r', '--repeat', type=int, default=7,
+                        help='Samples per case (default 7)')
+    parser.add_argument('-n', '--number', type=int, default=1,
+                        help='Loops per sample (default 1)')
+    parser.add_argument('-k', '--filter', default='',
+                        help='Only run cases whose name contains this')
+    args = parser.parse_args(argv)
+    warnings.simplefilter('ignore')
+    backend = opt_backend()
+    results = []
+    for case in cases():
+        name = case_name(*case)
+        if args.filter not in name:
+            continue
+        result = dict(name=name, version=case[0], carbon=case[1],
+                      damages=case[2], policy=case[3], scc=case[4])
+        if case[3] == 'optimized':
+            result['backend'] = backend
+        if case[3] == 'optimized' and backend is None:
+            result['skipped'] = 'no optimizer installed'
+        else:
+            try:
+                result['times'] = run_case(
+                    *case, repeat=args.repeat, number=args.number)
+                result.update(summarize(result['times']))
+            except Exception as e:
+                result['error'] = repr(e)
+        results.append(result)
+        if 'median' in result:
+            print('{:70s}{:>10.2f} ms'.format(name, result['median'] * 1e3))
+        else:
+            print('{:70s}{:>13s}'.format(
+                name, 'skipped' if 'skipped' in result else 'error'))
+    with open(args.output, 'w') as f:
+        json.dump(dict(environment=environment(), repeat=args.repeat,
+                       number=args.number, results=results), f, indent=1)
+    print('Wrote {} cases to {}'.format(len(results), args.output))
+
+
+if __name__ == '__main__':
+    main()
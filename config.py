@@ -8,6 +8,18 @@ ASSETS_DEBUG = True
 
 CACHE_TYPE = 'memcached'
 CACHE_KEY_PREFIX = 'obstructures_dev'
+CACHE_THRESHOLD = 500
+CACHE_MEMCACHED_SERVERS = ['127.0.0.1:11211']
+
+JOBS_PROCESSES = 2
+JOBS_TIMEOUT = 90.
+OPT_STORE_PATH = os.path.join(_basedir, 'data', 'miu_store.jsonl')
+
+# Single runs go through the generated loop kernels. Run
+# benchmarks/kernels.py against the server's numpy build before turning
+# this on; DICE_CHECK_KERNELS also compares every run with Dice.step().
+DICE_KERNELS = True
+DICE_CHECK_KERNELS = False
 
 ADMINS = frozenset(['matteson@obstructures.org'])
 SECRET_KEY = 'REPLACEME'
\ No newline at end of file
@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
+import copy
 import numpy as np
 from params import DiceParams, Dice2010Params, DiceUserParams, DiceDataMatrix
 from equations.loop import Loop
 from equations_ne.loop import LoopOpt
+from equations.kernel import iter_kernel
+from timing import StepTimer, clock
+import uncertainty
+import optimizers
 
 
 class Dice(object):
@@ -16,19 +21,32 @@ class Dice(object):
         None
 
     """
+    params_class = DiceParams
+
     def __init__(self):
-        self.params = DiceParams()
+        self.params = self.params_class()
         self.vars = self.params.vars
         self.scc = self.params.scc
         self.eq = Loop(self.params)
         self.eps = 1e-8
         self.dice_version = 2007
         self.opt_vars = 60
-        self.opt_x = np.arange(self.opt_vars)
+        self.opt_cache_size = 16
+        self.opt_knots = None
+        self.opt_refine = True
         self.opt_grad_f = None
         self.opt_obj = None
         self.opt_tol = 1e-5
         self.opt_scale = 1e-4
+        self.opt_grad = 'fd'
+        self.opt_df = None
+        self.opt_store = None
+        self.opt_stats = None
+        self.opt_backend = 'auto'
+        self.opt_options = {}
+        self.timer = None
+        self.use_kernel = False
+        self.check_kernel = False
 
     @property
     def user_params(self):
@@ -63,7 +81,56 @@ class Dice(object):
             list: List of variable names as strings
 
         """
-        return [k for k, v in self.vars.__dict__.iteritems() if k[0] != '_']
+        return [k for k in DiceDataMatrix.names if k[0] != '_']
+
+    def enable_timing(self):
+        """Start timing Dice.step and each model equation
+
+        Call counts and cumulative wall time are collected for every step()
+        and every get_model_values() (and forcing()) it makes, including
+        those for SCC and optimization, and reset at the start of each
+        loop(). When timing is off, step() pays one attribute check.
+
+        Args:
+            None
+
+        Returns:
+            StepTimer: The timer, also at self.timer
+
+        """
+        if self.timer is None:
+            self.timer = StepTimer()
+        return self.timer
+
+    def disable_timing(self):
+        """Stop timing and restore the untimed models
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        if self.timer is not None:
+            self.timer.uninstrument(self.eq)
+        self.timer = None
+
+    @property
+    def timings(self):
+        """Timings of the last run
+
+        Args:
+            None
+
+        Returns:
+            dict: For step and each model equation, calls, cumulative
+                seconds and seconds per call, or None if timing is off
+
+        """
+        if self.timer is None:
+            return None
+        return self.timer.breakdown()
 
     @property
     def welfare(self):
@@ -99,7 +166,10 @@ class Dice(object):
             DiceDataMatrix: numpy array of model variables
 
         """
-
+        timer = self.timer
+        if timer is not None:
+            timer.instrument(self.eq)
+            start = clock()
         (
             df.carbon_intensity[i], df.productivity[i], df.capital[i],
             df.backstop_growth[i], df.gross_output[i], df.intensity_decline[i],
@@ -133,8 +203,77 @@ class Dice(object):
         df.utility[i], df.utility_discounted[i] = (
             self.eq.utility_model.get_model_values(i, df)
         )
+        if timer is not None:
+            timer.add('step', start)
         return df
 
+    def step_adjoint(self, i, df, adj):
+        """Adjoint step function
+
+        Reverse of step() at t. Adds the contributions of the model variables
+        at t to the welfare adjoints of the variables they depend on, calling
+        the models in the opposite order to step(). Called from
+        adjoint_grad_loop() with i running from tmax - 1 down to 0.
+
+        Args:
+            i (int): index of current step
+            df (DiceDataMatrix): model variables from a forward pass
+            adj (DiceDataMatrix): adjoints of welfare for each variable
+
+        Returns:
+            DiceDataMatrix: adjoints of welfare for each variable
+
+        """
+        self.eq.utility_model.get_model_adjoints(i, df, adj)
+        self.eq.consumption_model.get_model_adjoints(i, df, adj)
+        self.eq.damages_model.get_model_adjoints(i, df, adj)
+        self.eq.temperature_model.get_model_adjoints(i, df, adj)
+        self.eq.carbon_model.forcing_adjoints(i, df, adj)
+        self.eq.carbon_model.get_model_adjoints(i, df, adj)
+        self.eq.emissions_model.get_model_adjoints(i, df, adj)
+        if i > 0:
+            # Undo the damages to productivity applied in step(), so the
+            # productivity model sees the adjoint of its own value.
+            temp = df.temp_atmosphere[i - 1]
+            factor = self.eq.damages_model.get_production_factor(temp)
+            adj.temp_atmosphere[i - 1] += (
+                adj.productivity[i] * df.productivity[i] * 10 *
+                self.eq.damages_model.production_factor_derivative(temp) /
+                factor
+            )
+            adj.productivity[i] *= factor ** 10
+        self.eq.productivity_model.get_model_adjoints(i, df, adj)
+        return adj
+
+    def fast_loop(self, miu=None, deriv=False, opt=False, stream=False):
+        """Run the steps through a generated kernel
+
+        With use_kernel set, single scenarios whose models all have kernel
+        snippets run on plain floats. Ensembles, derivatives, timed runs
+        and unknown models are left to step(). With check_kernel set,
+        every run is compared with step() as well, see
+        benchmarks/kernels.py.
+
+        Kwargs:
+            miu (nd.array): values for miu
+            deriv (bool): Whether or not to calculate a derivative
+            opt (bool): Whether or not to optimize the scenario
+            stream (bool): Whether to set each period in self.vars as soon
+                as it is computed, rather than all at the end
+
+        Returns:
+            generator: Index of each period once its values are set, see
+                iter_kernel(), or None if the kernel can't run
+
+        """
+        if not self.use_kernel or deriv or self.timer is not None:
+            return None
+        check = None
+        if self.check_kernel:
+            check = lambda i, df: self.step(i, df, miu, opt=opt)
+        return iter_kernel(
+            self.eq, self.params, self.vars, miu, opt, stream, check)
+
     def loop(self, miu=None, deriv=False, scc=True, opt=False):
         """Main loop
 
@@ -152,47 +291,267 @@ class Dice(object):
             DiceDataMatrix: Array of model variables
 
         """
+        for i in self._loop(miu, deriv, scc, opt, stream=False):
+            pass
+        return self.vars
+
+    def iter_loop(self, miu=None, deriv=False, scc=True, opt=False):
+        """Main loop, one period at a time
+
+        Same as loop(), as a generator that yields each period as soon as
+        its model variables are set in self.vars, so they can be used
+        while later periods are computed. SCC, when asked for, is
+        calculated after the last period is yielded. Optimization happens
+        before the first. Single runs through a kernel are yielded as the
+        kernel advances, at some cost in speed over loop().
+
+        Kwargs:
+            miu (nd.array): values for miu
+            deriv (bool): Whether or not to calculate a derivative
+            scc (bool): Whether or not to calculate SCC
+            opt (bool): Whether or not to optimize the scenario
+
+        Yields:
+            int: Index of the period just computed
+
+        """
+        return self._loop(miu, deriv, scc, opt, stream=True)
+
+    def _loop(self, miu, deriv, scc, opt, stream):
+        if self.timer is not None:
+            self.timer.reset()
         _miu = None
         if opt:
             self.eq = LoopOpt(self.params)
             self.eq.set_models(self.params)
-            _miu = self.get_ipopt_miu()
+            _miu = self.get_opt_miu()
             _miu[0] = self.params.miu_2005
         self.eq = Loop(self.params)
         self.eq.set_models(self.params)
-        for i in range(self.params.tmax):
+        done = 0
+        periods = self.fast_loop(_miu, deriv=deriv, opt=opt, stream=stream)
+        if periods is not None:
+            try:
+                for i in periods:
+                    done = i + 1
+                    yield i
+            except (ArithmeticError, ValueError):
+                # Python floats raise where numpy returns inf or nan. Step
+                # the periods already yielded again, and go on from the
+                # one that raised.
+                for i in xrange(done):
+                    self.step(i, self.vars, _miu, deriv=deriv, opt=opt)
+        for i in xrange(done, self.params.tmax):
             self.step(i, self.vars, _miu, deriv=deriv, opt=opt)
+            yield i
         if scc:
             self.get_scc(_miu)
-        return self.vars
 
-    def set_opt_values(self, df):
+    def ensemble(self, scenarios, scc=True, dtype=None):
+        """Ensemble loop
+
+        Run the loop for N parameter sets at once. Model variables gain a
+        trailing scenario axis, so each call to step() advances every
+        scenario. Column n of the result is equal, value for value, to
+        loop() run with the parameters of scenario n, unless dtype is
+        narrower than float64. Optimization is not available in ensemble
+        runs.
+
+        Args:
+            scenarios (dict or list): Per-scenario parameter values, see
+                DiceParams.ensemble()
+
+        Kwargs:
+            scc (bool): Whether or not to calculate SCC
+            dtype (dtype): Storage type of the model variables, e.g.
+                np.float32 to halve the memory of large ensembles
+
+        Returns:
+            DiceDataMatrix: Array of model variables, 34 x tmax x N
+
+        """
+        batch = copy.copy(self)
+        batch.params = self.params.ensemble(scenarios, dtype)
+        batch.vars = batch.params.vars
+        batch.scc = batch.params.scc
+        return batch.loop(scc=scc)
+
+    def sweep(self, axes, variables=None, scc=True, dtype=None):
+        """Parameter sweep
+
+        Run every combination of values of one or more parameters as the
+        scenarios of one ensemble(), and arrange the results on the grid.
+
+        Args:
+            axes (list): (parameter name, sequence of values) pairs, one
+                per grid axis
+
+        Kwargs:
+            variables (list): Names of model variables to return, default
+                all of model_vars
+            scc (bool): Whether or not to calculate SCC
+            dtype (dtype): Storage type of the model variables
+
+        Returns:
+            dict: For each variable, an array of tmax x the lengths of the
+                axes, indexed [t, i, j, ...] by period and grid point
+
+        """
+        names = [k for k, v in axes]
+        if len(set(names)) != len(names):
+            raise ValueError('Each parameter can only be swept once.')
+        grids = np.meshgrid(
+            *[np.asarray(v, dtype=float) for k, v in axes], indexing='ij')
+        shape = grids[0].shape
+        df = self.ensemble(
+            dict((k, g.ravel()) for k, g in zip(names, grids)),
+            scc=scc, dtype=dtype)
+        return dict(
+            (v, np.asarray(getattr(df, v)).reshape((-1,) + shape))
+            for v in variables or self.model_vars
+        )
+
+    def percentile_bands(self, scenarios, variables=None,
+                         percentiles=(5, 25, 50, 75, 95), scc=False,
+                         batch=1000, dtype=None):
+        """Percentiles of model variables over many scenarios
+
+        Scenarios are run as ensembles of at most `batch` at a time, and
+        only the chosen variables of each are kept, so memory stays
+        bounded however many scenarios there are. Percentiles are taken
+        over all scenarios at once.
+
+        Args:
+            scenarios (dict): Parameter names to sequences of N values, as
+                for ensemble()
+
+        Kwargs:
+            variables (list): Names of model variables, default all of
+                model_vars
+            percentiles (list): Percentiles, between 0 and 100
+            scc (bool): Whether or not to calculate SCC
+            batch (int): Most scenarios run at once
+            dtype (dtype): Storage type of the model variables
+
+        Returns:
+            dict: For each variable, an array of tmax x len(percentiles)
+
+        """
+        scenarios = dict(
+            (k, np.asarray(v, dtype=float)) for k, v in scenarios.items())
+        sizes = set(v.size for v in scenarios.values())
+        if len(sizes) != 1:
+            raise ValueError('Scenario parameters need the same number of '
+                             'values, got {}.'.format(sorted(sizes)))
+        n = sizes.pop()
+        batches = (
+            self.ensemble(dict((k, v[i:i + batch])
+                               for k, v in scenarios.items()),
+                          scc=scc, dtype=dtype)
+            for i in xrange(0, n, batch)
+        )
+        return uncertainty.percentile_bands(
+            batches, variables or self.model_vars, percentiles)
+
+    def monte_carlo(self, distributions, n=1000, seed=None, **kwargs):
+        """Monte Carlo percentile bands
+
+        Draw n values of each parameter in distributions, and run them
+        through percentile_bands(). The same seed gives the same bands.
+
+        Args:
+            distributions (dict): Parameter name to a distribution and its
+                arguments, e.g. {'temp_co2_doubling': ('lognormal', 1.1,
+                .3)}, see uncertainty.draw()
+
+        Kwargs:
+            n (int): Number of draws
+            seed (int): Random seed, default a new one each call
+            **kwargs: Passed on to percentile_bands()
+
+        Returns:
+            tuple: The bands, as from percentile_bands(), and the draws, a
+                dict of parameter names to arrays of n values
+
+        """
+        draws = uncertainty.draw(distributions, n, seed)
+        return self.percentile_bands(draws, **kwargs), draws
+
+    def set_opt_values(self, df, controls):
         """Save current optimal values
 
-        Save last gradient and last objective function. Speeds up optimization
-        in the instance that miu (x) is unchanged form one iteration to the
-        next.
+        Save last gradient and last objective function, for the
+        optimizer's evaluation cache.
 
         Args:
-            df (DiceDataMatrix): Array of model variables
+            df (DiceDataMatrix): Array of model variables from fd_loop()
+            controls (nd.array): Periods of miu perturbed in columns 1 on
 
         Returns:
             None
 
         """
-        gf = (
-            df.utility_discounted[:, :60].sum(axis=0) -
-            df.utility_discounted[:, 60].sum()
+        base = df.utility_discounted[:, 0].sum()
+        self.opt_grad_f = np.zeros(self.params.tmax)
+        self.opt_grad_f[controls] = (
+            df.utility_discounted[:, 1:].sum(axis=0) - base
         ) * self.opt_scale / self.eps
-        self.opt_grad_f = gf
-        self.opt_obj = (
-            df.utility_discounted[:, 60].sum() * self.opt_scale)
+        self.opt_obj = base * self.opt_scale
+
+    def opt_bounds(self):
+        """Bounds of miu for optimization
+
+        miu is fixed for the first period, and at 1 for the last 20.
+
+        Args:
+            None
+
+        Returns:
+            tuple: Lower and upper bounds, n = params.tmax
+
+        """
+        xl = np.zeros(self.params.tmax)
+        xu = np.ones(self.params.tmax)
+        xl[0] = .005
+        xu[0] = .005
+        xl[-20:] = 1
+        return xl, xu
+
+    def fd_loop(self, miu, controls=None):
+        """Objective and finite difference gradient in one pass
+
+        Column 0 of the pass runs miu, and each column after it runs miu
+        with one of the controls perturbed by eps. Stores both results.
+
+        Args:
+            miu (nd.array): Array of values for miu, n = Dice().params.tmax
+
+        Kwargs:
+            controls (nd.array): Periods to perturb, default those
+                opt_bounds() leaves free. The gradient is zero for the
+                others.
+
+        Returns:
+            None
+
+        """
+        if controls is None:
+            xl, xu = self.opt_bounds()
+            controls = np.flatnonzero(xl < xu)
+        columns = dict((t, c + 1) for c, t in enumerate(controls))
+        df = self.vars.tile(len(controls) + 1)
+        for i in xrange(self.params.tmax):
+            df.miu[i] = miu[i]
+            if i in columns:
+                df.miu[i, columns[i]] += self.eps
+            self.step(i, df, df.miu[i], deriv=True, opt=True)
+        self.set_opt_values(df, controls)
 
     def obj_loop(self, miu):
         """Objective function for optimization
 
-        Calculate objective function. Is called by get_ipopt_miu().
-        Calls loop(). Stores and returns result.
+        Calculate objective function. Is called by get_opt_miu().
+        Calls fd_loop(). Stores and returns result.
 
         Args:
             miu (nd.array): Array of values for miu, n = Dice().params.tmax
@@ -201,39 +560,113 @@ class Dice(object):
             float: value of objective (utility)
 
         """
-        df = DiceDataMatrix(np.tile(self.vars, (61, 1, 1)).transpose(1, 2, 0))
-        for i in xrange(self.params.tmax):
-            df.miu[i, :] = miu[i]
-            df.miu[i, i] += self.eps
-            self.step(i, df, df.miu[i], deriv=True, opt=True)
-        self.set_opt_values(df)
+        self.fd_loop(miu)
         return self.opt_obj
 
-    def grad_loop(self, miu):
+    def grad_loop(self, miu, controls=None):
         """Gradient function for optimization
 
         Calculate gradient of objective function using finite differences.
-        Is called by get_ipopt_miu(). Calls loop(). Stores and returns result.
+        Is called by get_opt_miu(). Calls fd_loop(). Stores and returns
+        result.
 
         Args:
             miu (nd.array): Array of values for miu, n = Dice().params.tmax
 
+        Kwargs:
+            controls (nd.array): Periods to differentiate, see fd_loop()
+
         Returns:
             nd.array: gradient of objective
 
         """
-        df = DiceDataMatrix(np.tile(self.vars, (61, 1, 1)).transpose(1, 2, 0))
+        self.fd_loop(miu, controls)
+        return self.opt_grad_f
+
+    def adjoint_obj_loop(self, miu):
+        """Objective function for optimization with adjoint gradients
+
+        Calculate objective function with a single forward pass. Keeps the
+        model variables in opt_df for adjoint_grad_loop(). The pass costs
+        about as much as the whole of fd_loop(), since each numexpr call
+        costs the same for one column as for forty, so the adjoint path is
+        there to check the finite difference gradient, see
+        check_gradient(), not to optimize with.
+
+        Args:
+            miu (nd.array): Array of values for miu, n = Dice().params.tmax
+
+        Returns:
+            float: value of objective (utility)
+
+        """
+        df = self.vars.tile(1)
         for i in xrange(self.params.tmax):
-            df.miu[i, :] = miu[i]
-            df.miu[i, i] += self.eps
+            df.miu[i] = miu[i]
             self.step(i, df, df.miu[i], deriv=True, opt=True)
-        self.set_opt_values(df)
+        self.opt_df = df
+        self.opt_grad_f = None
+        self.opt_obj = df.utility_discounted.sum() * self.opt_scale
+        return self.opt_obj
+
+    def adjoint_grad_loop(self, miu):
+        """Gradient function for optimization with adjoint gradients
+
+        Calculate gradient of objective function by reverse-mode
+        differentiation: one forward pass, then step_adjoint() from the last
+        period back to the first. Reuses the forward pass from
+        adjoint_obj_loop() when miu is unchanged. Stores and returns result.
+
+        Args:
+            miu (nd.array): Array of values for miu, n = Dice().params.tmax
+
+        Returns:
+            nd.array: gradient of objective
+
+        """
+        if self.opt_df is None or (self.opt_df.miu[:, 0] != miu).any():
+            self.adjoint_obj_loop(miu)
+        df = self.opt_df
+        adj = DiceDataMatrix(np.zeros(df.shape))
+        adj.utility_discounted[:] = 1.
+        for i in xrange(self.params.tmax - 1, -1, -1):
+            self.step_adjoint(i, df, adj)
+        self.opt_grad_f = adj.miu[:, 0] * self.opt_scale
         return self.opt_grad_f
 
+    def check_gradient(self, miu=None):
+        """Compare adjoint and finite difference gradients
+
+        Calculate the gradient of the objective with adjoint_grad_loop() and
+        with grad_loop(), using the optimization models.
+
+        Kwargs:
+            miu (nd.array): values for miu, defaults to the optimizer's
+                starting point
+
+        Returns:
+            tuple: adjoint gradient, finite difference gradient, and the
+                largest difference relative to the largest finite
+                difference component
+
+        """
+        if miu is None:
+            miu = self.opt_x0
+        self.eq = LoopOpt(self.params)
+        self.eq.set_models(self.params)
+        adjoint = self.adjoint_grad_loop(miu).copy()
+        fd = self.grad_loop(miu, np.arange(self.params.tmax)).copy()
+        self.opt_obj = self.opt_grad_f = self.opt_df = None
+        return adjoint, fd, np.max(np.abs(adjoint - fd)) / np.max(np.abs(fd))
+
     def get_scc(self, miu):
         """Calculate SCC
 
-        Calculate social cost of carbon. Called automatically from loop().
+        Calculate social cost of carbon for the first params.scc_periods
+        periods. Called automatically from loop(). Each shocked run is a
+        column of self.scc that branches from self.vars at its own period,
+        and all of them are stepped together in one pass over time.
+        Horizons that run past tmax are truncated.
 
         Args:
             miu (nd.array): Array of values for miu, n = Dice().params.tmax
@@ -241,25 +674,72 @@ class Dice(object):
         Returns:
             None
         """
-        for i in xrange(20):
-            th = i + self.params.scc_horizon
-            self.scc[:] = self.vars[:]
-            for j in range(i, th + 1):
-                shock = 0
-                if j == i:
-                    shock = 1.0
-                self.step(j, self.scc, miu=miu, emissions_shock=shock)
-            diff = (
-                self.vars.consumption_pc[i:th] -
-                self.scc.consumption_pc[i:th]
-            ).clip(0) * self.scc.discount_factor[:self.params.scc_horizon]
-            self.vars.scc[i] = np.sum(diff) * 1000 * 10 * (12 / 44)
-
-    def get_ipopt_miu(self):
+        tmax = self.params.tmax
+        horizon = self.params.scc_horizon
+        shocks = np.arange(min(self.params.scc_periods, tmax))
+        if not len(shocks):
+            return
+        vars = np.asarray(self.vars)
+        # Shock columns go right after the time axis, so ensemble
+        # scenarios stay the trailing axis of every row.
+        self.scc = DiceDataMatrix(
+            np.repeat(vars[:, :, np.newaxis], len(shocks), axis=2))
+        expand = (1,) * (vars.ndim - 2)
+        for j in xrange(min(shocks[-1] + horizon, tmax)):
+            shock = (shocks == j).reshape(shocks.shape + expand) * 1.0
+            self.step(j, self.scc, miu=miu, emissions_shock=shock)
+            # Columns not yet shocked keep the unshocked values.
+            self.scc[:, j, shocks > j] = vars[:, j, np.newaxis]
+        periods = shocks[:, np.newaxis] + np.arange(horizon)
+        valid = (periods < tmax).reshape(periods.shape + expand)
+        periods = np.minimum(periods, tmax - 1)
+        cols = shocks[:, np.newaxis]
+        diff = (
+            self.vars.consumption_pc[periods] -
+            self.scc.consumption_pc[periods, cols]
+        ).clip(0) * self.scc.discount_factor[
+            np.minimum(np.arange(horizon), tmax - 1), cols]
+        diff = np.where(valid, diff, 0.)
+        # Sum each shocked run along a contiguous axis, so ensemble columns
+        # add up in the same order as a single run.
+        diff = np.ascontiguousarray(np.rollaxis(diff, 1, diff.ndim))
+        self.vars.scc[shocks] = diff.sum(axis=-1) * 1000 * 10 * (12 / 44)
+
+    @property
+    def opt_x0(self):
+        """Starting point for optimization
+
+        Args:
+            None
+
+        Returns:
+            nd.array: Array of values for miu, n = params.tmax
+
+        """
+        return np.concatenate(
+            (np.linspace(0, 1, 40) ** (1 - np.linspace(0, 1, 40)), np.ones(20))
+        )
+
+    def get_opt_miu(self):
         """Optimized miu
 
         Calculate optimal miu. Called when opt=True is passed to loop().
-        ...
+        The optimizer is picked by self.opt_backend: 'ipopt', 'scipy', or
+        'auto' for IPOPT where pyipopt is installed and scipy elsewhere.
+        Gradients come from fd_loop(). self.opt_grad = 'adjoint' uses
+        adjoint_grad_loop() instead, which is slower and meant for
+        checking the gradient, see check_gradient().
+        If self.opt_store is set, the optimizer starts from the nearest
+        stored solution and the result is added to the store. Periods
+        opt_bounds() fixes are left out of the problem the optimizer
+        solves. With self.opt_knots set, miu is first optimized as a
+        piecewise-linear path through that many knots, then, if
+        self.opt_refine, over every free period starting from that path.
+        Objective and gradient values are cached for the last
+        self.opt_cache_size miu tried. Evaluation counts and cache hits
+        are kept in self.opt_stats, with those of each stage in
+        opt_stats['stages'].
+
         Args:
             None
 
@@ -267,68 +747,49 @@ class Dice(object):
             nd.array: Array of optimal miu, n = params.tmax
 
         """
-
-        try:
-            import pyipopt
-        except ImportError:
-            pyipopt = None
-            print('OPTIMIZATION ERROR: It appears that you do not have '
-                  'pyipopt installed. Please install it before running '
-                  'optimization.')
-
-        x0 = np.concatenate(
-            (np.linspace(0, 1, 40) ** (1 - np.linspace(0, 1, 40)), np.ones(20))
-        )
-        M = 0
-        nnzj = 0
-        nnzh = 0
-        xl = np.zeros(self.params.tmax)
-        xu = np.ones(self.params.tmax)
-        xl[0] = .005
-        xu[0] = .005
-        xl[-20:] = 1
-        gl = np.zeros(M)
-        gu = np.ones(M) * 4.0
-
-        def eval_f(_x0):
-            if (_x0 == self.opt_x).all() and self.opt_obj is not None:
-                return self.opt_obj
-            else:
-                self.opt_x = _x0.copy()
-                return self.obj_loop(_x0)
-
-        def eval_grad_f(_x0):
-            if (_x0 == self.opt_x).all() and self.opt_grad_f is not None:
-                return self.opt_grad_f
-            else:
-                self.opt_x = _x0.copy()
-                return self.grad_loop(_x0)
-
-        def eval_g(x):
-            return np.zeros(M)
-
-        def eval_jac_g(x, flag):
-            if flag:
-                return [], []
-            else:
-                return np.empty(M)
-
-        pyipopt.set_loglevel(1)
-        nlp = pyipopt.create(
-            self.opt_vars, xl, xu, M, gl, gu, nnzj, nnzh, eval_f,
-            eval_grad_f, eval_g, eval_jac_g,
-        )
-        nlp.num_option('constr_viol_tol', 8e-7)
-        nlp.int_option('max_iter', 30)
-        nlp.num_option('max_cpu_time', 60)
-        nlp.num_option('tol', self.opt_tol)
-        nlp.num_option('obj_scaling_factor', -1e+3)
-        nlp.int_option('print_level', 0)
-        nlp.str_option('linear_solver', 'ma57')
-        x = nlp.solve(x0)[0]
-        nlp.close()
+        optimizer = optimizers.get_optimizer(
+            self.opt_backend, tol=self.opt_tol, **self.opt_options)
+        xl, xu = self.opt_bounds()
+
+        x0, distance = None, None
+        if self.opt_store is not None:
+            x0, distance = self.opt_store.nearest(self.params)
+        stats = dict(warm=x0 is not None, distance=distance,
+                     f_evals=0, grad_evals=0, backend=optimizer.name)
+        if x0 is None:
+            x0 = self.opt_x0
+        x0 = np.clip(x0, xl, xu)
+
+        self.opt_df = None
+        cache = optimizers.EvaluationCache(self.opt_cache_size)
+        stages = [None]
+        if self.opt_knots is not None:
+            stages = [self.opt_knots] + ([None] if self.opt_refine else [])
+        x = x0
+        stats['stages'] = []
+        for knots in stages:
+            counts = stats['f_evals'], stats['grad_evals']
+            objective = optimizers.Objective(
+                self, stats, xl, xu, knots=knots, cache=cache)
+            x, status, iterations = optimizer.solve(
+                objective, objective.reduce(x), objective.xl, objective.xu)
+            x = objective.expand(x)
+            stats['stages'].append(dict(
+                knots=knots, variables=len(objective.xl), status=status,
+                iterations=iterations, f_evals=stats['f_evals'] - counts[0],
+                grad_evals=stats['grad_evals'] - counts[1]))
+        stats['status'] = status
+        stats['variables'] = len(objective.xl)
+        iterations = [stage['iterations'] for stage in stats['stages']]
+        stats['iterations'] = None if None in iterations else sum(iterations)
+        self.opt_stats = stats
+        # Solved, solved to acceptable level, or out of iterations
+        if self.opt_store is not None and stats['status'] in (0, 1, -1):
+            self.opt_store.add(self.params, x, stats)
         return x
 
+    get_ipopt_miu = get_opt_miu
+
     def format_output(self):
         """Output as dict()
 
@@ -342,15 +803,39 @@ class Dice(object):
 
         """
         output = dict(parameters=None, data=None)
-        output['parameters'] = {
-            p: getattr(self.params, p) for p in self.user_params
-            if type(getattr(self.params, p)) in [type(10), type(.10)]
-        }
+        output['parameters'] = self.format_parameters()
         output['data'] = {
             p: list(getattr(self.vars, p)) for p in self.model_vars
         }
         return output
 
+    def format_parameters(self):
+        """Numeric parameters as dict(), as in format_output()
+
+        Args:
+            None
+
+        Returns:
+            dict: Dictionary of parameter values
+
+        """
+        return {
+            p: getattr(self.params, p) for p in self.user_params
+            if type(getattr(self.params, p)) in [type(10), type(.10)]
+        }
+
+    def format_period(self, i):
+        """Model variables at one period as dict()
+
+        Args:
+            i (int): index of the period
+
+        Returns:
+            dict: Dictionary of model variables with their values at i
+
+        """
+        return {p: float(getattr(self.vars, p)[i]) for p in self.model_vars}
+
 
 class Dice2010(Dice):
     """Convenience object for DICE2010 scenarios.
@@ -361,10 +846,10 @@ class Dice2010(Dice):
         print(d.vars)
 
     """
+    params_class = Dice2010Params
+
     def __init__(self):
         super(Dice2010, self).__init__()
-        self.params = Dice2010Params()
-        self.vars = self.params.vars
         self.dice_version = 2010
         self.opt_tol = 1e-5
 
@@ -0,0 +1,194 @@
+from __future__ import division
+import numpy as np
+
+# Transfer rates of the simplified BEAM carbon cycle, per period. Uptake of
+# atmospheric carbon by the upper ocean is scaled by the buffer factor b,
+# which depends on M_UP:
+#   dM_AT/dt = -.2 M_AT + .2 b M_UP + 10 E
+#   dM_UP/dt = .2 M_AT - (.2 b + .05) M_UP + .001 M_LO
+#   dM_LO/dt = .05 M_UP - .001 M_LO
+
+
+def uptake(mu):
+    """Buffer factor b at M_UP, as the fixed-step scheme has always
+    computed it"""
+    h = (5.21512e-10 * mu + 7.32749e-18 * np.sqrt(
+        5.06546e15 * (mu * mu) - 7.75282e18 * mu + 2.97321e21) - 4e-7)
+    return 142.349 / (1 + 8e-7 / h + 8e-7 * 4.53e-10 / h)
+
+
+def buffer_factor(mu, order=1):
+    """Buffer factor b and its derivatives with respect to M_UP
+
+    Args:
+        mu (array): M_UP
+        order (int): Highest derivative, 1 or 2
+
+    Returns:
+        tuple: b, db/dM_UP and, for order 2, d2b/dM_UP2
+    """
+    s = np.sqrt(5.06546e15 * (mu * mu) - 7.75282e18 * mu + 2.97321e21)
+    h = 5.21512e-10 * mu + 7.32749e-18 * s - 4e-7
+    q = (5.06546e15 * mu - 3.87641e18) / s
+    dh = 5.21512e-10 + 7.32749e-18 * q
+    k = 8e-7 + 8e-7 * 4.53e-10
+    b = 142.349 * h / (h + k)
+    db = 142.349 * k / (h + k) ** 2 * dh
+    if order == 1:
+        return b, db
+    d2h = 7.32749e-18 * (5.06546e15 - q ** 2) / s
+    d2b = 142.349 * k * (d2h * (h + k) - 2 * dh ** 2) / (h + k) ** 3
+    return b, db, d2b
+
+
+def explicit(ma, mu, ml, et, n):
+    """M_AT, M_UP, M_LO one period on, in n forward Euler substeps
+
+    Each substep updates M_AT, then M_UP from the new M_AT, then M_LO from
+    the new M_UP. The scheme is only stable for n of about 10 or more.
+    """
+    for x in xrange(n):
+        b = uptake(mu)
+        ma = ma + (-.2 * ma + b * .2 * mu + 10 * et) / n
+        mu = mu + (.2 * ma + (b * -.2 - .05) * mu + .001 * ml) / n
+        ml = ml + (.05 * mu - .001 * ml) / n
+    return ma, mu, ml
+
+
+def explicit_jacobians(ma, mu, ml, et, n):
+    """Jacobians of explicit() with respect to M_AT, M_UP, M_LO and E
+
+    Returns:
+        array: 3 x 4, followed by the shape of the inputs
+    """
+    jac = np.zeros((3, 4) + np.shape(ma))
+    for k in xrange(3):
+        jac[k, k] = 1
+    for x in xrange(n):
+        b, db = buffer_factor(mu)
+        j_ma = jac[0] * (1 - .2 / n) + jac[1] * .2 * (b + db * mu) / n
+        j_ma[3] += 10 / n
+        ma = ma + (-.2 * ma + .2 * b * mu + 10 * et) / n
+        j_mu = (
+            jac[1] * (1 + (-.2 * b - .05 - .2 * db * mu) / n) +
+            j_ma * .2 / n + jac[2] * .001 / n
+        )
+        mu = mu + (.2 * ma + (-.2 * b - .05) * mu + .001 * ml) / n
+        j_ml = jac[2] * (1 - .001 / n) + j_mu * .05 / n
+        ml = ml + (.05 * mu - .001 * ml) / n
+        jac = np.array([j_ma, j_mu, j_ml])
+    return jac
+
+
+def _solve(h, g, r0, r1, r2):
+    """Solve (I - hJ) y = r, with J the tridiagonal Jacobian of the rates
+    and g = d(.2 b M_UP)/dM_UP"""
+    d0 = 1 + .2 * h
+    c0 = -h * g / d0
+    y0 = r0 / d0
+    m1 = 1 + h * (g + .05) + .2 * h * c0
+    c1 = -.001 * h / m1
+    y1 = (r1 + .2 * h * y0) / m1
+    m2 = 1 + .001 * h + .05 * h * c1
+    y2 = (r2 + .05 * h * y1) / m2
+    y1 = y1 - c1 * y2
+    y0 = y0 - c0 * y1
+    return y0, y1, y2
+
+
+def _implicit_steps(ma, mu, ml, et, n, jacobians):
+    """n linearly implicit Euler substeps, and optionally their Jacobian"""
+    h = 1 / n
+    jac = None
+    if jacobians:
+        jac = np.zeros((3, 4) + np.broadcast(ma, mu, ml, et).shape)
+        for k in xrange(3):
+            jac[k, k] = 1
+    for x in xrange(n):
+        if jacobians:
+            b, db, d2b = buffer_factor(mu, 2)
+        else:
+            b, db = buffer_factor(mu)
+        g = .2 * (b + mu * db)
+        y = _solve(
+            h, g,
+            h * (-.2 * ma + .2 * b * mu + 10 * et),
+            h * (.2 * ma - (.2 * b + .05) * mu + .001 * ml),
+            h * (.05 * mu - .001 * ml),
+        )
+        if jacobians:
+            # Columns of d(step)/d(M_AT, M_UP, M_LO, E). The Jacobian in
+            # the solve depends on M_UP through g.
+            dg = .2 * (2 * db + mu * d2b) * y[1]
+            zero = np.zeros_like(g)
+            dy = np.array(_solve(
+                h, g,
+                h * np.array([zero - .2, g + dg, zero, zero + 10]),
+                h * np.array([zero + .2, -g - .05 - dg, zero + .001, zero]),
+                h * np.array([zero, zero + .05, zero - .001, zero]),
+            ))
+            for k in xrange(3):
+                dy[k, k] += 1
+            step = np.einsum('ik...,kj...->ij...', dy[:, :3], jac)
+            step[:, 3] += dy[:, 3]
+            jac = step
+        ma, mu, ml = ma + y[0], mu + y[1], ml + y[2]
+    return (ma, mu, ml), jac
+
+
+def implicit(ma, mu, ml, et, tol, max_substeps=64, keep=0, jacobians=False):
+    """M_AT, M_UP, M_LO one period on, with adaptive implicit substeps
+
+    Substeps are linearly implicit Euler, which stays stable at any step
+    size. The period is integrated in n and in 2n substeps, starting from
+    n = 1, and n is doubled until the two agree to a relative tol on every
+    value. The two results are then extrapolated to second order. The same
+    n is used for a whole batch of scenarios, so finite differences across
+    its columns see the same scheme.
+
+    Args:
+        ma, mu, ml, et (array): M_AT, M_UP, M_LO and E at t
+        tol (float): Relative tolerance between n and 2n substeps
+        max_substeps (int): Most substeps used for a period
+        keep (int): Number of leading axes that get their own n, e.g. 1 to
+            integrate every period of a path at once
+        jacobians (bool): Also return Jacobians of the result
+
+    Returns:
+        tuple: M_AT, M_UP, M_LO at t+1, and with jacobians an array of
+            their Jacobians with respect to M_AT, M_UP, M_LO and E, shape
+            3 x 4 followed by the shape of the inputs
+    """
+    shape = np.broadcast(ma, mu, ml, et).shape
+    n = 1
+    coarse, j_coarse = _implicit_steps(ma, mu, ml, et, n, jacobians)
+    out = jac = done = None
+    while True:
+        fine, j_fine = _implicit_steps(ma, mu, ml, et, 2 * n, jacobians)
+        err = np.max([abs(f - c) / abs(f) for f, c in zip(fine, coarse)],
+                     axis=0)
+        if keep:
+            err = np.reshape(err, shape[:keep] + (-1,)).max(axis=-1)
+        else:
+            err = np.max(err)
+        passed = (err <= tol) | (2 * n >= max_substeps)
+        if not keep and passed:
+            # One n for everything, so no need to select
+            out = [2 * f - c for f, c in zip(fine, coarse)]
+            jac = 2 * j_fine - j_coarse if jacobians else None
+            break
+        take = passed if done is None else passed & ~done
+        take = np.reshape(take, shape[:keep] + (1,) * (len(shape) - keep))
+        value = np.array([2 * f - c for f, c in zip(fine, coarse)])
+        out = np.where(take, value, 0 if out is None else out)
+        if jacobians:
+            jac = np.where(
+                take, 2 * j_fine - j_coarse, 0 if jac is None else jac)
+        done = passed if done is None else done | passed
+        if np.all(done):
+            break
+        coarse, j_coarse = fine, j_fine
+        n *= 2
+    if jacobians:
+        return out[0], out[1], out[2], jac
+    return out[0], out[1], out[2]
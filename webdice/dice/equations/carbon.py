@@ -1,6 +1,7 @@
 from __future__ import division
 import numpy as np
-import numexpr as ne
+from webdice.dice import beam
+from webdice.dice.params import exogenous
 
 
 class CarbonModel(object):
@@ -80,7 +81,7 @@ class CarbonModel(object):
         self._temp_atmosphere_2005 = value[0]
         self._temp_lower_2005 = value[1]
 
-    @property
+    @exogenous
     def forcing_ghg(self):
         """Forcing equation
 
@@ -90,12 +91,14 @@ class CarbonModel(object):
             nd.array: Array of forcing values, n=params.tmax
 
         """
-        return np.concatenate((
+        t = self.params.t0
+        return np.where(
+            t < 11,
             self.params.forcing_ghg_2000 + .1 * (
                 self.params.forcing_ghg_2100 - self.params.forcing_ghg_2000
-            ) * np.arange(11),
-            self.params.forcing_ghg_2100 * np.ones(49),
-        ))
+            ) * t,
+            self.params.forcing_ghg_2100,
+        )
 
     def mass_atmosphere(self, emissions_total, mass_atmosphere, mass_upper):
         """Equation for carbon mass in atmosphere
@@ -192,23 +195,19 @@ class BeamCarbon(CarbonModel):
 
     Methods:
         get_model_values()
-            Set BEAM transfer matrix, and return values for M_AT, M_UP, M_LO
+            Integrate BEAM, and return values for M_AT, M_UP, M_LO
 
     """
     def __init__(self, params):
         CarbonModel.__init__(self, params)
-        self.N = 20
         self.initial_carbon = [808.9, 725, 35641]
-        self.carbon_matrix_skel = np.array([
-            -.2, .2, 0,
-            .2, -.2, .05,
-            0, .001, -.001,
-        ]).reshape((3, 3, 1))
 
     def get_model_values(self, i, df):
         """Get results for t
 
-        Set BEAM transfer matrix, and return values for M_AT, M_UP, M_LO
+        Integrate BEAM over the period before t, and return values for
+        M_AT, M_UP, M_LO. params.beam_integrator picks the scheme, see
+        webdice.dice.beam.
 
         Args:
             i (int): time step
@@ -233,7 +232,7 @@ class BeamCarbon(CarbonModel):
         _a = k_h * (AM / (OM * (delta + 1)))
 
         """
-        _dims = 61 if df.ndim > 2 else 1
+        _dims = df.shape[2:]
         if i == 0:
             return (
                 self.initial_carbon[0] * np.ones(_dims),
@@ -241,20 +240,11 @@ class BeamCarbon(CarbonModel):
                 self.initial_carbon[2] * np.ones(_dims),
             )
         i -= 1
-        self.carbon_matrix = np.tile(self.carbon_matrix_skel, _dims)
-        ma, mu, ml = (df.mass_atmosphere[i], df.mass_upper[i],
-                         df.mass_lower[i])
-        for x in xrange(self.N):
-            h = ne.evaluate('5.21512e-10 * mu + 7.32749e-18 * sqrt(5.06546e15 * mu ** 2 - 7.75282e18 * mu + 2.97321e21) - 4e-7')
-            b = ne.evaluate('142.349 / (1 + 8e-7 / h + 8e-7 * 4.53e-10 / h)')
-
-            self.carbon_matrix[1][0] = b * .2
-            self.carbon_matrix[1][1] = b * -.2 - .05
-            ma += self.mass_atmosphere(
-                df.emissions_total[i], ma, mu) / self.N
-            mu += self.mass_upper(ma, mu, ml) / self.N
-            ml += self.mass_lower(mu, ml) / self.N
-        return ma, mu, ml
+        args = (df.mass_atmosphere[i], df.mass_upper[i], df.mass_lower[i],
+                df.emissions_total[i])
+        if self.params.beam_integrator == 'implicit':
+            return beam.implicit(*args, tol=self.params.beam_tol)
+        return beam.explicit(*args, n=self.params.beam_substeps)
 
 
 class LinearCarbon(CarbonModel):
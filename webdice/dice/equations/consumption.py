@@ -97,12 +97,12 @@ class ConsumptionModel(object):
         Discount factor for consumption
         """
         if discount_type == 'ramsey':
-            if c1 <= 0:
-                return 1
-            return np.exp(-(
-                self.params.elasmu * np.log(c1 / c0) / (i * 10 + .000001) +
-                self.params.prstp
-            ) * i * 10)
+            negative = c1 <= 0
+            return np.where(negative, 1, np.exp(-(
+                self.params.elasmu *
+                np.log(np.where(negative, c0, c1) / c0) /
+                (i * 10 + .000001) + self.params.prstp
+            ) * i * 10))
         if discount_type == 'constant':
             RATE = .03
             return 1 / (1 + RATE) ** (i * 10)
@@ -111,7 +111,7 @@ class ConsumptionModel(object):
         return 1 / factor ** (1 / (i * 10)) - 1
 
     def discount_forward(self, r0, r1, i):
-        return ((1 + r1) ** i / (1 + r0) ** (i - 1)) - 1
+        return (np.power(1 + r1, i) / np.power(1 + r0, i - 1)) - 1
 
     def investment(self, savings, output):
         """
@@ -1,5 +1,6 @@
 from __future__ import division
 import numpy as np
+from webdice.dice.params import exogenous
 
 
 class DamagesModel(object):
@@ -16,7 +17,7 @@ class DamagesModel(object):
         self._temp_atmosphere = None
         self._aa = None
 
-    @property
+    @exogenous
     def participation(self):
         """
         phi, Fraction of emissions in control regime
@@ -28,15 +29,17 @@ class DamagesModel(object):
         if self.params.treaty:
             p = [self.params.p2050, self.params.p2050, self.params.p2100,
                  self.params.p2150, self.params.pmax]
-            return np.concatenate((
-                (p[1] + (p[0] - p[1]) * np.exp(np.arange(5) * -.25)),
-                (p[2] + (p[1] - p[2]) * np.exp(np.arange(5) * -.25)),
-                (p[3] + (p[2] - p[3]) * np.exp(np.arange(5) * -.25)),
-                (p[4] + (p[3] - p[4]) * np.exp(np.arange(45) * -.25)),
-            ))
-        return np.ones(self.params.tmax)
+            t = self.params.t0
+            return np.select(
+                [t < 5, t < 10, t < 15],
+                [(p[1] + (p[0] - p[1]) * np.exp(t * -.25)),
+                 (p[2] + (p[1] - p[2]) * np.exp((t - 5) * -.25)),
+                 (p[3] + (p[2] - p[3]) * np.exp((t - 10) * -.25))],
+                (p[4] + (p[3] - p[4]) * np.exp((t - 15) * -.25)),
+            )
+        return np.ones(np.shape(self.params.t0))
 
-    @property
+    @exogenous
     def damages_terms(self):
         """
         temp coefficient; pi_2, temp squared coefficient;
@@ -44,13 +47,13 @@ class DamagesModel(object):
         ...
         Returns
         -------
-        array
+        tuple
         """
-        return np.array([
+        return (
             self.params.a1,
             self.params.damages_coefficient,
             self.params.damages_exponent
-        ])
+        )
 
     def get_production_factor(self, temp_atmosphere):
         """
@@ -74,8 +77,7 @@ class DamagesModel(object):
         -------
         array
         """
-        if i == 0:
-            df.participation = self.participation
+        df.participation[i] = self.participation[i]
         abatement = self.abatement(df.gross_output[i], df.miu[i],
                                    df.backstop_growth[i],
                                    df.participation[i])
@@ -97,8 +99,8 @@ class DamagesModel(object):
         return np.minimum(
             gross_output,
             gross_output *
-            participation ** (1 - self.params.abatement_exponent) *
-            backstop_growth * miu ** self.params.abatement_exponent
+            np.power(participation, 1 - self.params.abatement_exponent) *
+            backstop_growth * np.power(miu, self.params.abatement_exponent)
         )
 
     def damages(self, gross_output, temp_atmosphere, abatement=None):
@@ -111,7 +113,8 @@ class DamagesModel(object):
         """
         return gross_output * (1 - 1 / (
             1 + self.damages_terms[0] * temp_atmosphere +
-            self.damages_terms[1] * temp_atmosphere ** self.damages_terms[2]
+            self.damages_terms[1] * np.power(temp_atmosphere,
+                                             self.damages_terms[2])
         ))
 
     def output(self, gross_output, damages, abatement,
@@ -153,7 +156,8 @@ class ExponentialMap(DamagesModel):
     def damages(self, gross_output, temp_atmosphere, abatement=None):
         return gross_output * (1 - np.exp(
             -(self.damages_terms[0] * temp_atmosphere +
-            self.damages_terms[1] * temp_atmosphere ** self.damages_terms[2])
+            self.damages_terms[1] * np.power(temp_atmosphere,
+                                             self.damages_terms[2]))
         ))
 
 
@@ -181,8 +185,7 @@ class IncommensurableDamages(DamagesModel):
         -------
         array
         """
-        if index == 0:
-            df.participation = self.participation
+        df.participation[index] = self.participation[index]
         _go = df.gross_output[index]
         _miu = df.miu[index]
         _bg = df.backstop_growth[index]
@@ -203,7 +206,7 @@ class IncommensurableDamages(DamagesModel):
         consumption = (
             consumption_no_damages / (
                 1 + consumption_no_damages * C25d *
-                temp_atmosphere ** self.damages_terms[2]
+                np.power(temp_atmosphere, self.damages_terms[2])
             )
         )
         return consumption / (1 - self.params.savings)
@@ -221,7 +224,7 @@ class TippingPoint(DamagesModel):
     """
     def damages(self, gross_output, temp_atmosphere, a_abatement=None):
         return gross_output * (1 - 1 / (
-            1 + (temp_atmosphere / 20.46) ** 2 + (
+            1 + np.power(temp_atmosphere / 20.46, 2) + (
                 (temp_atmosphere / 6.081) ** 6.754
             )))
 
@@ -234,7 +237,8 @@ class ProductivityFraction(DamagesModel):
         fD = self.get_production_factor(temp_atmosphere)
         damages_to_prod =  1 / (
             1 + self.damages_terms[0] * temp_atmosphere +
-            self.damages_terms[1] * temp_atmosphere ** self.damages_terms[2]
+            self.damages_terms[1] * np.power(temp_atmosphere,
+                                             self.damages_terms[2])
         ) / fD
         return gross_output * (1 - damages_to_prod)
 
@@ -253,7 +257,8 @@ class ProductivityFraction(DamagesModel):
         """
         D = 1 - 1 / (
             1 + self.damages_terms[0] * temp_atmosphere +
-            self.damages_terms[1] * temp_atmosphere ** self.damages_terms[2]
+            self.damages_terms[1] * np.power(temp_atmosphere,
+                                             self.damages_terms[2])
         )
         return 1 - self.params.prod_frac * D
 
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 import numpy as np
+from webdice.dice.params import exogenous
 
 
 class EmissionsModel(object):
@@ -24,7 +25,7 @@ class EmissionsModel(object):
     def __init__(self, params):
         self.params = params
 
-    @property
+    @exogenous
     def emissions_deforest(self):
         """E_land, Emissions from deforestation
 
@@ -37,7 +38,7 @@ class EmissionsModel(object):
             (1 - .1) ** self.params.t0
         )
 
-    @property
+    @exogenous
     def emissions_cap(self):
         """E_cap, Emissions caps from treaty inputs
 
@@ -45,14 +46,14 @@ class EmissionsModel(object):
             :returns: Array of emissions caps
             :rtype: np.ndarray
         """
-        return np.concatenate((
-            np.ones(5),
-            (np.ones(5) * (1 - self.params.e2050)),
-            (np.ones(5) * (1 - self.params.e2100)),
-            (np.ones(45) * (1 - self.params.e2150)),
-        ))
-
-    @property
+        t = self.params.t0
+        return np.select(
+            [t < 5, t < 10, t < 15],
+            [1., 1 - self.params.e2050, 1 - self.params.e2100],
+            1 - self.params.e2150,
+        )
+
+    @exogenous
     def user_tax_rate(self):
         """Optional user-defined carbon tax
 
@@ -62,12 +63,14 @@ class EmissionsModel(object):
         """
         c = [0, self.params.c2050, self.params.c2100,
              self.params.c2150, self.params.cmax]
-        return np.concatenate((
-            c[0] + ((c[1] - c[0]) / 5 * np.arange(5)),
-            c[1] + ((c[2] - c[1]) / 5 * np.arange(5)),
-            c[2] + ((c[3] - c[2]) / 5 * np.arange(5)),
-            c[3] + ((c[3] - c[2]) / 5 * np.arange(45)),
-        ))
+        t = self.params.t0
+        return np.select(
+            [t < 5, t < 10, t < 15],
+            [c[0] + ((c[1] - c[0]) / 5 * t),
+             c[1] + ((c[2] - c[1]) / 5 * (t - 5)),
+             c[2] + ((c[3] - c[2]) / 5 * (t - 10))],
+            c[3] + ((c[3] - c[2]) / 5 * (t - 15)),
+        )
 
     def get_model_values(self, i, df, deriv=False, opt=False,
                          miu=None, emissions_shock=0):
@@ -103,9 +106,11 @@ class EmissionsModel(object):
         carbon_emitted = emissions_total * 10 \
             if i == 0 \
             else self.carbon_emitted(emissions_total, df.carbon_emitted[i - 1])
-        if np.max(carbon_emitted) > self.params.fosslim:
-            emissions_total = 0.0
-            carbon_emitted = self.params.fosslim
+        over = carbon_emitted > self.params.fosslim
+        if np.any(over):
+            emissions_total = np.where(over, 0.0, emissions_total)
+            carbon_emitted = np.where(
+                over, self.params.fosslim, carbon_emitted)
         tax_rate = self.tax_rate(miu, df.backstop[i])
         return (
             miu,
@@ -183,29 +188,27 @@ class EmissionsModel(object):
                 return miu[i]
         elif miu is None:
             if i > 0:
-                if df.carbon_emitted[i - 1] > self.params.fosslim:
-                    return 1.0
                 if self.params.treaty:
-                    return min(self.miu(
+                    _miu = np.minimum(self.miu(
                         df.emissions_ind[i - 1],
                         self.emissions_cap[i - 1],
                         df.emissions_ind[0],
                         df.carbon_intensity[i], df.gross_output[i]
                     ), 1.0)
                 elif self.params.carbon_tax:
-                    return min(
-                        (self.user_tax_rate[i] / (
-                            df.backstop[i] * 1000)) ** (
-                            1 / (self.params.abatement_exponent - 1)),
-                        1.0
-                    )
+                    _miu = np.minimum(np.power(
+                        self.user_tax_rate[i] / (df.backstop[i] * 1000),
+                        1 / (self.params.abatement_exponent - 1)
+                    ), 1.0)
                 else:
-                    return 0
+                    _miu = 0
+                return np.where(
+                    df.carbon_emitted[i - 1] > self.params.fosslim, 1.0, _miu)
             else:
                 return self.params.miu_2005
         else:
-            return min(miu[i], 1.0)
-        return min(df.miu[i], 1.0)
+            return np.minimum(miu[i], 1.0)
+        return np.minimum(df.miu[i], 1.0)
 
     def miu(self, emissions_ind, emissions_cap, _e2005, intensity,
             gross_output):
@@ -216,11 +219,12 @@ class EmissionsModel(object):
         -------
         float
         """
-        if emissions_cap == 0:
-            return 1
         # elif round(emissions_ind, 2) < round((_e2005 * emissions_cap), 2):
         #     return 0
-        return 1 - ((_e2005 * emissions_cap) / (intensity * gross_output))
+        return np.where(
+            emissions_cap == 0, 1,
+            1 - ((_e2005 * emissions_cap) / (intensity * gross_output))
+        )
 
     def tax_rate(self, miu, backstop):
         """
@@ -231,7 +235,8 @@ class EmissionsModel(object):
         float
         """
         return (
-            backstop * miu ** (self.params.abatement_exponent - 1) * 1000
+            backstop * np.power(miu, self.params.abatement_exponent - 1) *
+            1000
         )
 
 
@@ -240,7 +245,7 @@ class Dice2007(EmissionsModel):
 
 
 class Dice2010(EmissionsModel):
-    @property
+    @exogenous
     def emissions_deforest(self):
         """
         E_land, Emissions from deforestation
@@ -0,0 +1,556 @@
+"""Generated loop kernels for single scenarios
+
+For a combination of model classes, the equations of every model are
+pasted into one function that runs all periods on plain Python floats,
+kept in a list per model variable. There are no model objects, keyword
+arguments or DiceDataMatrix row lookups inside the loop. The function is
+compiled once per combination.
+
+Each snippet below repeats the arithmetic of the model it stands for,
+term for term and in the same order. Python floats add, multiply, divide
+and raise to powers as numpy scalars do, but numpy's exp(), log(),
+power() and sqrt(), and its powers of arrays, can differ from the math
+module's in the last bit, depending on the build. So wherever a model
+calls a numpy function, its snippet calls the same one, and where a
+model's value is a 0-d array (the np.where() result in
+ConsumptionModel.discount_factor()), its snippet raises an array to the
+power too. The BEAM carbon cycle is integrated by webdice.dice.beam, as in
+the model.
+
+Only the model classes listed here have snippets. Any other class, for
+instance a new subclass that overrides an equation, leaves run_kernel()
+returning False, and Dice.loop() steps as usual. A snippet does not follow
+edits to the model it stands for, so after changing a model run
+benchmarks/kernels.py, which compares every model combination's kernel
+with step(). Setting Dice.check_kernel does the same for each run.
+Kernels are off unless Dice.use_kernel is set, which the web front-end
+does from its DICE_KERNELS setting.
+"""
+from __future__ import division
+import textwrap
+from collections import namedtuple
+import numpy as np
+from webdice.dice import beam
+from webdice.dice.params import DiceDataMatrix
+import carbon
+import consumption
+import damages
+import emissions
+import productivity
+import temperature
+import utility
+
+nan = float('nan')
+
+Snippet = namedtuple('Snippet', ('setup', 'step', 'factor'))
+
+
+def minimum(a, b):
+    """np.minimum for two floats, NaN if either is"""
+    return a if a <= b or a != a else b
+
+
+def snippet(setup='', step='', factor=''):
+    return Snippet(textwrap.dedent(setup), textwrap.dedent(step),
+                   textwrap.dedent(factor))
+
+
+PRODUCTIVITY_SETUP = """
+    _model = m['productivity']
+    backstop_path = _model.backstop.tolist()
+    productivity_growth_path = _model.productivity_growth.tolist()
+    population_path = _model.population_path.tolist()
+    intensity_decline_path = _model.intensity_decline_path.tolist()
+    carbon_intensity_path = _model.carbon_intensity_path.tolist()
+    capital_retained = (1 - p.depreciation) ** 10
+    output_elasticity = p.output_elasticity
+    abatement_exponent = p.abatement_exponent
+"""
+
+PRODUCTIVITY_STEP = """
+    backstop[i] = backstop_path[i]
+    if i > 0:
+        carbon_intensity[i] = carbon_intensity_path[i]
+        intensity_decline[i] = intensity_decline_path[i]
+        productivity[i] = productivity[i - 1] / (
+            1 - productivity_growth_path[i - 1])
+        capital[i] = capital[i - 1] * capital_retained + 10 * investment[i - 1]
+        population[i] = population_path[i]
+        gross_output[i] = (
+            productivity[i] * power(capital[i], output_elasticity) *
+            power(population[i] * 1000, 1 - output_elasticity)
+        )
+    else:
+        carbon_intensity[i] = p.intensity_2005
+        productivity[i] = p.productivity
+        capital[i] = p.capital_2005
+        gross_output[i] = p.output_2005
+        intensity_decline[i] = p.intensity_growth
+        population[i] = p.population_2005
+"""
+
+productivity_model = snippet(PRODUCTIVITY_SETUP, PRODUCTIVITY_STEP + """
+    backstop_growth[i] = (
+        backstop[i] * carbon_intensity[i] / abatement_exponent)
+""")
+
+backstop_2013 = snippet(PRODUCTIVITY_SETUP, PRODUCTIVITY_STEP + """
+    backstop_growth[i] = (
+        backstop[i] * carbon_intensity[i] / abatement_exponent) * (44 / 12)
+""")
+
+emissions_model = snippet("""
+    _model = m['emissions']
+    emissions_deforest_path = _model.emissions_deforest.tolist()
+    emissions_cap_path = _model.emissions_cap.tolist()
+    user_tax_rate_path = _model.user_tax_rate.tolist()
+    treaty = p.treaty
+    carbon_tax = p.carbon_tax
+    fosslim = p.fosslim
+    abatement_exponent = p.abatement_exponent
+""", """
+    if opt:
+        if miu_path is not None:
+            _miu = miu_path[i]
+        else:
+            _miu = minimum(miu[i], 1.0)
+    elif miu_path is None:
+        if i > 0:
+            if treaty:
+                _cap = emissions_cap_path[i - 1]
+                _miu = minimum(1.0 if _cap == 0 else 1 - (
+                    (emissions_ind[0] * _cap) /
+                    (carbon_intensity[i] * gross_output[i])), 1.0)
+            elif carbon_tax:
+                _miu = minimum(power(
+                    user_tax_rate_path[i] / (backstop[i] * 1000),
+                    1 / (abatement_exponent - 1)
+                ), 1.0)
+            else:
+                _miu = 0.0
+            if carbon_emitted[i - 1] > fosslim:
+                _miu = 1.0
+        else:
+            _miu = p.miu_2005
+    else:
+        _miu = minimum(miu_path[i], 1.0)
+    miu[i] = _miu
+    emissions_ind[i] = carbon_intensity[i] * (1 - _miu) * gross_output[i]
+    _et = emissions_ind[i] + emissions_deforest_path[i]
+    if i == 0:
+        _ce = _et * 10
+    else:
+        _ce = carbon_emitted[i - 1] + _et * 10
+    if _ce > fosslim:
+        _et = 0.0
+        _ce = fosslim
+    emissions_total[i] = _et
+    carbon_emitted[i] = _ce
+    tax_rate[i] = backstop[i] * power(_miu, abatement_exponent - 1) * 1000
+""")
+
+CARBON_SETUP = """
+    _model = m['carbon']
+    mass_0 = [float(_v) for _v in _model.initial_carbon]
+    forcing_ghg_path = _model.forcing_ghg.tolist()
+    forcing_co2_doubling = p.forcing_co2_doubling
+    mass_preindustrial = p.mass_preindustrial
+    log2 = log(2)
+"""
+
+FORCING_STEP = """
+    forcing[i] = forcing_co2_doubling * (
+        log(mass_atmosphere[i] / mass_preindustrial) / log2
+    ) + forcing_ghg_path[i]
+"""
+
+carbon_model = snippet(CARBON_SETUP + """
+    ((b11, b12, b13), (b21, b22, b23),
+     (b31, b32, b33)) = _model.carbon_matrix.tolist()
+""", """
+    if i == 0:
+        mass_atmosphere[i], mass_upper[i], mass_lower[i] = mass_0
+    else:
+        _ma = mass_atmosphere[i - 1]
+        _mu = mass_upper[i - 1]
+        _ml = mass_lower[i - 1]
+        mass_atmosphere[i] = (
+            b11 * _ma + b21 * _mu + 10 * emissions_total[i - 1])
+        mass_upper[i] = b12 * _ma + b22 * _mu + b32 * _ml
+        mass_lower[i] = b23 * _mu + b33 * _ml
+""" + FORCING_STEP)
+
+beam_carbon = snippet(CARBON_SETUP + """
+    beam_implicit = p.beam_integrator == 'implicit'
+    beam_substeps = p.beam_substeps
+    beam_tol = p.beam_tol
+""", """
+    if i == 0:
+        mass_atmosphere[i], mass_upper[i], mass_lower[i] = mass_0
+    else:
+        _ma = mass_atmosphere[i - 1]
+        _mu = mass_upper[i - 1]
+        _ml = mass_lower[i - 1]
+        _et = emissions_total[i - 1]
+        if beam_implicit:
+            _ma, _mu, _ml = beam.implicit(_ma, _mu, _ml, _et, tol=beam_tol)
+        else:
+            _ma, _mu, _ml = beam.explicit(
+                _ma, _mu, _ml, _et, n=beam_substeps)
+        _ma, _mu, _ml = float(_ma), float(_mu), float(_ml)
+        mass_atmosphere[i] = _ma
+        mass_upper[i] = _mu
+        mass_lower[i] = _ml
+""" + FORCING_STEP)
+
+linear_carbon = snippet(step="""
+    mass_atmosphere[i] = mass_upper[i] = mass_lower[i] = nan
+    forcing[i] = nan
+""")
+
+temperature_model = snippet("""
+    _model = m['temperature']
+    temp_0 = [float(_v) for _v in _model.initial_temps]
+    xi1, xi2, xi3, xi4 = p.thermal_transfer.tolist()
+    temp_ratio = p.forcing_co2_doubling / p.temp_co2_doubling
+""", """
+    if i == 0:
+        temp_atmosphere[i], temp_lower[i] = temp_0
+    else:
+        _ta = temp_atmosphere[i - 1]
+        _tl = temp_lower[i - 1]
+        temp_atmosphere[i] = _ta + xi1 * (
+            forcing[i] - temp_ratio * _ta - xi3 * (_ta - _tl))
+        temp_lower[i] = _tl + xi4 * (_ta - _tl)
+""")
+
+linear_temperature = snippet("""
+    _model = m['temperature']
+    temp_0 = float(_model.initial_temps[0])
+    temp_slope = p.temp_co2_doubling / ((
+        2 * p.mass_preindustrial + (
+            2 * p.mass_preindustrial -
+            (p.mass_atmosphere_2005 * p.carbon_matrix[0][0]) -
+            (p.mass_upper_2005 * p.carbon_matrix[1][0])
+        )) * 1e-3)
+""", """
+    if i == 0:
+        temp_atmosphere[i] = temp_0
+    else:
+        temp_atmosphere[i] = temp_0 + carbon_emitted[i - 1] * temp_slope * 1e-3
+    temp_lower[i] = nan
+""")
+
+DAMAGES_SETUP = """
+    _model = m['damages']
+    participation_path = _model.participation.tolist()
+    d1, d2, d3 = _model.damages_terms
+    abatement_exponent = p.abatement_exponent
+    savings = p.savings
+    prod_frac = p.prod_frac
+"""
+
+DAMAGES_STEP = textwrap.dedent("""
+    participation[i] = participation_path[i]
+    _go = gross_output[i]
+    _t = temp_atmosphere[i]
+    _ab = minimum(
+        _go,
+        _go * power(participation[i], 1 - abatement_exponent) *
+        backstop_growth[i] * power(miu[i], abatement_exponent)
+    )
+    {damages}
+    abatement[i] = _ab
+    damages[i] = _dam
+    output[i] = {output}
+    output_abate[i] = _ab / _go * 100
+""")
+
+
+def damages_snippet(damages, output='((_go - _ab) * (_go - _dam)) / _go',
+                    factor=''):
+    return snippet(DAMAGES_SETUP, DAMAGES_STEP.format(
+        damages=textwrap.dedent(damages).strip(), output=output), factor)
+
+
+damages_model = damages_snippet("""
+    _dam = _go * (1 - 1 / (1 + d1 * _t + d2 * power(_t, d3)))
+""")
+
+exponential_map = damages_snippet("""
+    _dam = _go * (1 - exp(-(d1 * _t + d2 * power(_t, d3))))
+""")
+
+tipping_point = damages_snippet("""
+    _dam = _go * (1 - 1 / (
+        1 + power(_t / 20.46, 2) + ((_t / 6.081) ** 6.754)))
+""")
+
+productivity_fraction = damages_snippet("""
+    _fd = 1 - prod_frac * (1 - 1 / (1 + d1 * _t + d2 * power(_t, d3)))
+    _dam = _go * (1 - 1 / (1 + d1 * _t + d2 * power(_t, d3)) / _fd)
+""", factor="""
+    if i > 0:
+        _t = temp_atmosphere[i - 1]
+        productivity[i] *= (
+            1 - prod_frac * (1 - 1 / (1 + d1 * _t + d2 * power(_t, d3)))) ** 10
+""")
+
+incommensurable_damages = damages_snippet("""
+    _ond = _go - _ab
+    _cnd = _ond - _ond * savings
+    _out = _cnd / (1 + _cnd * 1.4771e-05 * power(_t, d3)) / (1 - savings)
+    _dam = _ond - _out
+""", output='_out')
+
+consumption_model = snippet("""
+    savings = p.savings
+    elasmu = p.elasmu
+    prstp = p.prstp
+""", """
+    consumption[i] = output[i] * (1.0 - savings)
+    consumption_pc[i] = consumption[i] / population[i]
+    if i == 0:
+        discount_factor[i] = 1.0
+        discount_rate[i] = 0.0
+        discount_forward[i] = 0.0
+        investment[i] = p.output_2005 * savings
+    else:
+        _c1 = consumption_pc[i]
+        if _c1 <= 0:
+            _f = 1.0
+        else:
+            _f = exp(-(
+                elasmu * log(_c1 / consumption_pc[0]) /
+                (i * 10 + .000001) + prstp
+            ) * i * 10)
+        _r = 1 / asarray(_f) ** (1 / (i * 10)) - 1
+        discount_factor[i] = _f
+        discount_rate[i] = _r * 100
+        discount_forward[i] = (power(1 + _r, i) / power(
+            1 + discount_rate[i - 1] / 100., i - 1) - 1) * 100
+        investment[i] = savings * output[i]
+""")
+
+utility_model = snippet("""
+    utility_discount_path = m['utility'].utility_discount.tolist()
+    log_utility = p.elasmu == 1
+    utility_denom = 1.0 - p.elasmu
+""", """
+    if log_utility:
+        utility[i] = log(consumption_pc[i])
+    else:
+        utility[i] = (
+            power(consumption_pc[i], utility_denom) / utility_denom) + 1
+    utility_discounted[i] = (
+        utility_discount_path[i] * population[i] * utility[i])
+""")
+
+SNIPPETS = {
+    productivity.ProductivityModel: productivity_model,
+    productivity.Dice2007: productivity_model,
+    productivity.Dice2010: productivity_model,
+    productivity.DiceBackstop2013: backstop_2013,
+    emissions.EmissionsModel: emissions_model,
+    emissions.Dice2007: emissions_model,
+    emissions.Dice2010: emissions_model,
+    carbon.CarbonModel: carbon_model,
+    carbon.Dice2007: carbon_model,
+    carbon.Dice2010: carbon_model,
+    carbon.BeamCarbon: beam_carbon,
+    carbon.LinearCarbon: linear_carbon,
+    temperature.TemperatureModel: temperature_model,
+    temperature.Dice2007: temperature_model,
+    temperature.LinearTemperature: linear_temperature,
+    damages.DamagesModel: damages_model,
+    damages.Dice2007: damages_model,
+    damages.Dice2010: damages_model,
+    damages.ExponentialMap: exponential_map,
+    damages.TippingPoint: tipping_point,
+    damages.ProductivityFraction: productivity_fraction,
+    damages.IncommensurableDamages: incommensurable_damages,
+    consumption.ConsumptionModel: consumption_model,
+    consumption.Dice2007: consumption_model,
+    consumption.Dice2010: consumption_model,
+    utility.UtilityModel: utility_model,
+    utility.Dice2007: utility_model,
+    utility.Dice2010: utility_model,
+}
+
+KINDS = ('productivity', 'emissions', 'carbon', 'temperature', 'damages',
+         'consumption', 'utility')
+
+_kernels = {}
+
+
+def indent(code, level):
+    return ''.join(' ' * 4 * level + line if line.strip() else line
+                   for line in code.splitlines(True))
+
+
+def source(classes):
+    """Source of the kernel for a model class per kind, in KINDS order
+
+    Returns:
+        str: Source of a generator function kernel(values, miu_path, opt,
+            p, m) that yields each period once its values are set, or None
+            if any class has no snippet
+    """
+    try:
+        snippets = dict(
+            (kind, SNIPPETS[cls]) for kind, cls in zip(KINDS, classes))
+    except KeyError:
+        return None
+    lines = ['def kernel(values, miu_path, opt, p, m):\n']
+    lines.append(indent('({},) = values\n'.format(', '.join(
+        DiceDataMatrix.names)), 1))
+    for kind in KINDS:
+        lines.append(indent('# {}\n'.format(
+            classes[KINDS.index(kind)].__name__), 1))
+        lines.append(indent(snippets[kind].setup, 1))
+    lines.append(indent('for i in xrange(p.tmax):\n', 1))
+    order = [('productivity', 'step'), ('damages', 'factor'),
+             ('emissions', 'step'), ('carbon', 'step'),
+             ('temperature', 'step'), ('damages', 'step'),
+             ('consumption', 'step'), ('utility', 'step')]
+    for kind, part in order:
+        lines.append(indent(getattr(snippets[kind], part), 2))
+    lines.append(indent('yield i\n', 2))
+    return ''.join(lines)
+
+
+def compile_kernel(classes):
+    """Kernel function for a tuple of model classes, compiled on first use
+
+    Returns:
+        function: Kernel, or None if any class has no snippet
+    """
+    try:
+        return _kernels[classes]
+    except KeyError:
+        pass
+    code = source(classes)
+    kernel = None
+    if code is not None:
+        namespace = dict(
+            nan=nan, minimum=minimum, asarray=np.asarray, power=np.power,
+            exp=np.exp, log=np.log, beam=beam)
+        exec(compile(code, '<kernel {}>'.format(
+            '/'.join(c.__name__ for c in classes)), 'exec'), namespace)
+        kernel = namespace['kernel']
+    _kernels[classes] = kernel
+    return kernel
+
+
+def find_kernel(eq, df):
+    """Kernel for the models of a Loop, if df is a single scenario
+
+    Returns:
+        function: Kernel, or None if the scenario can't go through one
+    """
+    if df.ndim != 2 or df.dtype != np.float64:
+        return None
+    return compile_kernel(tuple(
+        type(getattr(eq, '{}_model'.format(kind))) for kind in KINDS))
+
+
+def iter_kernel(eq, params, df, miu=None, opt=False, stream=True,
+                check=None):
+    """Run a single scenario through its kernel, one period at a time
+
+    Args:
+        eq (Loop): Loop with its models set
+        params (DiceParams): Parameters the models were set with
+        df (DiceDataMatrix): Model variables, 34 x tmax, written in place
+
+    Kwargs:
+        miu (nd.array): values for miu
+        opt (bool): Whether or not miu is an optimized path
+        stream (bool): Whether to write each period to df as soon as it
+            is computed. Otherwise df is written once, after the last
+            period, and every period is yielded then, which is faster.
+        check (function): step(i, df) of the same scenario. If given, the
+            finished run is repeated with it on a copy of df, and any
+            value that differs raises AssertionError.
+
+    Returns:
+        generator: Index of each period once its values are in df, or None
+            if the scenario can't go through a kernel. Iterating raises
+            ArithmeticError or ValueError where Python floats raise and
+            numpy returns inf or nan; the period that raised and those
+            after it are then not written.
+    """
+    kernel = find_kernel(eq, df)
+    if kernel is None:
+        return None
+    models = dict((kind, getattr(eq, '{}_model'.format(kind)))
+                  for kind in KINDS)
+    return _periods(kernel, models, params, df, miu, opt, stream, check)
+
+
+def _periods(kernel, models, params, df, miu, opt, stream, check):
+    expected = None if check is None else df.copy()
+    out = np.asarray(df)
+    values = out.tolist()
+    miu_path = None if miu is None else np.asarray(miu, dtype=float).tolist()
+    for i in kernel(values, miu_path, opt, params, models):
+        if stream:
+            out[:, i] = [row[i] for row in values]
+            yield i
+    if not stream:
+        out[...] = values
+        for i in xrange(params.tmax):
+            yield i
+    if expected is not None:
+        for i in xrange(params.tmax):
+            check(i, expected)
+        verify(df, expected, models)
+
+
+def verify(df, expected, models):
+    """Raise AssertionError where the kernel's results differ from step()
+
+    Args:
+        df (DiceDataMatrix): Model variables from the kernel
+        expected (DiceDataMatrix): The same scenario run with step()
+        models (dict): Model per kind, for the message
+    """
+    a, b = np.asarray(df), np.asarray(expected)
+    same = (a == b) | ((a != a) & (b != b))
+    if not same.all():
+        i, row = np.argwhere(~same.T)[0]
+        raise AssertionError(
+            'Kernel for {} differs from step() in {}[{}]: {!r} != {!r}. '
+            'Update its snippets to match the models.'.format(
+                '/'.join(type(models[kind]).__name__ for kind in KINDS),
+                DiceDataMatrix.names[row], i, a[row, i], b[row, i]))
+
+
+def run_kernel(eq, params, df, miu=None, opt=False, check=None):
+    """Run every period of a single scenario through its kernel
+
+    Args:
+        eq (Loop): Loop with its models set
+        params (DiceParams): Parameters the models were set with
+        df (DiceDataMatrix): Model variables, 34 x tmax, written in place
+
+    Kwargs:
+        miu (nd.array): values for miu
+        opt (bool): Whether or not miu is an optimized path
+        check (function): step(i, df) to compare with, see iter_kernel()
+
+    Returns:
+        bool: False if the scenario can't go through a kernel, in which
+            case df is unchanged and step() should be used
+    """
+    periods = iter_kernel(eq, params, df, miu, opt, stream=False,
+                          check=check)
+    if periods is None:
+        return False
+    try:
+        for i in periods:
+            pass
+    except (ArithmeticError, ValueError):
+        # Python floats raise where numpy returns inf or nan
+        return False
+    return True
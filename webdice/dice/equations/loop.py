@@ -5,6 +5,13 @@ import consumption
 import emissions
 import productivity
 import temperature
+from webdice.dice.registry import ModelRegistry
+
+
+registry = ModelRegistry(
+    utility=utility, carbon=carbon, damages=damages, consumption=consumption,
+    emissions=emissions, productivity=productivity, temperature=temperature,
+)
 
 
 class Loop(object):
@@ -102,6 +109,9 @@ class Loop(object):
         """
         Set the models used for damages and oceanic carbon transfer
         ...
+        Model instances come from the registry, so runs with the same
+        parameters share them and their exogenous paths.
+        ...
         Args
         ----
         eq: obj, the Dice2007 Loop()
@@ -113,28 +123,12 @@ class Loop(object):
         -------
         None
         """
-        self.damages_model = getattr(
-            damages, "".join(x.capitalize() for x in params.damages_model.split('_'))
-        )(params)
-        self.carbon_model = getattr(
-            carbon, "".join(x.capitalize() for x in params.carbon_model.split('_'))
-        )(params)
         if params.carbon_model == 'linear_carbon':
-            params.temperature_model = 'linear_temperature'
+            temperature_model = 'linear_temperature'
         else:
-            params.temperature_model = 'dice_%s' % params.dice_version
-        self.temperature_model = getattr(
-            temperature, "".join(x.capitalize() for x in params.temperature_model.split('_'))
-        )(params)
-        self.productivity_model = getattr(
-            productivity, "".join(x.capitalize() for x in params.productivity_model.split('_'))
-        )(params)
-        self.consumption_model = getattr(
-            consumption, "".join(x.capitalize() for x in params.consumption_model.split('_'))
-        )(params)
-        self.utility_model = getattr(
-            utility, "".join(x.capitalize() for x in params.utility_model.split('_'))
-        )(params)
-        self.emissions_model = getattr(
-            emissions, "".join(x.capitalize() for x in params.emissions_model.split('_'))
-        )(params)
\ No newline at end of file
+            temperature_model = 'dice_%s' % params.dice_version
+        # Only assign on change, so cached exogenous paths stay valid
+        if params.temperature_model != temperature_model:
+            params.temperature_model = temperature_model
+        for kind, model in registry.models(params).iteritems():
+            setattr(self, '%s_model' % kind, model)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 import numpy as np
+from webdice.dice.params import exogenous
 
 
 class ProductivityModel(object):
@@ -27,7 +28,7 @@ class ProductivityModel(object):
     def __init__(self, params):
         self.params = params
 
-    @property
+    @exogenous
     def backstop(self):
         """Cost of replacing with clean energy
         12/44 converts from $/C to $/CO2
@@ -43,7 +44,7 @@ class ProductivityModel(object):
                 )) / self.params.backstop_ratio
         )
 
-    @property
+    @exogenous
     def population_growth_rate(self):
         """L_g, Growth rate of population.
 
@@ -56,7 +57,7 @@ class ProductivityModel(object):
             (np.exp(self.params.population_growth * self.params.t0))
         )
 
-    @property
+    @exogenous
     def productivity_growth(self):
         """A_g, Growth rate of total factor productivity.
 
@@ -68,6 +69,48 @@ class ProductivityModel(object):
             -self.params.productivity_decline * 10 * self.params.t0
         )
 
+    @exogenous
+    def population_path(self):
+        """L, Population.
+
+        Returns:
+            :returns: L(0) * (1 - L_g(t)) + (L_g(t) * L_max
+            :rtype: np.ndarray
+        """
+        return (
+            self.params.population_2005 * (1 - self.population_growth_rate) +
+            self.population_growth_rate * self.params.popasym
+        )
+
+    @exogenous
+    def intensity_decline_path(self):
+        """σ_g, Decline rate of decarbonization.
+
+        Returns:
+            :returns: σ_g(0) * exp(σ_d1 * t)
+            :rtype: np.ndarray
+        """
+        return (
+            self.params.intensity_growth * np.exp(
+                -self.params.intensity_decline_rate * 10 * self.params.t0
+            )
+        )
+
+    @exogenous
+    def carbon_intensity_path(self):
+        """σ, Carbon intensity.
+
+        Returns:
+            :returns: σ(t-1) / (1 - σ_g(t)), as a running quotient
+            :rtype: np.ndarray
+        """
+        decline = self.intensity_decline_path
+        steps = np.ones(
+            np.broadcast(decline, self.params.intensity_2005).shape)
+        steps[0] = self.params.intensity_2005
+        steps[1:] = 1 - decline[1:]
+        return np.divide.accumulate(steps)
+
     def population(self, i, df):
         """L, Population.
 
@@ -78,14 +121,10 @@ class ProductivityModel(object):
             :type df: obj
 
         Returns:
-            :returns: L(0) * (1 - L_g(t)) + (L_g(t) * L_max
+            :returns: L(t) from population_path
             :rtype: float
         """
-        return (
-            self.params.population_2005 *
-            (1 - self.population_growth_rate[i]) +
-            self.population_growth_rate[i] * self.params.popasym
-        )
+        return self.population_path[i]
 
     def intensity_decline(self, i, df):
         """σ_g, Decline rate of decarbonization.
@@ -97,14 +136,10 @@ class ProductivityModel(object):
             :type df: obj
 
         Returns:
-            :returns: σ_g(0) * exp(σ_d1 * t)
+            :returns: σ_g(t) from intensity_decline_path
             :rtype: float
         """
-        return (
-            self.params.intensity_growth * np.exp(
-                -self.params.intensity_decline_rate * 10 * i
-            )
-        )
+        return self.intensity_decline_path[i]
 
     def carbon_intensity(self, i, df):
         """σ, Carbon intensity.
@@ -116,16 +151,13 @@ class ProductivityModel(object):
             :type df: obj
 
         Returns:
-            :returns: σ(t-1) / (1 - σ_g(t))
-            :rtype: float
+            :returns: σ(t) and σ_g(t) from the exogenous paths
+            :rtype: tuple
         """
-        intensity_decline = self.intensity_decline(i, df)
-        # df.intensity_decline[i] = intensity_decline
-        return df.carbon_intensity[i - 1] / (
-            1 - intensity_decline
-        ), intensity_decline
+        return self.carbon_intensity_path[i], self.intensity_decline(i, df)
 
     def get_model_values(self, i, df):
+        df.backstop[i] = self.backstop[i]
         if i > 0:
             carbon_intensity, intensity_decline = self.carbon_intensity(i, df)
             productivity = df.productivity[i - 1] / (
@@ -140,7 +172,6 @@ class ProductivityModel(object):
                 population
             )
         else:
-            df.backstop[:] = self.backstop
             carbon_intensity = self.params.intensity_2005
             productivity = self.params.productivity
             capital = self.params.capital_2005
@@ -199,8 +230,8 @@ class ProductivityModel(object):
             :rtype: float
         """
         return (
-            productivity * capital ** output_elasticity *
-            (population * 1000) ** (1 - output_elasticity)
+            productivity * np.power(capital, output_elasticity) *
+            np.power(population * 1000, 1 - output_elasticity)
         )
 
 
@@ -209,24 +240,22 @@ class Dice2007(ProductivityModel):
 
 
 class Dice2010(ProductivityModel):
-    def intensity_decline(self, i, df):
+    @exogenous
+    def intensity_decline_path(self):
         """σ_g, Decline rate of decarbonization.
 
-        Args:
-            :param i: current time step
-            :type i: int
-            :param df: DiceDataMatrix
-            :type df: obj
-
         Returns:
-            :returns: σ_g(t-1) * (1 - σ_d1)
-            :rtype: float
+            :returns: σ_g(t-1) * (1 - σ_d1), as a running product
+            :rtype: np.ndarray
         """
-        return df.intensity_decline[i - 1] * (
-            1 - self.params.intensity_decline_rate
-        ) ** 10
-
-    @property
+        steps = np.ones(np.broadcast(
+            self.params.t0, self.params.intensity_growth,
+            self.params.intensity_decline_rate).shape) * (
+            1 - self.params.intensity_decline_rate) ** 10
+        steps[0] = self.params.intensity_growth
+        return np.multiply.accumulate(steps)
+
+    @exogenous
     def productivity_growth(self):
         """A_g, Growth rate of total factor productivity.
 
@@ -238,49 +267,62 @@ class Dice2010(ProductivityModel):
             -self.params.productivity_decline * 10 * self.params.t0 *
         np.exp(-.002 * 10 * self.params.t0))
 
-    def carbon_intensity(self, i, df):
+    @exogenous
+    def carbon_intensity_path(self):
         """σ, Carbon intensity.
 
-        Args:
-            :param i: current time step
-            :type i: int
-            :param df: DiceDataMatrix
-            :type df: obj
-
         Returns:
-            :returns: σ(t-1) * (1 - σ_g(t))
-            :rtype: float
+            :returns: σ(t-1) * (1 - σ_g(t-1)), as a running product
+            :rtype: np.ndarray
         """
-        intensity_decline = self.intensity_decline(i, df)
-        return (
-            df.carbon_intensity[i - 1] *
-            (1 - df.intensity_decline[i - 1])
-        ), intensity_decline
-
-    def population(self, i, df):
+        decline = self.intensity_decline_path
+        steps = np.ones(
+            np.broadcast(decline, self.params.intensity_2005).shape)
+        steps[0] = self.params.intensity_2005
+        steps[1:] = 1 - decline[:-1]
+        return np.multiply.accumulate(steps)
+
+    @exogenous
+    def population_path(self):
         """L, Population.
 
-        Args:
-            :param i: current time step
-            :type i: int
-            :param df: DiceDataMatrix
-            :type df: obj
+        The recurrence has no exact closed form in floating point, so it is
+        stepped here once per set of parameters.
 
         Returns:
             :returns: L(t-1) * (L_max / L(t-1)) ** L_g
-            :rtype: float
+            :rtype: np.ndarray
         """
-        return (
-            df.population[i - 1] * (
-                self.params.popasym / df.population[i - 1]
-            ) ** self.params.population_growth
-        )
+        population = np.empty(np.broadcast(
+            self.params.t0, self.params.population_2005,
+            self.params.popasym, self.params.population_growth).shape)
+        population[0] = self.params.population_2005
+        for i in xrange(1, len(population)):
+            population[i] = population[i - 1] * np.power(
+                self.params.popasym / population[i - 1],
+                self.params.population_growth)
+        return population
 
 
 class DiceBackstop2013(Dice2010):
     """This cass is a hack to make the simpler backstop equations from
     DICE2013 available to the web front-end.
     """
+    @exogenous
+    def backstop(self):
+        """Cost of replacing with clean energy, DICE2013
+
+        Returns:
+            :returns: BC(t-1) * (1 - BC_g), as a running product
+            :rtype: np.ndarray
+        """
+        steps = np.ones(np.broadcast(
+            self.params.t0, self.params.backstop_2005,
+            self.params.backstop_decline).shape) * (
+            1 - self.params.backstop_decline)
+        steps[0] = self.params.backstop_2005
+        return np.multiply.accumulate(steps)
+
     def get_model_values(self, i, df):
         if i > 0:
             carbon_intensity, intensity_decline = self.carbon_intensity(i, df)
@@ -295,10 +337,10 @@ class DiceBackstop2013(Dice2010):
                 productivity, capital, self.params.output_elasticity,
                 population
             )
-            df.backstop[i] = df.backstop[i - 1] * (1 - self.params.backstop_decline)
+            df.backstop[i] = self.backstop[i]
 
         else:
-            df.backstop[i] = self.params.backstop_2005
+            df.backstop[i] = self.backstop[i]
             carbon_intensity = self.params.intensity_2005
             productivity = self.params.productivity
             capital = self.params.capital_2005
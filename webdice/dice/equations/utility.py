@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 import numpy as np
+from webdice.dice.params import exogenous
 
 
 class UtilityModel(object):
@@ -21,7 +22,7 @@ class UtilityModel(object):
     def __init__(self, params):
         self.params = params
 
-    @property
+    @exogenous
     def utility_discount(self):
         """R, Average utility discount rate
 
@@ -51,10 +52,16 @@ class UtilityModel(object):
             :returns: c ^ (1 - η) / (1 - η) + 1
             :rtype: float
         """
-        if self.params.elasmu == 1:
+        elasmu = self.params.elasmu
+        if np.ndim(elasmu):
+            log = elasmu == 1
+            denom = np.where(log, 1.0, 1.0 - elasmu)
+            return np.where(log, np.log(consumption_pc),
+                            (np.power(consumption_pc, denom) / denom) + 1)
+        if elasmu == 1:
             return np.log(consumption_pc)
-        denom = 1.0 - self.params.elasmu
-        return (consumption_pc ** denom / denom) + 1
+        denom = 1.0 - elasmu
+        return (np.power(consumption_pc, denom) / denom) + 1
 
     def utility_discounted(self, utility, utility_discount, l):
         """Utility discounted
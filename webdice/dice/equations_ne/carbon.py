@@ -1,13 +1,8 @@
 from __future__ import division
 import numpy as np
 import numexpr as ne
-import __builtin__
-
-try:
-    __builtin__.profile
-except AttributeError:
-    def profile(func): return func
-    __builtin__.profile = profile
+from webdice.dice import beam
+from webdice.dice.params import exogenous
 
 
 class CarbonModel(object):
@@ -35,6 +30,10 @@ class CarbonModel(object):
         Calculate M_LO at t
     forcing()
         Calculate forcing at t
+    get_model_adjoints()
+        Propagate adjoints of M_AT, M_UP, M_LO back one step
+    forcing_adjoints()
+        Propagate adjoint of forcing to M_AT
     """
     def __init__(self, params):
         self.params = params
@@ -78,7 +77,7 @@ class CarbonModel(object):
         self._temp_atmosphere_2005 = value[0]
         self._temp_lower_2005 = value[1]
 
-    @property
+    @exogenous
     def forcing_ghg(self):
         """
         F_EX, Exogenous forcing for other greenhouse gases
@@ -171,6 +170,51 @@ class CarbonModel(object):
             self.mass_lower(mu, ml),
         )
 
+    def forcing_adjoints(self, i, df, adj):
+        """
+        Propagate adjoint of F at t to M_AT at t
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        fco2 = self.params.forcing_co2_doubling
+        adj.mass_atmosphere[i] += adj.forcing[i] * fco2 / (
+            np.log(2) * df.mass_atmosphere[i])
+
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate adjoints of M_AT, M_UP, M_LO at t to M_AT, M_UP, M_LO
+        and E at t-1
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        if i == 0:
+            return
+        b = self.carbon_matrix
+        a_ma = adj.mass_atmosphere[i]
+        a_mu = adj.mass_upper[i]
+        a_ml = adj.mass_lower[i]
+        i -= 1
+        adj.mass_atmosphere[i] += b[0][0] * a_ma + b[0][1] * a_mu
+        adj.mass_upper[i] += b[1][0] * a_ma + b[1][1] * a_mu + b[1][2] * a_ml
+        adj.mass_lower[i] += b[2][1] * a_mu + b[2][2] * a_ml
+        adj.emissions_total[i] += 10 * a_ma
+
 
 class Dice2007(CarbonModel):
     pass
@@ -183,21 +227,18 @@ class BeamCarbon(CarbonModel):
     Methods
     -------
     get_model_values()
-        Set BEAM transfer matrix, and return values for M_AT, M_UP, M_LO
+        Integrate BEAM, and return values for M_AT, M_UP, M_LO
     """
     def __init__(self, params):
         CarbonModel.__init__(self, params)
-        self.N = 20
         self.initial_carbon = [808.9, 725, 35641]
-        self.carbon_matrix_skel = np.array([
-            -.2, .2, 0,
-            .2, -.2, .05,
-            0, .001, -.001,
-        ]).reshape((3, 3, 1))
+        self._jacobians = None
 
     def get_model_values(self, i, df):
         """
-        Set BEAM transfer matrix, and return values for M_AT, M_UP, M_LO
+        Integrate BEAM over the period before t, and return values for
+        M_AT, M_UP, M_LO. params.beam_integrator picks the scheme, see
+        webdice.dice.beam.
         ...
         Args
         ----
@@ -228,7 +269,7 @@ class BeamCarbon(CarbonModel):
 
         _a = k_h * (AM / (OM * (delta + 1)))
         """
-        _dims = 61 if df.ndim > 2 else 1
+        _dims = df.shape[-1] if df.ndim > 2 else 1
         if i == 0:
             return (
                 self.initial_carbon[0] * np.ones(_dims),
@@ -236,23 +277,73 @@ class BeamCarbon(CarbonModel):
                 self.initial_carbon[2] * np.ones(_dims),
             )
         i -= 1
-        self.carbon_matrix = np.tile(self.carbon_matrix_skel, _dims)
-        ma, mu, ml = (df.mass_atmosphere[i], df.mass_upper[i], df.mass_lower[i])
-        n = self.N
-        for x in xrange(n):
-            h = ne.evaluate('5.21512e-10 * mu + 7.32749e-18 * sqrt(5.06546e15 * mu ** 2 - 7.75282e18 * mu + 2.97321e21) - 4e-7')
-            b = ne.evaluate('142.349 / (1 + 8e-7 / h + 8e-7 * 4.53e-10 / h)')
-
-            self.carbon_matrix[1][0] = b * .2
-            self.carbon_matrix[1][1] = b * -.2 - .05
-            _ma = self.mass_atmosphere(
-                df.emissions_total[i], ma, mu)
-            ma = ne.evaluate('ma + _ma / n')
-            _mu = self.mass_upper(ma, mu, ml)
-            mu = ne.evaluate('mu + _mu / n')
-            _ml = self.mass_lower(mu, ml)
-            ml = ne.evaluate('ml + _ml / n')
-        return ma, mu, ml
+        args = (df.mass_atmosphere[i], df.mass_upper[i], df.mass_lower[i],
+                df.emissions_total[i])
+        if self.params.beam_integrator == 'implicit':
+            return beam.implicit(*args, tol=self.params.beam_tol)
+        return beam.explicit(*args, n=self.params.beam_substeps)
+
+    def buffer_factor(self, mu):
+        """
+        Ocean uptake term b, and its derivative with respect to M_UP
+        ...
+        Returns
+        -------
+        tuple
+            b, db/dM_UP
+        """
+        return beam.buffer_factor(mu)
+
+    def transfer_jacobians(self, df):
+        """
+        Jacobians of M_AT, M_UP, M_LO at t+1 with respect to M_AT, M_UP,
+        M_LO and E at t, for every t. The substeps of get_model_values()
+        are replayed for all periods at once, carrying derivatives along.
+        ...
+        Args
+        ----
+        df : DiceDataMatrix
+        ...
+        Returns
+        -------
+        array
+            3 x 4 x (tmax - 1), with the scenario axes of df after that
+        """
+        args = (df.mass_atmosphere[:-1], df.mass_upper[:-1],
+                df.mass_lower[:-1], df.emissions_total[:-1])
+        if self.params.beam_integrator == 'implicit':
+            return beam.implicit(*args, tol=self.params.beam_tol, keep=1,
+                                 jacobians=True)[3]
+        return beam.explicit_jacobians(*args, n=self.params.beam_substeps)
+
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate adjoints of M_AT, M_UP, M_LO at t to M_AT, M_UP, M_LO
+        and E at t-1. Jacobians for all periods are found on the first call
+        for df, see transfer_jacobians().
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        if i == 0:
+            return
+        if self._jacobians is None or self._jacobians[0] is not df:
+            self._jacobians = df, self.transfer_jacobians(df)
+        a = np.array([
+            adj.mass_atmosphere[i], adj.mass_upper[i], adj.mass_lower[i]])
+        i -= 1
+        a = (self._jacobians[1][:, :, i] * a[:, np.newaxis]).sum(axis=0)
+        adj.mass_atmosphere[i] += a[0]
+        adj.mass_upper[i] += a[1]
+        adj.mass_lower[i] += a[2]
+        adj.emissions_total[i] += a[3]
 
 
 class LinearCarbon(CarbonModel):
@@ -264,9 +355,15 @@ class LinearCarbon(CarbonModel):
     def forcing(self, i, df):
         return None
 
+    def get_model_adjoints(self, i, df, adj):
+        pass
+
+    def forcing_adjoints(self, i, df, adj):
+        pass
+
 
 class Dice2010(CarbonModel):
-    @property
+    @exogenous
     def forcing_ghg(self):
         """
         F_EX, Exogenous forcing for other greenhouse gases
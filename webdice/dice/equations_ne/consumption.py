@@ -15,6 +15,7 @@ class ConsumptionModel(object):
     Methods
     -------
     get_model_values()
+    get_model_adjoints()
     consumption_pc()
     discount_factor()
     investment()
@@ -49,6 +50,27 @@ class ConsumptionModel(object):
             self.investment(self.params.savings, df.output[i]),
         )
 
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate adjoints of C, c and I at t to net output at t. Discount
+        rates are reported only and do not enter welfare.
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        savings = self.params.savings
+        a = adj.consumption[i] + adj.consumption_pc[i] / df.population[i]
+        adj.output[i] += a * (1.0 - savings)
+        if i > 0:
+            adj.output[i] += adj.investment[i] * savings
+
     def consumption(self, output, savings):
         """
         C, Consumption, trillions $USD
@@ -1,6 +1,7 @@
 from __future__ import division
 import numpy as np
 import numexpr as ne
+from webdice.dice.params import exogenous
 
 
 class DamagesModel(object):
@@ -17,7 +18,7 @@ class DamagesModel(object):
         self._temp_atmosphere = None
         self._aa = None
 
-    @property
+    @exogenous
     def participation(self):
         """
         phi, Fraction of emissions in control regime
@@ -37,7 +38,7 @@ class DamagesModel(object):
             ))
         return np.ones(self.params.tmax)
 
-    @property
+    @exogenous
     def damages_terms(self):
         """
         temp coefficient; pi_2, temp squared coefficient;
@@ -76,7 +77,8 @@ class DamagesModel(object):
         array
         """
         if i == 0:
-            df.participation = np.tile(self.participation, (61, 1)).transpose()
+            df.participation = np.tile(
+                self.participation, (df.shape[-1], 1)).transpose()
         abatement = self.abatement(df.gross_output[i], df.miu[i],
                                    df.backstop_growth[i],
                                    df.participation[i])
@@ -135,6 +137,91 @@ class DamagesModel(object):
         """
         return ne.evaluate('abatement / gross_output * 100')
 
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate adjoints of abatement, damages and net output at t to
+        gross output, temperature and miu at t
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        go = df.gross_output[i]
+        ta = df.temp_atmosphere[i]
+        ab = df.abatement[i]
+        q_go, q_dm, q_ab, q_ta = self.output_partials(
+            go, df.damages[i], ab, ta)
+        d_go, d_ab, d_ta = self.damages_partials(go, ta, ab)
+        ab_go, ab_miu = self.abatement_partials(
+            go, df.miu[i], df.backstop_growth[i], df.participation[i])
+        a_q = adj.output[i]
+        a_dm = adj.damages[i] + a_q * q_dm
+        a_ab = adj.abatement[i] + a_q * q_ab + a_dm * d_ab
+        adj.gross_output[i] += a_q * q_go + a_dm * d_go + a_ab * ab_go
+        adj.temp_atmosphere[i] += a_q * q_ta + a_dm * d_ta
+        adj.miu[i] += a_ab * ab_miu
+
+    def abatement_partials(self, gross_output, miu, backstop_growth,
+                           participation):
+        """
+        Derivatives of abatement costs
+        ...
+        Returns
+        -------
+        tuple
+            dLambda/dY, dLambda/dmiu
+        """
+        ae = self.params.abatement_exponent
+        cost = participation ** (1 - ae) * backstop_growth
+        capped = gross_output * cost * miu ** ae >= gross_output
+        return (
+            np.where(capped, 1., cost * miu ** ae),
+            np.where(capped, 0., ae * gross_output * cost * miu ** (ae - 1)),
+        )
+
+    def damages_partials(self, gross_output, temp_atmosphere, abatement=None):
+        """
+        Derivatives of damages
+        ...
+        Returns
+        -------
+        tuple
+            dOmega/dY, dOmega/dLambda, dOmega/dT_AT
+        """
+        a1, a2, a3 = self.damages_terms
+        g = 1 + a1 * temp_atmosphere + a2 * temp_atmosphere ** a3
+        dg = a1 + a2 * a3 * temp_atmosphere ** (a3 - 1)
+        return 1 - 1 / g, 0, gross_output * dg / g ** 2
+
+    def output_partials(self, gross_output, damages, abatement,
+                        temp_atmosphere=None):
+        """
+        Derivatives of net output
+        ...
+        Returns
+        -------
+        tuple
+            dQ/dY, dQ/dOmega, dQ/dLambda, dQ/dT_AT
+        """
+        return (
+            1 - abatement * damages / gross_output ** 2,
+            abatement / gross_output - 1,
+            damages / gross_output - 1,
+            0,
+        )
+
+    def production_factor_derivative(self, temp_atmosphere):
+        """
+        Derivative of the fraction of productivity with respect to T_AT
+        """
+        return 0.
+
 
 class Dice2007(DamagesModel):
     """
@@ -154,6 +241,12 @@ class ExponentialMap(DamagesModel):
             self.damages_terms[1] * temp_atmosphere ** self.damages_terms[2])
         ))
 
+    def damages_partials(self, gross_output, temp_atmosphere, abatement=None):
+        a1, a2, a3 = self.damages_terms
+        e = np.exp(-(a1 * temp_atmosphere + a2 * temp_atmosphere ** a3))
+        dg = a1 + a2 * a3 * temp_atmosphere ** (a3 - 1)
+        return 1 - e, 0, gross_output * e * dg
+
 
 class IncommensurableDamages(DamagesModel):
     """
@@ -180,7 +273,8 @@ class IncommensurableDamages(DamagesModel):
         array
         """
         if index == 0:
-            df.participation = np.tile(self.participation, (61, 1))
+            df.participation = np.tile(
+                self.participation, (df.shape[-1], 1)).transpose()
         _go = df.gross_output[index]
         _miu = df.miu[index]
         _bg = df.backstop_growth[index]
@@ -203,6 +297,25 @@ class IncommensurableDamages(DamagesModel):
                              temp_atmosphere)
         return ne.evaluate('(gross_output - abatement) - output')
 
+    def output_partials(self, gross_output, damages, abatement,
+                        temp_atmosphere=None):
+        C25d = 1.4797e-05
+        savings = self.params.savings
+        a3 = self.damages_terms[2]
+        z = (gross_output - abatement) * (1 - savings)
+        dz = 1 / ((1 + z * C25d * temp_atmosphere ** a3) ** 2 * (1 - savings))
+        return (
+            (1 - savings) * dz,
+            0,
+            -(1 - savings) * dz,
+            -z ** 2 * C25d * a3 * temp_atmosphere ** (a3 - 1) * dz,
+        )
+
+    def damages_partials(self, gross_output, temp_atmosphere, abatement=None):
+        q_go, q_dm, q_ab, q_ta = self.output_partials(
+            gross_output, 0, abatement, temp_atmosphere)
+        return 1 - q_go, -1 - q_ab, -q_ta
+
 
 class TippingPoint(DamagesModel):
     """
@@ -211,6 +324,13 @@ class TippingPoint(DamagesModel):
     def damages(self, gross_output, temp_atmosphere, a_abatement=None):
         return ne.evaluate('gross_output * (1 - 1 / (1 + (temp_atmosphere / 20.46) ** 2 + ((temp_atmosphere / 6.081) ** 6.754)))')
 
+    def damages_partials(self, gross_output, temp_atmosphere, abatement=None):
+        g = 1 + (temp_atmosphere / 20.46) ** 2 + (
+            (temp_atmosphere / 6.081) ** 6.754)
+        dg = 2 * temp_atmosphere / 20.46 ** 2 + (
+            6.754 / 6.081 * (temp_atmosphere / 6.081) ** 5.754)
+        return 1 - 1 / g, 0, gross_output * dg / g ** 2
+
 
 class ProductivityFraction(DamagesModel):
     """
@@ -223,6 +343,15 @@ class ProductivityFraction(DamagesModel):
         a3 = self.damages_terms[2]
         return ne.evaluate('gross_output * (1 - 1 / (1 + a1 * temp_atmosphere + a2 * temp_atmosphere ** a3) / fD)')
 
+    def damages_partials(self, gross_output, temp_atmosphere, abatement=None):
+        a1, a2, a3 = self.damages_terms
+        g = 1 + a1 * temp_atmosphere + a2 * temp_atmosphere ** a3
+        dg = a1 + a2 * a3 * temp_atmosphere ** (a3 - 1)
+        fD = self.get_production_factor(temp_atmosphere)
+        h = g * fD
+        dh = dg * fD + g * self.production_factor_derivative(temp_atmosphere)
+        return 1 - 1 / h, 0, gross_output * dh / h ** 2
+
     def get_production_factor(self, temp_atmosphere):
         """
         Calculate fraction of productivity
@@ -242,6 +371,12 @@ class ProductivityFraction(DamagesModel):
         pf = self.params.prod_frac
         return ne.evaluate('1 - pf * (1 - 1 / (1 + a1 * temp_atmosphere + a2 * temp_atmosphere ** a3))')
 
+    def production_factor_derivative(self, temp_atmosphere):
+        a1, a2, a3 = self.damages_terms
+        g = 1 + a1 * temp_atmosphere + a2 * temp_atmosphere ** a3
+        dg = a1 + a2 * a3 * temp_atmosphere ** (a3 - 1)
+        return -self.params.prod_frac * dg / g ** 2
+
 
 class Dice2010(DamagesModel):
     pass
\ No newline at end of file
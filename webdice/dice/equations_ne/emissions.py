@@ -1,6 +1,7 @@
 from __future__ import division
 import numpy as np
 import numexpr as ne
+from webdice.dice.params import exogenous
 
 
 class EmissionsModel(object):
@@ -19,6 +20,7 @@ class EmissionsModel(object):
     Methods
     -------
     get_model_values()
+    get_model_adjoints()
     emissions_ind()
     emissions_total()
     carbon_emitted()
@@ -29,7 +31,7 @@ class EmissionsModel(object):
     def __init__(self, params):
         self.params = params
 
-    @property
+    @exogenous
     def emissions_deforest(self):
         """
         E_land, Emissions from deforestation
@@ -43,7 +45,7 @@ class EmissionsModel(object):
             (1 - .1) ** self.params.t0
         )
 
-    @property
+    @exogenous
     def emissions_cap(self):
         """
         Emissions caps from treaty inputs
@@ -59,7 +61,7 @@ class EmissionsModel(object):
             (np.ones(45) * (1 - self.params.e2150)),
         ))
 
-    @property
+    @exogenous
     def user_tax_rate(self):
         """
         Optional user-defined carbon tax
@@ -101,6 +103,35 @@ class EmissionsModel(object):
             tax_rate,
         )
 
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate adjoints of E_ind, E and cumulative emissions at t to
+        miu and gross output at t, and to cumulative emissions at t-1.
+        Once the fossil fuel limit is reached E and cumulative emissions
+        are constant, so nothing propagates.
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        carbon_emitted = (
+            df.emissions_ind[i] + self.emissions_deforest[i]) * 10
+        if i > 0:
+            carbon_emitted = carbon_emitted + df.carbon_emitted[i - 1]
+        a_e = adj.emissions_ind[i]
+        if np.max(carbon_emitted) <= self.params.fosslim:
+            a_e = a_e + adj.emissions_total[i] + 10 * adj.carbon_emitted[i]
+            if i > 0:
+                adj.carbon_emitted[i - 1] += adj.carbon_emitted[i]
+        adj.miu[i] -= a_e * df.carbon_intensity[i] * df.gross_output[i]
+        adj.gross_output[i] += a_e * df.carbon_intensity[i] * (1 - df.miu[i])
+
     def emissions_ind(self, intensity, miu, gross_output):
         """
         E_ind, Industrial emissions, GtC
@@ -205,7 +236,7 @@ class Dice2007(EmissionsModel):
 
 
 class Dice2010(EmissionsModel):
-    @property
+    @exogenous
     def emissions_deforest(self):
         """
         E_land, Emissions from deforestation
@@ -1,6 +1,7 @@
 from __future__ import division
 import numpy as np
 import numexpr as ne
+from webdice.dice.params import exogenous
 
 
 class ProductivityModel(object):
@@ -21,13 +22,14 @@ class ProductivityModel(object):
     Methods
     -------
     get_model_values()
+    get_model_adjoints()
     capital()
     gross_output()
     """
     def __init__(self, params):
         self.params = params
 
-    @property
+    @exogenous
     def backstop(self):
         """
         Cost of replacing clean energy
@@ -43,14 +45,14 @@ class ProductivityModel(object):
                 )) / self.params.backstop_ratio
         )
 
-    @property
+    @exogenous
     def population_growth_rate(self):
         return (
             (np.exp(self.params.population_growth * self.params.t0) - 1) /
             (np.exp(self.params.population_growth * self.params.t0))
         )
 
-    @property
+    @exogenous
     def productivity_growth(self):
         """
         A_g, Growth rate of total factor productivity.
@@ -63,6 +65,45 @@ class ProductivityModel(object):
             -self.params.productivity_decline * 10 * self.params.t0
         )
 
+    @exogenous
+    def population_path(self):
+        """
+        L, Population
+        ...
+        Returns
+        -------
+        array
+        """
+        return self.population(self.population_growth_rate, None)
+
+    @exogenous
+    def intensity_decline_path(self):
+        """
+        sigma_g, Rate of decline of carbon intensity
+        ...
+        Returns
+        -------
+        array
+        """
+        return self.intensity_decline(self.params.t0, None)
+
+    @exogenous
+    def carbon_intensity_path(self):
+        """
+        sigma, Carbon intensity, carbon_intensity() applied as a running
+        quotient
+        ...
+        Returns
+        -------
+        array
+        """
+        decline = self.intensity_decline_path
+        steps = np.ones(
+            np.broadcast(decline, self.params.intensity_2005).shape)
+        steps[0] = self.params.intensity_2005
+        steps[1:] = 1 - decline[1:]
+        return np.divide.accumulate(steps)
+
     def population(self, population_growth_rate, population_prev):
         """
         L, Population.
@@ -88,11 +129,8 @@ class ProductivityModel(object):
     def get_model_values(self, i, df):
         if i > 0:
             ii = i - 1
-            idp = df.intensity_decline[ii]
-            intensity_decline = self.intensity_decline(i, idp)
-            carbon_intensity = self.carbon_intensity(
-                df.carbon_intensity[ii], intensity_decline,
-                idp)
+            intensity_decline = self.intensity_decline_path[i]
+            carbon_intensity = self.carbon_intensity_path[i]
             pg = self.productivity_growth[ii]
             p = df.productivity[ii]
             productivity = ne.evaluate('p / (1 - pg)')
@@ -100,8 +138,7 @@ class ProductivityModel(object):
                 df.capital[ii], self.params.depreciation,
                 df.investment[ii]
             )
-            population = self.population(
-                self.population_growth_rate[i], df.population[ii])
+            population = self.population_path[i]
             gross_output = self.gross_output(
                 productivity, capital, self.params.output_elasticity,
                 population
@@ -129,6 +166,40 @@ class ProductivityModel(object):
             population,
         )
 
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate adjoints of gross output, capital and productivity at t to
+        capital, investment and productivity at t-1. adj.productivity[t]
+        holds the adjoint of productivity before damages to productivity
+        are applied, see Dice.step_adjoint().
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        if i == 0:
+            return
+        ii = i - 1
+        pg = self.productivity_growth[ii]
+        productivity = df.productivity[ii] / (1 - pg)
+        gamma = self.params.output_elasticity
+        labor = (df.population[i] * 1000) ** (1 - gamma)
+        a_go = adj.gross_output[i]
+        adj.capital[i] += (
+            a_go * gamma * productivity * df.capital[i] ** (gamma - 1) * labor)
+        adj.productivity[ii] += (
+            adj.productivity[i] + a_go * df.capital[i] ** gamma * labor
+        ) / (1 - pg)
+        adj.capital[ii] += (
+            adj.capital[i] * (1 - self.params.depreciation) ** 10)
+        adj.investment[ii] += 10 * adj.capital[i]
+
     def capital(self, capital, depreciation, investment):
         """
         K(t), Capital, trillions $USD
@@ -156,6 +227,55 @@ class Dice2007(ProductivityModel):
 
 
 class Dice2010(ProductivityModel):
+    @exogenous
+    def intensity_decline_path(self):
+        """
+        sigma_g, Rate of decline of carbon intensity, intensity_decline()
+        applied as a running product
+        ...
+        Returns
+        -------
+        array
+        """
+        steps = self.intensity_decline(self.params.t0, 1.) * np.ones(
+            np.broadcast(self.params.t0, self.params.intensity_growth).shape)
+        steps[0] = self.params.intensity_growth
+        return np.multiply.accumulate(steps)
+
+    @exogenous
+    def carbon_intensity_path(self):
+        """
+        sigma, Carbon intensity, carbon_intensity() applied as a running
+        product
+        ...
+        Returns
+        -------
+        array
+        """
+        decline = self.intensity_decline_path
+        steps = np.ones(
+            np.broadcast(decline, self.params.intensity_2005).shape)
+        steps[0] = self.params.intensity_2005
+        steps[1:] = 1 - decline[:-1]
+        return np.multiply.accumulate(steps)
+
+    @exogenous
+    def population_path(self):
+        """
+        L, Population. The recurrence has no exact closed form in floating
+        point, so population() is stepped once per set of parameters.
+        ...
+        Returns
+        -------
+        array
+        """
+        population = np.empty(np.broadcast(
+            self.params.t0, self.params.population_2005).shape)
+        population[0] = self.params.population_2005
+        for i in xrange(1, len(population)):
+            population[i] = self.population(None, population[i - 1])
+        return population
+
     def intensity_decline(self, i, intensity_decline_prev):
         """
         sigma_g, Rate of decline of carbon intensity
@@ -170,7 +290,7 @@ class Dice2010(ProductivityModel):
             )
         ) ** 10
 
-    @property
+    @exogenous
     def productivity_growth(self):
         """
         A_g, Growth rate of total factor productivity.
@@ -212,11 +332,8 @@ class DiceBackstop2013(Dice2010):
     def get_model_values(self, i, df):
         if i > 0:
             ii = i - 1
-            idp = df.intensity_decline[ii]
-            intensity_decline = self.intensity_decline(i, idp)
-            carbon_intensity = self.carbon_intensity(
-                df.carbon_intensity[ii], intensity_decline,
-                idp)
+            intensity_decline = self.intensity_decline_path[i]
+            carbon_intensity = self.carbon_intensity_path[i]
             pg = self.productivity_growth[ii]
             p = df.productivity[ii]
             productivity = ne.evaluate('p / (1 - pg)')
@@ -224,8 +341,7 @@ class DiceBackstop2013(Dice2010):
                 df.capital[ii], self.params.depreciation,
                 df.investment[ii]
             )
-            population = self.population(
-                self.population_growth_rate[i], df.population[ii])
+            population = self.population_path[i]
             gross_output = self.gross_output(
                 productivity, capital, self.params.output_elasticity,
                 population
@@ -15,6 +15,8 @@ class TemperatureModel(object):
     -------
     get_model_values()
         Return values for T_AT, T_OCEAN
+    get_model_adjoints()
+        Propagate adjoints of T_AT, T_OCEAN back one step
     temp_atmosphere()
         Calculate T_AT at t
     temp_lower()
@@ -47,6 +49,33 @@ class TemperatureModel(object):
                             df.temp_lower[i],)
         )
 
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate adjoints of T_AT, T_OCEAN at t to F at t and to
+        T_AT, T_OCEAN at t-1
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        if i == 0:
+            return
+        ff = (self.params.forcing_co2_doubling / self.params.temp_co2_doubling)
+        c1 = self.params.thermal_transfer[0]
+        c3 = self.params.thermal_transfer[2]
+        c4 = self.params.thermal_transfer[3]
+        a_ta = adj.temp_atmosphere[i]
+        a_tl = adj.temp_lower[i]
+        adj.forcing[i] += c1 * a_ta
+        adj.temp_atmosphere[i - 1] += a_ta * (1 - c1 * (ff + c3)) + a_tl * c4
+        adj.temp_lower[i - 1] += a_ta * c1 * c3 + a_tl * (1 - c4)
+
     def temp_atmosphere(self, ta, tl, f):
         """
         T_AT, Temperature of atmosphere, degrees C
@@ -93,6 +122,18 @@ class LinearTemperature(TemperatureModel):
             None
         )
 
+    def get_model_adjoints(self, i, df, adj):
+        if i == 0:
+            return
+        t2c = self.params.temp_co2_doubling
+        mpi = self.params.mass_preindustrial
+        ma0 = self.params.mass_atmosphere_2005
+        mu0 = self.params.mass_upper_2005
+        phi1 = self.params.carbon_matrix[0][0]
+        phi2 = self.params.carbon_matrix[1][0]
+        adj.carbon_emitted[i - 1] += adj.temp_atmosphere[i] * (
+            t2c / ((2 * mpi - ma0 * phi1 - mu0 * phi2) * 1e-3)) * 1e-3
+
 
 class Dice2010(TemperatureModel):
     pass
\ No newline at end of file
@@ -1,5 +1,6 @@
 from __future__ import division
 import numexpr as ne
+from webdice.dice.params import exogenous
 
 
 class UtilityModel(object):
@@ -14,13 +15,14 @@ class UtilityModel(object):
     Methods
     -------
     get_model_values()
+    get_model_adjoints()
     utility()
     utility_discounted()
     """
     def __init__(self, params):
         self.params = params
 
-    @property
+    @exogenous
     def utility_discount(self):
         """
         R, Average utility discount rate
@@ -40,6 +42,27 @@ class UtilityModel(object):
             )
         )
 
+    def get_model_adjoints(self, i, df, adj):
+        """
+        Propagate welfare adjoints of U and discounted U at t to c at t
+        ...
+        Args
+        ----
+        i : int
+        df : DiceDataMatrix
+        adj : DiceDataMatrix, adjoints of welfare for each model variable
+        ...
+        Returns
+        -------
+        None
+        """
+        a = adj.utility[i] + (
+            adj.utility_discounted[i] * self.utility_discount[i] *
+            df.population[i]
+        )
+        adj.consumption_pc[i] += (
+            a * df.consumption_pc[i] ** -self.params.elasmu)
+
     def utility(self, consumption_pc):
         """
         U, Period utility function
@@ -0,0 +1,309 @@
+from __future__ import division
+from collections import OrderedDict
+import numpy as np
+
+# Welfare is maximized; the backends minimize it at this scale, which is
+# the obj_scaling_factor IPOPT has always been given.
+OBJ_SCALE = -1e3
+
+
+class EvaluationCache(object):
+    """Results at recently evaluated miu, keyed on the exact bytes of miu
+
+    Each entry keeps the objective, the gradient and the forward pass the
+    gradient is computed from (Dice.opt_df, for adjoint gradients), so
+    an optimizer going back to an earlier trial point doesn't simulate it
+    again. The least recently used entry is dropped beyond `size`.
+    """
+    def __init__(self, size=16):
+        self.size = size
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(x):
+        return np.ascontiguousarray(x, dtype=float).tobytes()
+
+    def get(self, x):
+        """Entry for x, added empty if x isn't cached, as the most
+        recently used."""
+        key = self.key(x)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            entry = dict(obj=None, grad=None, state=None)
+        self._entries[key] = entry
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def knot_basis(n, knots):
+    """Piecewise-linear interpolation from evenly spaced knots
+
+    Args:
+        n (int): Number of periods
+        knots (int): Number of knots, at least 2, the first and last at
+            the first and last period
+
+    Returns:
+        nd.array: n x knots matrix taking knot values to period values
+    """
+    positions = np.linspace(0, n - 1, knots)
+    return np.array([
+        np.interp(np.arange(n), positions, e) for e in np.eye(knots)]).T
+
+
+class Objective(object):
+    """Welfare and its gradient as functions of the free values of miu,
+    for the optimizers
+
+    Periods where the bounds of miu meet are fixed at that value and left
+    out, so optimizers only see the free periods; expand() maps their
+    values back to the full miu. With `knots`, the free periods are
+    interpolated linearly between that many knots, and the optimizers see
+    the knot values instead. Every period is then between two knots, so
+    bounds on the knots keep it within its own bounds.
+
+    Every backend evaluates the same Dice objective and gradient loops
+    (adjoint or finite differences, per Dice.opt_grad), counting the calls
+    in stats. Results are kept in an EvaluationCache, keyed on the full
+    miu, so each distinct miu is simulated at most once while it stays in
+    the cache, whichever Objective asks for it. stats also counts cache
+    hits and misses, and simulations, the forward passes actually run.
+
+    Args:
+        dice (Dice): Model to optimize
+        stats (dict): Counts, from Dice.opt_stats
+        xl, xu (nd.array): Lower and upper bounds of the full miu
+
+    Kwargs:
+        knots (int): Number of knots, default one value per free period
+        cache (EvaluationCache): Cache to share, default a new one
+    """
+    def __init__(self, dice, stats, xl, xu, knots=None, cache=None):
+        self.dice = dice
+        self.stats = stats
+        self.free = np.flatnonzero(xl < xu)
+        self.fixed = np.asarray(xl, dtype=float).copy()
+        self.cache = EvaluationCache() if cache is None else cache
+        self.basis = None
+        self.xl, self.xu = xl[self.free], xu[self.free]
+        if knots is not None:
+            self.basis = knot_basis(len(self.free), knots)
+            support = [np.flatnonzero(b) for b in self.basis.T]
+            self.xl = np.array([self.xl[k].max() for k in support])
+            self.xu = np.array([self.xu[k].min() for k in support])
+        for k in ('cache_hits', 'cache_misses', 'simulations'):
+            stats.setdefault(k, 0)
+        if dice.opt_grad == 'adjoint':
+            self.obj_loop = dice.adjoint_obj_loop
+            self.grad_loop = dice.adjoint_grad_loop
+        else:
+            self.obj_loop, self.grad_loop = dice.obj_loop, dice.grad_loop
+
+    def expand(self, x):
+        """Full miu for values of the free periods, or of the knots."""
+        miu = self.fixed.copy()
+        miu[self.free] = x if self.basis is None else self.basis.dot(x)
+        return miu
+
+    def reduce(self, miu):
+        """Values of the free periods of a full miu, or of the knots that
+        fit them best, within the bounds."""
+        x = np.asarray(miu, dtype=float)[self.free]
+        if self.basis is not None:
+            x = np.linalg.lstsq(self.basis, x, rcond=None)[0]
+        return np.clip(x, self.xl, self.xu)
+
+    def _evaluate(self, x, field, loop):
+        miu = self.expand(x)
+        entry = self.cache.get(miu)
+        if entry[field] is not None:
+            self.stats['cache_hits'] += 1
+            return entry[field]
+        self.stats['cache_misses'] += 1
+        if entry['state'] is None:
+            self.stats['simulations'] += 1
+        dice = self.dice
+        # Hand the loops what is already known at miu, so the adjoint
+        # gradient reuses the forward pass of the objective.
+        dice.opt_obj, dice.opt_grad_f, dice.opt_df = (
+            entry['obj'], entry['grad'], entry['state'])
+        loop(miu)
+        for k, v in (('obj', dice.opt_obj), ('grad', dice.opt_grad_f),
+                     ('state', dice.opt_df)):
+            if v is not None:
+                entry[k] = v
+        return entry[field]
+
+    def value(self, x):
+        self.stats['f_evals'] += 1
+        return self._evaluate(x, 'obj', self.obj_loop)
+
+    def gradient(self, x):
+        self.stats['grad_evals'] += 1
+        grad = self._evaluate(x, 'grad', self.grad_loop)[self.free]
+        return grad if self.basis is None else self.basis.T.dot(grad)
+
+
+class Optimizer(object):
+    """Maximizes welfare over miu within bounds
+
+    Subclasses implement solve(). Statuses are IPOPT's return codes: 0
+    solved, 1 solved to an acceptable level, -1 out of iterations, and
+    anything else a failure.
+
+    Args:
+        max_iter (int): Most iterations
+        tol (float): Convergence tolerance
+        max_cpu_time (float): Most seconds, where the backend supports it
+    """
+    name = None
+    requires = None
+
+    def __init__(self, max_iter=30, tol=1e-5, max_cpu_time=60.):
+        self.max_iter = max_iter
+        self.tol = tol
+        self.max_cpu_time = max_cpu_time
+
+    @classmethod
+    def available(cls):
+        """Whether the backend's dependencies are installed."""
+        return True
+
+    def solve(self, objective, x0, xl, xu):
+        """Optimal miu
+
+        Args:
+            objective (Objective): Welfare and gradient
+            x0 (nd.array): Starting values, within the bounds
+            xl, xu (nd.array): Lower and upper bounds
+
+        Returns:
+            tuple: Optimal values, status and number of iterations (None
+                if the backend doesn't report it)
+        """
+        raise NotImplementedError
+
+
+class IpoptOptimizer(Optimizer):
+    """IPOPT, through pyipopt, with a limited-memory Hessian"""
+    name = 'ipopt'
+    requires = 'pyipopt'
+    linear_solver = 'ma57'
+
+    @classmethod
+    def available(cls):
+        try:
+            import pyipopt
+        except ImportError:
+            return False
+        return True
+
+    def solve(self, objective, x0, xl, xu):
+        import pyipopt
+        M = 0
+        nnzj = 0
+        nnzh = 0
+        gl = np.zeros(M)
+        gu = np.ones(M) * 4.0
+
+        def eval_g(x):
+            return np.zeros(M)
+
+        def eval_jac_g(x, flag):
+            if flag:
+                return [], []
+            else:
+                return np.empty(M)
+
+        pyipopt.set_loglevel(1)
+        nlp = pyipopt.create(
+            len(x0), xl, xu, M, gl, gu, nnzj, nnzh, objective.value,
+            objective.gradient, eval_g, eval_jac_g,
+        )
+        nlp.num_option('constr_viol_tol', 8e-7)
+        nlp.int_option('max_iter', self.max_iter)
+        nlp.num_option('max_cpu_time', self.max_cpu_time)
+        nlp.num_option('tol', self.tol)
+        nlp.num_option('obj_scaling_factor', OBJ_SCALE)
+        nlp.int_option('print_level', 0)
+        nlp.str_option('linear_solver', self.linear_solver)
+        solution = nlp.solve(x0)
+        nlp.close()
+        return solution[0], int(solution[-1]), None
+
+
+class ScipyOptimizer(Optimizer):
+    """L-BFGS-B from scipy.optimize, a bound-constrained quasi-Newton method
+    in pure Python and Fortran, for nodes without IPOPT
+
+    Stops when the scaled objective changes by less than tol relative to
+    its size, or every projected gradient entry is below tol. max_cpu_time
+    is not enforced.
+    """
+    name = 'scipy'
+    requires = 'scipy'
+
+    def __init__(self, max_iter=100, tol=1e-5, max_cpu_time=60.):
+        super(ScipyOptimizer, self).__init__(max_iter, tol, max_cpu_time)
+
+    @classmethod
+    def available(cls):
+        try:
+            import scipy.optimize
+        except ImportError:
+            return False
+        return True
+
+    def solve(self, objective, x0, xl, xu):
+        from scipy.optimize import minimize
+        result = minimize(
+            lambda x: OBJ_SCALE * objective.value(x), x0,
+            jac=lambda x: OBJ_SCALE * np.asarray(objective.gradient(x)),
+            method='L-BFGS-B', bounds=list(zip(xl, xu)),
+            options=dict(maxiter=self.max_iter, ftol=self.tol * 1e-3,
+                         gtol=self.tol),
+        )
+        if result.success:
+            status = 0
+        elif result.status == 1:
+            status = -1
+        else:
+            # Line search failed; IPOPT's Error_In_Step_Computation
+            status = -3
+        return result.x, status, int(result.nit)
+
+
+BACKENDS = dict((b.name, b) for b in (IpoptOptimizer, ScipyOptimizer))
+
+
+def get_optimizer(name='auto', **options):
+    """Optimizer backend by name
+
+    Args:
+        name (str): 'ipopt', 'scipy', or 'auto' for IPOPT when pyipopt is
+            installed and scipy otherwise
+        **options: Passed on to the backend
+
+    Returns:
+        Optimizer: The backend
+
+    Raises:
+        ImportError: If the backend's dependencies aren't installed
+    """
+    if name == 'auto':
+        name = next((n for n in ('ipopt', 'scipy')
+                     if BACKENDS[n].available()), 'ipopt')
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError('Unknown optimizer {}, use one of {}.'.format(
+            name, sorted(BACKENDS) + ['auto']))
+    if not cls.available():
+        raise ImportError(
+            'The {} optimizer needs {}, which is not installed. Install it '
+            'or choose another optimizer.'.format(name, cls.requires))
+    return cls(**options)
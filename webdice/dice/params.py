@@ -1,86 +1,125 @@
 from __future__ import division
+import copy
+import functools
+import itertools
 import numpy as np
 
+_revisions = itertools.count()
+
+
+def exogenous(func):
+    """Cached property for a path that depends only on parameters
+
+    The path is computed on first use and kept until any parameter is
+    assigned again, so model properties indexed inside step() don't
+    rebuild the whole array every period. Array parameters are read-only,
+    so they can't change without an assignment. The returned array is
+    shared, so callers must not modify it.
+
+    Args:
+        func (function): Model method computing the path from self.params
+
+    Returns:
+        property: Cached path
+
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def path(self):
+        cache = self.__dict__.setdefault('_paths', {})
+        revision = self.params._revision
+        if name not in cache or cache[name][0] != revision:
+            cache[name] = revision, func(self)
+        return cache[name][1]
+    return property(path)
+
+
+def rebind(model, params, revision):
+    """Point a model at another params object with the same fingerprint
+
+    Exogenous paths the model computed at `revision` of its old params hold
+    for the new params too, so they are kept; paths computed after a later
+    assignment are dropped.
+
+    Args:
+        model (object): Equation model with a params attribute
+        params (DiceParams): New params, equal to the old ones at revision
+        revision (int): Revision of the old params the model was built at
+
+    Returns:
+        None
+
+    """
+    paths = model.__dict__.get('_paths', {})
+    for name, (rev, path) in paths.items():
+        if rev == revision:
+            paths[name] = params._revision, path
+        else:
+            del paths[name]
+    model.params = params
+
 
 class DiceDataMatrix(np.ndarray):
-    def __new__(cls, input_array):
-        obj = np.asarray(input_array).view(cls)
-        obj.abatement = input_array[0]
-        obj.backstop = input_array[1]
-        obj.backstop_growth = input_array[2]
-        obj.capital = input_array[3]
-        obj.carbon_emitted = input_array[4]
-        obj.carbon_intensity = input_array[5]
-        obj.consumption = input_array[6]
-        obj.consumption_pc = input_array[8]
-        obj.damages = input_array[9]
-        obj.discount_factor = input_array[7]
-        obj.discount_forward = input_array[32]
-        obj.discount_rate = input_array[33]
-        obj.emissions_ind = input_array[10]
-        obj.emissions_total = input_array[11]
-        obj.forcing = input_array[12]
-        obj.gross_output = input_array[13]
-        obj.intensity_decline = input_array[14]
-        obj.investment = input_array[15]
-        obj.mass_atmosphere = input_array[16]
-        obj.mass_upper = input_array[17]
-        obj.mass_lower = input_array[18]
-        obj.miu = input_array[19]
-        obj.output = input_array[20]
-        obj.output_abate = input_array[21]
-        obj.participation = input_array[22]
-        obj.population = input_array[23]
-        obj.population_growth = input_array[24]
-        obj.productivity = input_array[25]
-        obj.scc = input_array[26]
-        obj.tax_rate = input_array[27]
-        obj.temp_atmosphere = input_array[28]
-        obj.temp_lower = input_array[29]
-        obj.utility = input_array[30]
-        obj.utility_discounted = input_array[31]
-        return obj
+    """Model variables, one named row per variable
+
+    Rows are named through the index map in `rows`, so df.miu is df[19].
+    Every matrix, including slices and copies of another one, binds its
+    own rows as plain ndarray views, never inheriting bindings from its
+    parent. Because the rows are not DiceDataMatrix, indexing or slicing
+    them costs the same as for any ndarray. Axes after the time axis, such
+    as ensemble scenarios, carry through to every row.
+
+    Args:
+        input_array (array_like): 34 x tmax (x ...) values
+        dtype (dtype): Storage type, e.g. np.float32, default that of
+            input_array
+
+    """
+    names = (
+        'abatement', 'backstop', 'backstop_growth', 'capital',
+        'carbon_emitted', 'carbon_intensity', 'consumption',
+        'discount_factor', 'consumption_pc', 'damages', 'emissions_ind',
+        'emissions_total', 'forcing', 'gross_output', 'intensity_decline',
+        'investment', 'mass_atmosphere', 'mass_upper', 'mass_lower', 'miu',
+        'output', 'output_abate', 'participation', 'population',
+        'population_growth', 'productivity', 'scc', 'tax_rate',
+        'temp_atmosphere', 'temp_lower', 'utility', 'utility_discounted',
+        'discount_rate', 'discount_forward',
+    )
+    rows = dict((name, row) for row, name in enumerate(names))
+
+    def __new__(cls, input_array, dtype=None):
+        return np.asarray(input_array, dtype=dtype).view(cls)
 
     def __array_finalize__(self, obj):
-        if obj is None: return
-        self.abatement = getattr(obj, 'abatement', None)
-        self.backstop = getattr(obj, 'backstop', None)
-        self.backstop_growth = getattr(obj, 'backstop_growth', None)
-        self.capital = getattr(obj, 'capital', None)
-        self.carbon_emitted = getattr(obj, 'carbon_emitted', None)
-        self.carbon_intensity = getattr(obj, 'carbon_intensity', None)
-        self.consumption = getattr(obj, 'consumption', None)
-        self.discount_factor = getattr(obj, 'discount_factor', None)
-        self.consumption_pc = getattr(obj, 'consumption_pc', None)
-        self.damages = getattr(obj, 'damages', None)
-        self.emissions_ind = getattr(obj, 'emissions_ind', None)
-        self.emissions_total = getattr(obj, 'emissions_total', None)
-        self.forcing = getattr(obj, 'forcing', None)
-        self.gross_output = getattr(obj, 'gross_output', None)
-        self.intensity_decline = getattr(obj, 'intensity_decline', None)
-        self.investment = getattr(obj, 'investment', None)
-        self.mass_atmosphere = getattr(obj, 'mass_atmosphere', None)
-        self.mass_upper = getattr(obj, 'mass_upper', None)
-        self.mass_lower = getattr(obj, 'mass_lower', None)
-        self.miu = getattr(obj, 'miu', None)
-        self.output = getattr(obj, 'output', None)
-        self.output_abate = getattr(obj, 'output_abate', None)
-        self.participation = getattr(obj, 'participation', None)
-        self.population = getattr(obj, 'population', None)
-        self.population_growth = getattr(obj, 'population_growth', None)
-        self.productivity = getattr(obj, 'productivity', None)
-        self.scc = getattr(obj, 'scc', None)
-        self.tax_rate = getattr(obj, 'tax_rate', None)
-        self.temp_atmosphere = getattr(obj, 'temp_atmosphere', None)
-        self.temp_lower = getattr(obj, 'temp_lower', None)
-        self.utility = getattr(obj, 'utility', None)
-        self.utility_discounted = getattr(obj, 'utility_discounted', None)
-        self.discount_rate = getattr(obj, 'discount_rate', None)
-        self.discount_forward = getattr(obj, 'discount_forward', None)
+        if self.ndim and len(self) == len(self.names):
+            self.__dict__.update(zip(self.names, self.view(np.ndarray)))
+
+    def __setstate__(self, state):
+        np.ndarray.__setstate__(self, state)
+        self.__array_finalize__(None)
 
     def __array_wrap__(self, out_arr, context=None):
         return np.ndarray.__array_wrap__(self, out_arr, context)
 
+    def tile(self, n, dtype=None):
+        """Copy of the matrix with a trailing scenario axis of length n.
+
+        Every column along the new axis starts as a copy of this matrix, so
+        df.miu[i] is an array of n values, one per scenario.
+
+        Args:
+            n (int): Number of scenarios
+            dtype (dtype): Storage type, default that of this matrix
+
+        Returns:
+            DiceDataMatrix: Matrix of shape self.shape + (n,)
+
+        """
+        return DiceDataMatrix(
+            np.repeat(np.asarray(self)[..., np.newaxis], n, axis=-1), dtype)
+
 
 class DiceUserParams(object):
     def __init__(self, model=2007):
@@ -115,6 +154,45 @@ class DiceUserParams(object):
         self.c2100 = 0.
         self.c2150 = 0.
 
+    def __setattr__(self, name, value):
+        if (isinstance(value, np.ndarray) and
+                not isinstance(value, DiceDataMatrix)):
+            # Exogenous paths are only rebuilt on assignment, so array
+            # parameters are stored as read-only copies and editing one in
+            # place raises instead of leaving stale paths
+            value = value.copy()
+            value.flags.writeable = False
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_revision', next(_revisions))
+
+    def fingerprint(self):
+        """Hashable key of all parameter values
+
+        Model variables (DiceDataMatrix attributes) and private attributes
+        are left out; other arrays enter as their dtype, shape and bytes.
+        The key is kept until the next assignment.
+
+        Args:
+            None
+
+        Returns:
+            tuple: (name, value) pairs sorted by name
+
+        """
+        cached = self.__dict__.get('_fingerprint')
+        if cached is not None and cached[0] == self._revision:
+            return cached[1]
+        key = []
+        for k, v in sorted(self.__dict__.iteritems()):
+            if k[0] == '_' or isinstance(v, DiceDataMatrix):
+                continue
+            if isinstance(v, np.ndarray):
+                v = v.dtype.str, v.shape, v.tobytes()
+            key.append((k, v))
+        key = tuple(key)
+        self.__dict__['_fingerprint'] = self._revision, key
+        return key
+
 
 class DiceParams(DiceUserParams):
     def __init__(self, model=2007):
@@ -187,6 +265,14 @@ class DiceParams(DiceUserParams):
         self.t0 = np.arange(self.tmax)
         self.t1 = self.t0 + 1
         self.scc_horizon = 40
+        self.scc_periods = 20
+
+        # BEAM carbon integrator, 'explicit' with beam_substeps fixed
+        # substeps per period, or 'implicit' with as many as it takes to
+        # agree within beam_tol
+        self.beam_integrator = 'explicit'
+        self.beam_substeps = 20
+        self.beam_tol = 1e-4
 
         # Variables for initiating DiceDataMatrix
         backstop_growth = np.zeros(self.tmax)
@@ -256,6 +342,57 @@ class DiceParams(DiceUserParams):
 
         self.scc = DiceDataMatrix(np.zeros((34, 60)))
 
+    def ensemble(self, scenarios, dtype=None):
+        """Parameters for a batch of scenarios
+
+        Copy of these parameters in which every parameter named in
+        scenarios holds one value per scenario. The time index t0 becomes
+        a column, so exogenous paths broadcast to tmax x N, and vars and scc
+        gain a trailing scenario axis. Model names and policy flags are
+        shared by the whole batch.
+
+        Args:
+            scenarios (dict or list): Either a dict mapping parameter names
+                to sequences of N values, or a list of N dicts of parameter
+                values. Parameters missing from a dict keep their current
+                value.
+            dtype (dtype): Storage type of vars and scc, default float64
+
+        Returns:
+            DiceParams: Parameters for the batch
+
+        """
+        if isinstance(scenarios, dict):
+            values = dict(
+                (k, np.asarray(v, dtype=float)) for k, v in scenarios.items())
+            sizes = set(v.size for v in values.values())
+        else:
+            scenarios = list(scenarios)
+            sizes = set([len(scenarios)])
+            values = {}
+            for k in set(k for s in scenarios for k in s):
+                values[k] = np.array(
+                    [s.get(k, getattr(self, k, None)) for s in scenarios],
+                    dtype=float)
+        if len(sizes) != 1:
+            raise ValueError('Scenario parameters need the same number of '
+                             'values, got {}.'.format(sorted(sizes)))
+        n = sizes.pop()
+        if n < 1:
+            raise ValueError('An ensemble needs at least one scenario.')
+        params = copy.copy(self)
+        for k, v in values.items():
+            current = getattr(self, k, None)
+            if type(current) not in [type(10), type(.10)]:
+                raise ValueError(
+                    '{} cannot vary across scenarios.'.format(k))
+            setattr(params, k, v.reshape(n))
+        params.t0 = np.arange(self.tmax)[:, np.newaxis]
+        params.t1 = params.t0 + 1
+        params.vars = self.vars.tile(n, dtype)
+        params.scc = self.scc.tile(n, dtype)
+        return params
+
 
 class Dice2010Params(DiceParams):
     def __init__(self):
@@ -297,8 +434,10 @@ class Dice2010Params(DiceParams):
         self.forcing_ghg_2000 = .83
         self.temp_atmosphere_2000 = .83
         self.temp_atmosphere_2010 = .98
-        self.thermal_transfer[0] = .208
-        self.thermal_transfer[2] = .310
+        self.c1 = .208
+        self.thermal_transfer = np.array([
+            self.c1, self.c2, self.c3, self.c4
+        ])
 
         # self.damages_coefficient = .00204625800317896
 
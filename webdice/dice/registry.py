@@ -0,0 +1,97 @@
+from __future__ import division
+import threading
+from collections import OrderedDict
+from webdice.dice.params import rebind
+
+
+def class_name(name):
+    """Model class name for a model name, e.g. beam_carbon -> BeamCarbon"""
+    return "".join(x.capitalize() for x in name.split('_'))
+
+
+class ModelRegistry(object):
+    """Model classes of one equations package, and instances to reuse
+
+    Classes are collected from the model modules at import, and each model
+    name is resolved to its class once. Instances are kept per model name
+    and params fingerprint, so a new run whose parameters match an earlier
+    one gets the earlier instances, rebound to its params, along with any
+    exogenous paths they already computed. Instances hold per-step scratch
+    state, so each thread keeps its own, for up to `maxsize` fingerprints.
+
+    Args:
+        maxsize (int): Parameter sets kept per thread
+        **modules: Model module for each kind, e.g. carbon=carbon
+
+    """
+    kinds = ('productivity', 'emissions', 'carbon', 'temperature',
+             'damages', 'consumption', 'utility')
+
+    def __init__(self, maxsize=16, **modules):
+        self.maxsize = maxsize
+        self.classes = {}
+        for kind, module in modules.iteritems():
+            self.classes[kind] = dict(
+                (k, v) for k, v in vars(module).iteritems()
+                if isinstance(v, type) and v.__module__ == module.__name__
+            )
+        self._resolved = {}
+        self._local = threading.local()
+
+    def model_class(self, kind, name):
+        """Class implementing model `name` of `kind`
+
+        Raises:
+            AttributeError: If there is no such model, as getattr on the
+                module would
+
+        """
+        try:
+            return self._resolved[kind, name]
+        except KeyError:
+            pass
+        try:
+            cls = self.classes[kind][class_name(name)]
+        except KeyError:
+            raise AttributeError(
+                "No {} model named '{}'".format(kind, name))
+        self._resolved[kind, name] = cls
+        return cls
+
+    def models(self, params):
+        """Model instances for params
+
+        Args:
+            params (DiceParams): Parameters naming the models
+
+        Returns:
+            dict: Model instance for each kind
+
+        """
+        instances = getattr(self._local, 'instances', None)
+        if instances is None:
+            instances = self._local.instances = OrderedDict()
+        fingerprint = params.fingerprint()
+        try:
+            revision, models = instances.pop(fingerprint)
+        except KeyError:
+            revision, models = params._revision, {}
+        for model in models.itervalues():
+            if model.params is not params or revision != params._revision:
+                rebind(model, params, revision)
+        out = {}
+        for kind in self.kinds:
+            name = getattr(params, '{}_model'.format(kind))
+            try:
+                out[kind] = models[kind]
+            except KeyError:
+                out[kind] = models[kind] = self.model_class(kind, name)(
+                    params)
+        instances[fingerprint] = params._revision, models
+        while len(instances) > self.maxsize:
+            instances.popitem(last=False)
+        return out
+
+    def clear(self):
+        """Drop this thread's instances"""
+        self._local.instances = OrderedDict()
@@ -0,0 +1,87 @@
+from __future__ import division
+import functools
+from collections import defaultdict
+from timeit import default_timer as clock
+
+
+class TimedModel(object):
+    """Stand-in for an equation model that times its step equations
+
+    get_model_values (and forcing, for carbon models) are timed under
+    `name`; everything else is passed through to the model. The model
+    itself is left untouched, since the registry shares it between runs.
+    """
+    def __init__(self, model, timer, name):
+        self.model = model
+        self.get_model_values = timer.wrap(name, model.get_model_values)
+        if name == 'carbon':
+            self.forcing = timer.wrap('forcing', model.forcing)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class StepTimer(object):
+    """Call counts and cumulative wall time of Dice.step and each model
+
+    Example:
+        d = Dice2010()
+        d.enable_timing()
+        d.loop()
+        print(d.timings)
+    """
+    kinds = ('productivity', 'emissions', 'carbon', 'temperature',
+             'damages', 'consumption', 'utility')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def add(self, name, start):
+        self.calls[name] += 1
+        self.seconds[name] += clock() - start
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, start)
+        return timed
+
+    def instrument(self, eq):
+        """Swap the models of a Loop or LoopOpt for timed stand-ins."""
+        if getattr(eq, '_timer', None) is self:
+            return
+        self.uninstrument(eq)
+        for kind in self.kinds:
+            attr = '{}_model'.format(kind)
+            setattr(eq, attr, TimedModel(getattr(eq, attr), self, kind))
+        eq._timer = self
+
+    def uninstrument(self, eq):
+        """Put the original models back."""
+        for kind in self.kinds:
+            attr = '{}_model'.format(kind)
+            model = getattr(eq, attr)
+            if isinstance(model, TimedModel):
+                setattr(eq, attr, model.model)
+        eq._timer = None
+
+    def breakdown(self):
+        """Timings collected since the last reset
+
+        Returns:
+            dict: For step and each model equation, a dict of calls,
+                seconds (cumulative) and per_call (mean seconds)
+        """
+        return dict(
+            (name, dict(calls=calls, seconds=self.seconds[name],
+                        per_call=self.seconds[name] / calls))
+            for name, calls in self.calls.iteritems()
+        )
@@ -0,0 +1,69 @@
+from __future__ import division
+import numpy as np
+
+# numpy RandomState methods that can be named in a distribution, with the
+# number of arguments each takes
+DISTRIBUTIONS = {
+    'normal': 2,        # mean, standard deviation
+    'lognormal': 2,     # mean and standard deviation of the log
+    'uniform': 2,       # low, high
+    'triangular': 3,    # left, mode, right
+}
+
+
+def new_seed():
+    """A random seed to record with draws that were not given one."""
+    return int(np.random.randint(2 ** 31 - 1))
+
+
+def draw(distributions, n, seed):
+    """Random parameter values
+
+    The same distributions, n and seed always give the same values,
+    whatever order the distributions are listed in.
+
+    Args:
+        distributions (dict): Parameter name to a tuple of a name from
+            DISTRIBUTIONS and its arguments, e.g. ('normal', 3.2, .8)
+        n (int): Number of draws
+        seed (int): Seed of the numpy RandomState
+
+    Returns:
+        dict: Parameter name to an array of n values
+    """
+    state = np.random.RandomState(seed)
+    draws = {}
+    for name in sorted(distributions):
+        spec = tuple(distributions[name])
+        kind, args = spec[0], [float(a) for a in spec[1:]]
+        if DISTRIBUTIONS.get(kind) != len(args):
+            raise ValueError('{} needs one of {}, with its arguments, got '
+                             '{}.'.format(name, sorted(DISTRIBUTIONS), spec))
+        draws[name] = getattr(state, kind)(*args, size=n)
+    return draws
+
+
+def percentile_bands(batches, variables, percentiles):
+    """Percentiles across scenarios of model variables, in bulk
+
+    Scenarios with NaN values are left out of the percentiles at the
+    periods where they are NaN.
+
+    Args:
+        batches (iterable): DiceDataMatrix of tmax x scenarios for each
+            batch of scenarios
+        variables (list): Names of model variables
+        percentiles (list): Percentiles, between 0 and 100
+
+    Returns:
+        dict: For each variable, an array of tmax x len(percentiles)
+    """
+    values = dict((v, []) for v in variables)
+    for df in batches:
+        for v in variables:
+            values[v].append(np.asarray(getattr(df, v)))
+    return dict(
+        (v, np.rollaxis(np.nanpercentile(
+            np.concatenate(values[v], axis=-1), percentiles, axis=-1), 0, 2))
+        for v in variables
+    )
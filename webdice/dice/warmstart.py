@@ -0,0 +1,234 @@
+from __future__ import division
+import json
+import os
+import numpy as np
+
+# Version of the stored points; records of other versions are skipped.
+POINT_FORMAT = 2
+
+
+def tail(path, n, block=65536):
+    """Last n lines of a file, reading it from the end.
+
+    Returns:
+        tuple: The lines, and the offset in the file where they start
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = pos = f.tell()
+        data = ''
+        while pos > 0 and data.count('\n') <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines(True)[-n:] if n else []
+    return lines, end - sum(len(line) for line in lines)
+
+
+class MiuStore(object):
+    """Store of solved (params, optimal miu) pairs for warm-starting IPOPT.
+
+    Solutions are appended to a JSON-lines file, one per line, so several
+    worker processes can share a store. Only the last `capacity` lines are
+    kept in memory, read from the end of the file. A store is meant to be
+    loaded once per process: nearest() and add() then read just the lines
+    appended since, by this or any other process. Once the older lines
+    take up more of the file than those, add() rewrites it with the last
+    `capacity`.
+
+    Runs are compared in normalized parameter space: each parameter in
+    `ranges` is divided by the width of its range. Runs with different
+    model names or policy flags are never neighbours.
+
+    Args:
+        path (str): JSON-lines file, or None to keep solutions in memory
+        ranges (dict): Parameter name to the (min, max) of its slider, for
+            the parameters that shape the optimized miu path, see
+            webdice_web.parameters.slider_ranges()
+
+    Kwargs:
+        capacity (int): Most solutions to keep
+        neighbours (int): Solutions to blend for a starting miu
+
+    Example:
+        d = Dice2010()
+        d.opt_store = MiuStore('/tmp/miu.jsonl', slider_ranges())
+        d.loop(opt=True)
+        print(d.opt_stats)
+    """
+    def __init__(self, path, ranges, capacity=5000, neighbours=1):
+        self.path = path
+        self.capacity = capacity
+        self.neighbours = neighbours
+        self.numeric = sorted(ranges)
+        self.scale = np.array([
+            ranges[k][1] - ranges[k][0] for k in self.numeric])
+        self.entries = []
+        self._lines = []
+        self._kept = 0
+        self._end = 0
+        self._inode = None
+        self.refresh()
+
+    def refresh(self):
+        """Load the solutions appended to the file since the last call.
+
+        Only the new end of the file is read. If the file was replaced,
+        as compact() in another process does, the last `capacity` lines
+        are read again.
+        """
+        if self.path is None:
+            return
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._end:
+            self.entries, self._lines, self._kept = [], [], 0
+            lines, self._end = tail(self.path, self.capacity)
+            self._inode = stat.st_ino
+        elif stat.st_size > self._end:
+            with open(self.path, 'rb') as f:
+                f.seek(self._end)
+                lines = f.read().splitlines(True)
+        else:
+            return
+        for line in lines:
+            if not line.endswith('\n'):
+                # Still being written
+                break
+            self._end += len(line)
+            self._append(line)
+
+    def _append(self, line):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return
+        if record.get('format') != POINT_FORMAT:
+            return
+        self.entries.append(self._load(record))
+        self._lines.append(line)
+        self._kept += len(line)
+        if len(self._lines) > self.capacity:
+            self._kept -= len(self._lines.pop(0))
+            self.entries.pop(0)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self, record):
+        record['point'] = np.array(record['point'])
+        record['miu'] = np.array(record['miu'])
+        return record
+
+    def categories(self, params):
+        """Settings that have to match exactly between neighbours."""
+        return [
+            params.dice_version, bool(params.treaty), bool(params.carbon_tax)
+        ] + sorted(
+            (k, v) for k, v in params.__dict__.iteritems()
+            if k.endswith('_model') and isinstance(v, basestring)
+        )
+
+    def point(self, params):
+        """Normalized position of params in parameter space."""
+        return np.array(
+            [getattr(params, k) for k in self.numeric], dtype=float
+        ) / self.scale
+
+    def nearest(self, params):
+        """Starting miu for params.
+
+        Blends the stored solutions of up to self.neighbours nearest runs
+        with inverse-distance weights. An exact match is returned as is.
+
+        Args:
+            params (DiceParams): Parameters of the run to optimize
+
+        Returns:
+            tuple: (miu, distance to the nearest run), or (None, None) if
+                there are no comparable runs
+        """
+        self.refresh()
+        cats = json.loads(json.dumps(self.categories(params)))
+        candidates = [e for e in self.entries if e['categories'] == cats]
+        if not candidates:
+            return None, None
+        points = np.array([e['point'] for e in candidates])
+        dist = np.sqrt(((points - self.point(params)) ** 2).sum(axis=1))
+        order = np.argsort(dist)[:self.neighbours]
+        if dist[order[0]] == 0:
+            return candidates[order[0]]['miu'].copy(), 0.
+        w = 1 / dist[order]
+        miu = np.dot(w, [candidates[i]['miu'] for i in order]) / w.sum()
+        return miu, dist[order[0]]
+
+    def add(self, params, miu, stats=None):
+        """Record a solved run.
+
+        Args:
+            params (DiceParams): Parameters of the solved run
+            miu (nd.array): Optimal miu
+            stats (dict): Convergence stats, see Dice.opt_stats
+        """
+        record = dict(
+            format=POINT_FORMAT,
+            categories=self.categories(params),
+            point=list(self.point(params)),
+            miu=list(np.asarray(miu, dtype=float)),
+            stats=stats or {},
+        )
+        line = json.dumps(record) + '\n'
+        if self.path is None:
+            self._append(line)
+            return
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                pass
+        with open(self.path, 'a') as f:
+            f.write(line)
+        self.refresh()
+        if self._end - self._kept > self._kept:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the file with only the loaded solutions.
+
+        The new file replaces the old one in a single rename, so other
+        workers read either. Lines they append to the old file in the
+        meantime are lost, which only costs warm starts.
+        """
+        temp = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(temp, 'w') as f:
+            f.writelines(self._lines)
+        os.rename(temp, self.path)
+        self._inode = os.stat(self.path).st_ino
+        self._end = self._kept
+
+    def summary(self):
+        """Mean evaluation counts of cold and warm starts.
+
+        Returns:
+            dict: {'cold': {...}, 'warm': {...}} with the number of solves
+                and mean function and gradient evaluations
+        """
+        self.refresh()
+        out = {}
+        for kind, warm in (('cold', False), ('warm', True)):
+            stats = [
+                e['stats'] for e in self.entries
+                if e['stats'] and bool(e['stats'].get('warm')) == warm
+            ]
+            out[kind] = dict(
+                solves=len(stats),
+                f_evals=np.mean([s['f_evals'] for s in stats])
+                if stats else None,
+                grad_evals=np.mean([s['grad_evals'] for s in stats])
+                if stats else None,
+            )
+        return out
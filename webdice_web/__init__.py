@@ -1,10 +1,6 @@
-import glob
-import os
-from itertools import groupby
 from flask import Flask
 from flask.ext.assets import Environment, Bundle
 from flask import render_template
-from webdice_web.constants import BASE_DIR
 # from flask_restful import Api, reqparse
 
 session_opts = {
@@ -46,19 +42,19 @@ def context_globals():
 @app.context_processor
 def glossary_terms():
     return dict(
-        glossary_terms=[list(g) for k, g in groupby(map(
-            lambda x: ''.join(x.split('/')[-1].split('.')[:-1]),
-            sorted(glob.glob(os.path.join(
-                BASE_DIR, 'templates', 'modules', 'glossary', 'terms',
-                '*.html')))), key=lambda x: x[0])],
-        advanced_glossary_terms=map(
-            lambda x: ''.join(x.split('/')[-1].split('.')[:-1]),
-            sorted(glob.glob(os.path.join(
-                BASE_DIR, 'templates', 'modules', 'glossary', 'terms',
-                'advanced', '*.html')))),
+        glossary_terms=glossary_index.terms,
+        advanced_glossary_terms=glossary_index.advanced_terms,
     )
 
 
+from webdice_web.cache import results
+from webdice_web.jobs import jobs, init_kernels
+from webdice_web.glossary import glossary_index
+results.init_app(app)
+jobs.init_app(app, shared=results.backend)
+init_kernels(app)
+glossary_index.init_app(app)
+
 from webdice_web.views import mod as work_module
 app.register_blueprint(work_module)
 
@@ -0,0 +1,176 @@
+from __future__ import division
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def quantize(value, digits=6):
+    """Round a slider value to a fixed number of significant digits, so
+    near-identical inputs share a cache entry."""
+    return float('{:.{}g}'.format(value, digits))
+
+
+def fingerprint(dice, opt=False):
+    """Canonical key for a configured Dice object.
+
+    Covers every user parameter (including model names), the DICE version
+    and the policy type, so two requests that simulate the same thing get
+    the same key regardless of form field order. Floats enter the key
+    quantized; the run itself keeps the exact posted values, so inputs
+    that differ beyond six significant digits share the first one's run.
+
+    Args:
+        dice (Dice): Dice object with its params already set
+        opt (bool): Whether the run is optimized
+
+    Returns:
+        str: Hex digest
+    """
+    canonical = []
+    for p in sorted(dice.user_params):
+        v = getattr(dice.params, p)
+        if isinstance(v, float):
+            v = quantize(v)
+        canonical.append((p, v))
+    canonical.extend([
+        ('dice_version', dice.params.dice_version),
+        ('treaty', bool(dice.params.treaty)),
+        ('carbon_tax', bool(dice.params.carbon_tax)),
+        ('optimized', bool(opt)),
+    ])
+    return hashlib.sha1(json.dumps(canonical)).hexdigest()
+
+
+class LRUCache(object):
+    """In-process cache with size-bounded LRU eviction."""
+    def __init__(self, maxsize=500):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return None
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class MemcachedCache(object):
+    """Shared cache on top of any client with the python-memcached get/set
+    interface (pylibmc, python-memcached, or a local stand-in)."""
+    def __init__(self, client, prefix=''):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value)
+
+
+def memcached_client(servers):
+    """Connect with whichever memcached module is installed, or None."""
+    try:
+        import pylibmc
+        return pylibmc.Client(servers, binary=True)
+    except ImportError:
+        pass
+    try:
+        import memcache
+        return memcache.Client(servers)
+    except ImportError:
+        return None
+
+
+class ResultCache(object):
+    """Formatted run results, keyed by fingerprint().
+
+    Lookups go to the in-process LRU first and then to the shared backend,
+    if there is one. Backend errors are treated as misses, so a memcached
+    outage only costs a re-simulation.
+    """
+    def __init__(self, maxsize=500, backend=None):
+        self.local = LRUCache(maxsize)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.lookup(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def lookup(self, key):
+        """Value for key, or None, without counting a hit or miss, for
+        reads that aren't /run requests."""
+        value = self.local.get(key)
+        if value is None and self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception:
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value)
+            except Exception:
+                pass
+
+    def clear(self):
+        self.local.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self.local),
+            maxsize=self.local.maxsize,
+            backend=type(self.backend).__name__ if self.backend else None,
+        )
+
+    def init_app(self, app):
+        """Size and back the cache from the app config. Uses the
+        Flask-Cache key names: CACHE_TYPE, CACHE_THRESHOLD,
+        CACHE_KEY_PREFIX and CACHE_MEMCACHED_SERVERS."""
+        self.local.maxsize = app.config.get('CACHE_THRESHOLD', 500)
+        self.backend = None
+        if app.config.get('CACHE_TYPE') == 'memcached':
+            client = memcached_client(app.config.get(
+                'CACHE_MEMCACHED_SERVERS', ['127.0.0.1:11211']))
+            if client is not None:
+                self.backend = MemcachedCache(
+                    client, app.config.get('CACHE_KEY_PREFIX', ''))
+
+
+results = ResultCache()
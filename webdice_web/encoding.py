@@ -0,0 +1,76 @@
+from __future__ import division
+import json
+import struct
+import numpy as np
+
+JSON = 'application/json'
+FLOAT32 = 'application/x-webdice-float32'
+FLOAT64 = 'application/x-webdice-float64'
+DTYPES = {FLOAT32: '<f4', FLOAT64: '<f8'}
+
+
+def encode(out, mimetype=FLOAT64):
+    """Run output as a compact binary buffer.
+
+    Layout, little-endian:
+
+        uint32  length of the header
+        header  JSON object with every key of `out` but data, plus dtype,
+                variables (names, in order) and periods, padded with
+                spaces so the values start at a multiple of 8 bytes
+        values  len(variables) x periods floats, one variable after
+                another
+
+    Values that are None in `out` are NaN.
+
+    Args:
+        out (dict): Output of simulate() or Job.as_dict()
+        mimetype (str): FLOAT32 or FLOAT64
+
+    Returns:
+        str: Encoded output
+    """
+    dtype = np.dtype(DTYPES[mimetype])
+    data = out.get('data') or {}
+    names = sorted(data)
+    values = np.array([data[k] for k in names], dtype=float).astype(dtype)
+    header = dict((k, v) for k, v in out.iteritems() if k != 'data')
+    header.update(dtype=dtype.name, variables=names,
+                  periods=values.shape[1] if names else 0)
+    header = json.dumps(header)
+    header += ' ' * (-(len(header) + 4) % 8)
+    return struct.pack('<I', len(header)) + header + values.tobytes()
+
+
+def decode(buf):
+    """Output from a buffer made by encode().
+
+    Args:
+        buf (str): Encoded output
+
+    Returns:
+        dict: Output, with lists of floats and None for NaN in data
+    """
+    length, = struct.unpack_from('<I', buf)
+    header = json.loads(buf[4:4 + length])
+    dtype = np.dtype(header.pop('dtype')).newbyteorder('<')
+    names = header.pop('variables')
+    periods = header.pop('periods')
+    values = np.frombuffer(buf, dtype, len(names) * periods, 4 + length)
+    values = values.reshape(len(names), periods).astype(float)
+    header['data'] = dict(
+        (k, [None if np.isnan(v) else v for v in row.tolist()])
+        for k, row in zip(names, values))
+    return header
+
+
+def negotiate(accept):
+    """Best response type for an Accept header, JSON unless asked.
+
+    Args:
+        accept (MIMEAccept): request.accept_mimetypes
+
+    Returns:
+        str: JSON, FLOAT32 or FLOAT64
+    """
+    return accept.best_match([JSON, FLOAT64, FLOAT32], default=JSON)
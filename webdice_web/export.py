@@ -0,0 +1,96 @@
+from __future__ import division
+import zipfile
+from lxml import etree
+from webdice_web.jobs import JobPool
+
+SVG_NS = {'n': 'http://www.w3.org/2000/svg'}
+
+# Worker processes for the custom graph merge, apart from the run pool so
+# exports don't queue behind optimizations. Results are read from the
+# job itself, so finished jobs needn't be kept.
+merges = JobPool(processes=1, timeout=30., keep=0.)
+
+
+def combine_custom(c, t):
+    """Custom graph SVG with the twin graph's axis and lines merged in."""
+    c = etree.fromstring(c)
+    t = etree.fromstring(t)
+    cg = c.xpath('/n:svg/n:g', namespaces=SVG_NS)
+    tg = t.xpath('/n:svg/n:g', namespaces=SVG_NS)
+    tgg = tg[1].xpath('./n:g', namespaces=SVG_NS)
+    c.append(tg[0])
+    for t in tgg:
+        cg[1].append(t)
+    return etree.tostring(c)
+
+
+class ZipStream(object):
+    """Write-only file for zipfile.ZipFile that hands back what was written
+    since the last drain(), so an archive can be sent while it is built."""
+    def __init__(self):
+        self._chunks = []
+        self._written = 0
+
+    def write(self, data):
+        self._chunks.append(data)
+        self._written += len(data)
+
+    def tell(self):
+        return self._written
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = ''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def zip_stream(files):
+    """Deflated zip archive, yielded as it is written.
+
+    Only one file's content and compressed data are held at a time, as
+    long as `files` produces them lazily.
+
+    Args:
+        files (iterable): (name, content) pairs
+
+    Yields:
+        str: Chunks of the archive
+    """
+    stream = ZipStream()
+    zipped = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+    for name, content in files:
+        zipped.writestr(name, content)
+        yield stream.drain()
+    zipped.close()
+    yield stream.drain()
+
+
+def svg_files(form):
+    """(name, SVG) pairs for the graphs posted in `form`.
+
+    The custom graph is merged with the twin graph in a worker of the
+    `merges` pool, while the other graphs are yielded, and comes last. If
+    the merge fails or times out, the custom graph is yielded as posted.
+
+    Args:
+        form (MultiDict): One SVG per graph, by graph name, with
+            twin_graph whenever custom_graph is posted
+
+    Yields:
+        tuple: File name and SVG
+    """
+    merge = None
+    if 'custom_graph' in form:
+        merge = merges.call(combine_custom, str(form['custom_graph']),
+                            str(form['twin_graph']))
+    for k in form.keys():
+        if k != 'custom_graph':
+            yield '{}.svg'.format(k), str(form[k])
+    if merge is not None:
+        merge.event.wait()
+        yield 'custom_graph.svg', (
+            merge.result if merge.status == 'done'
+            else str(form['custom_graph']))
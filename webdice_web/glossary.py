@@ -0,0 +1,94 @@
+from __future__ import division
+import glob
+import os
+import threading
+import time
+from itertools import groupby
+from webdice_web.constants import BASE_DIR
+
+
+def term_name(path):
+    return ''.join(os.path.basename(path).split('.')[:-1])
+
+
+class GlossaryIndex(object):
+    """Glossary term names and advanced term bodies, read once.
+
+    Term lists for the templates and the bodies served by
+    /glossary/advanced/<term> come from memory. With `watch` on (the
+    default in debug mode), the index is rebuilt when a term file is
+    added, removed or edited, checking the files at most every
+    `interval` seconds.
+    """
+    def __init__(self, root=None, watch=False, interval=1.):
+        self.root = root or os.path.join(
+            BASE_DIR, 'templates', 'modules', 'glossary', 'terms')
+        self.watch = watch
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._stamp = None
+        self._index = None
+
+    def init_app(self, app):
+        self.watch = app.config.get('GLOSSARY_WATCH', app.debug)
+        self.interval = app.config.get('GLOSSARY_INTERVAL', self.interval)
+        self.build()
+
+    def _paths(self):
+        return (sorted(glob.glob(os.path.join(self.root, '*.html'))),
+                sorted(glob.glob(os.path.join(self.root, 'advanced',
+                                              '*.html'))))
+
+    def _stat(self, paths):
+        """Modification times that change when any term file does."""
+        dirs = [self.root, os.path.join(self.root, 'advanced')]
+        return tuple(os.path.getmtime(p) for p in dirs + paths[0] + paths[1])
+
+    def build(self):
+        """Read the term directories into a new index."""
+        paths = self._paths()
+        bodies = {}
+        for path in paths[1]:
+            with open(path) as f:
+                bodies[term_name(path)] = f.read()
+        names = [term_name(path) for path in paths[0]]
+        index = dict(
+            terms=[list(g) for k, g in groupby(names, key=lambda x: x[0])],
+            advanced_terms=[term_name(path) for path in paths[1]],
+            bodies=bodies,
+        )
+        with self._lock:
+            self._index = index
+            self._stamp = self._stat(paths)
+            self._checked = time.time()
+
+    def _current(self):
+        if self._index is None:
+            self.build()
+        elif self.watch and time.time() - self._checked > self.interval:
+            self._checked = time.time()
+            try:
+                stale = self._stat(self._paths()) != self._stamp
+            except OSError:
+                stale = True
+            if stale:
+                self.build()
+        return self._index
+
+    @property
+    def terms(self):
+        """Term names grouped by first letter."""
+        return self._current()['terms']
+
+    @property
+    def advanced_terms(self):
+        """Advanced term names."""
+        return self._current()['advanced_terms']
+
+    def advanced_body(self, term):
+        """HTML of an advanced term, or None if there is no such term."""
+        return self._current()['bodies'].get(term)
+
+
+glossary_index = GlossaryIndex()
@@ -0,0 +1,538 @@
+from __future__ import division
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import deque
+import numpy as np
+from numpy import inf
+from webdice.dice import Dice2010
+from webdice.dice.warmstart import MiuStore
+from webdice_web.parameters import slider_ranges
+
+
+# Dice.use_kernel and Dice.check_kernel for every run, see init_kernels()
+kernels = dict(use_kernel=False, check_kernel=False)
+
+
+def init_kernels(app):
+    """Set whether runs use the loop kernels from the app config, with
+    DICE_KERNELS and DICE_CHECK_KERNELS."""
+    kernels['use_kernel'] = app.config.get('DICE_KERNELS', False)
+    kernels['check_kernel'] = app.config.get('DICE_CHECK_KERNELS', False)
+
+
+def run_settings(dice):
+    """Everything a worker needs to rebuild a configured Dice object.
+
+    Args:
+        dice (Dice): Dice object with its params already set
+
+    Returns:
+        dict: User parameters plus the policy flags
+    """
+    settings = {p: getattr(dice.params, p) for p in dice.user_params}
+    settings['treaty'] = dice.params.treaty
+    settings['carbon_tax'] = dice.params.carbon_tax
+    return settings
+
+
+def configure(settings):
+    """Dice object with the parameters of a run.
+
+    Args:
+        settings (dict): Parameter values, as from run_settings()
+
+    Returns:
+        Dice: Dice2010 object with its params set, using the loop kernels
+            if init_kernels() turned them on
+    """
+    dice = Dice2010()
+    for p, v in settings.iteritems():
+        setattr(dice.params, p, v)
+    for k, v in kernels.iteritems():
+        setattr(dice, k, v)
+    return dice
+
+
+def json_value(name, i, value):
+    """A model variable value made JSON-safe, as the graphs expect it."""
+    if i == 0 and name in ('discount_rate', 'discount_forward'):
+        return None
+    return value if value > -inf else -999
+
+
+def json_rows(name, values):
+    """Array of a model variable, periods first, as JSON-safe nested
+    lists, with the same substitutions as json_value()."""
+    rows = np.where(values > -inf, values, -999).tolist()
+    if name in ('discount_rate', 'discount_forward'):
+        rows[0] = np.full(values.shape[1:], None).tolist()
+    return rows
+
+
+def simulate(settings, opt=False, store=None, backend='auto'):
+    """Run DICE and format the output for the graphs.
+
+    Args:
+        settings (dict): Parameter values, as from run_settings()
+        opt (bool): Whether to optimize miu
+        store (MiuStore): Solutions to warm-start optimization from
+        backend (str): Optimizer, see webdice.dice.optimizers
+
+    Returns:
+        dict: Output of Dice.format_output() made JSON-safe
+    """
+    dice = configure(settings)
+    if opt:
+        dice.opt_store = store
+    dice.opt_backend = backend
+    dice.loop(opt=opt)
+    return format_result(dice)
+
+
+def format_result(dice):
+    """Output of Dice.format_output() made JSON-safe."""
+    out = dice.format_output()
+    out['data'] = {
+        k: [json_value(k, i, l) for i, l in enumerate(v)]
+        for k, v in out['data'].iteritems()
+    }
+    return out
+
+
+def sweep(settings, axes, variables=None, scc=False):
+    """Run a parameter sweep and format the output for JSON.
+
+    Args:
+        settings (dict): Parameter values, as from run_settings()
+        axes (list): (parameter name, values) pairs, see Dice.sweep()
+        variables (list): Model variables to return, default all
+        scc (bool): Whether to calculate SCC
+
+    Returns:
+        dict: axes, as names and values, and data, with for each
+            variable nested lists indexed [t][i][j]
+    """
+    dice = configure(settings)
+    out = dice.sweep(axes, variables, scc=scc)
+    return dict(
+        axes=[dict(name=k, values=list(vs)) for k, vs in axes],
+        data=dict((k, json_rows(k, v)) for k, v in out.iteritems()),
+    )
+
+
+def percentile_bands(settings, scenarios, variables=None,
+                     percentiles=(5, 25, 50, 75, 95), scc=False):
+    """Percentile bands over many scenarios, formatted for JSON.
+
+    Args:
+        settings (dict): Parameter values, as from run_settings()
+        scenarios (dict): Parameter names to arrays of values, one per
+            scenario, see Dice.percentile_bands()
+        variables (list): Model variables to return, default all
+        percentiles (list): Percentiles, between 0 and 100
+        scc (bool): Whether to calculate SCC
+
+    Returns:
+        dict: percentiles, and data, with for each variable nested lists
+            indexed [t][k] by period and percentile
+    """
+    dice = configure(settings)
+    out = dice.percentile_bands(scenarios, variables, percentiles, scc=scc)
+    return dict(
+        percentiles=list(percentiles),
+        data=dict((k, json_rows(k, v)) for k, v in out.iteritems()),
+    )
+
+
+def simulate_stream(settings, callback=None):
+    """Run DICE, yielding output for the graphs as it is computed.
+
+    Messages are the parameters, then the model variables of each period,
+    with scc None, then the SCC of every period once it is calculated:
+
+        {'parameters': {...}}
+        {'t': 0, 'data': {'capital': ..., 'scc': None, ...}}
+        ...
+        {'status': 'done', 'scc': [...]}
+
+    Args:
+        settings (dict): Parameter values, as from run_settings()
+        callback (function): Called with the output simulate() would
+            give, once the run is done
+
+    Yields:
+        dict: Messages
+    """
+    dice = configure(settings)
+    yield dict(parameters=dice.format_parameters())
+    for i in dice.iter_loop():
+        data = {k: json_value(k, i, v)
+                for k, v in dice.format_period(i).iteritems()}
+        data['scc'] = None
+        yield dict(t=i, data=data)
+    out = format_result(dice)
+    if callback is not None:
+        callback(out)
+    yield dict(status='done', scc=out['data']['scc'])
+
+
+def stream_output(out):
+    """Output of simulate() as the messages of simulate_stream().
+
+    Args:
+        out (dict): Output of simulate()
+
+    Yields:
+        dict: Messages
+    """
+    yield dict(parameters=out['parameters'])
+    data = out['data']
+    for i in xrange(len(data['scc'])):
+        period = {k: v[i] for k, v in data.iteritems()}
+        period['scc'] = None
+        yield dict(t=i, data=period)
+    yield dict(status='done', scc=data['scc'])
+
+
+# State of a worker process, shared by its jobs
+_worker = {}
+
+
+def _simulate(settings, opt):
+    """simulate() with the worker's MiuStore and optimizer."""
+    return simulate(settings, opt, _worker['store'], _worker['backend'])
+
+
+def _serve(conn, store, backend):
+    """Worker process loop: call each (function, args) sent over conn,
+    until it closes.
+
+    The MiuStore at the path `store` is loaded once, here, and shared by
+    the worker's runs.
+    """
+    _worker['store'] = (
+        None if store is None else MiuStore(store, slider_ranges()))
+    _worker['backend'] = backend
+    while True:
+        try:
+            function, args = conn.recv()
+        except (EOFError, IOError):
+            break
+        try:
+            conn.send(('done', function(*args)))
+        except Exception as e:
+            conn.send(('failed', repr(e)))
+    conn.close()
+
+
+class Job(object):
+    def __init__(self, task, timeout, callback, run=None):
+        self.id = uuid.uuid4().hex
+        self.run = run
+        self.task = task
+        self.timeout = timeout
+        self.callback = callback
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.process = None
+        self.conn = None
+        self.event = threading.Event()
+
+    @property
+    def pending(self):
+        return self.status in ('queued', 'running')
+
+    def as_dict(self):
+        d = dict(job=self.id, status=self.status)
+        if self.status == 'done':
+            d.update(self.result)
+            if self.run is not None:
+                d['run'] = self.run
+        elif self.error is not None:
+            d['error'] = self.error
+        return d
+
+
+class JobPool(object):
+    """Bounded pool of worker processes for long runs and other work kept
+    off the request workers.
+
+    Up to `processes` workers are started as jobs need them, and each
+    takes one job at a time. A worker goes back to the pool when its job
+    is done, so later jobs skip the process start. A job that is cancelled
+    or overruns its timeout is stopped by terminating its worker, which
+    the next job replaces. A dispatcher thread starts queued jobs as
+    workers free up and collects results. Finished jobs are forgotten
+    after `keep` seconds, checked whenever a job is submitted or looked up
+    as well as while the dispatcher runs. Optimized runs warm-start from
+    the MiuStore at `store`, if given, and use the optimizer named by
+    `backend`. call() runs any module-level function in a worker.
+
+    Jobs live in the process that submitted them. With a `shared` cache
+    that every web worker sees, such as the memcached backend of the
+    results cache, the status of each job with a run id is also kept
+    there, and state() reads jobs of other workers from it, with their
+    results stored under their run ids. A job's callback, which stores
+    its result, runs before the job is marked done.
+    """
+    def __init__(self, processes=2, timeout=90., keep=600., interval=.05,
+                 store=None, backend='auto', shared=None):
+        self.processes = processes
+        self.store = store
+        self.backend = backend
+        self.shared = shared
+        self.timeout = timeout
+        self.keep = keep
+        self.interval = interval
+        self._jobs = {}
+        self._queue = deque()
+        self._running = []
+        self._idle = []
+        self._lock = threading.Lock()
+        self._dispatcher = None
+
+    def init_app(self, app, shared=None):
+        self.shared = shared
+        self.processes = app.config.get('JOBS_PROCESSES', self.processes)
+        self.timeout = app.config.get('JOBS_TIMEOUT', self.timeout)
+        self.keep = app.config.get('JOBS_KEEP', self.keep)
+        self.store = app.config.get('OPT_STORE_PATH', self.store)
+        self.backend = app.config.get('OPT_BACKEND', self.backend)
+
+    def submit(self, settings, opt=False, timeout=None, callback=None,
+               run=None):
+        """Queue a run.
+
+        Args:
+            settings (dict): Parameter values, as from run_settings()
+            opt (bool): Whether to optimize miu
+            timeout (float): Seconds the job may run, default self.timeout
+            callback (function): Called with the result on success
+            run (str): Id the result is stored under, sent with it
+
+        Returns:
+            Job: The queued job
+        """
+        return self.call(_simulate, settings, opt, timeout=timeout,
+                         callback=callback, run=run)
+
+    def call(self, function, *args, **kwargs):
+        """Queue a call of function(*args) in a worker.
+
+        Args:
+            function (function): Module-level function, so it can be sent
+                to the worker, as can its arguments and result
+            *args: Arguments
+
+        Kwargs:
+            timeout (float): Seconds the job may run, default self.timeout
+            callback (function): Called with the result on success
+            run (str): Id the result is stored under, sent with it
+
+        Returns:
+            Job: The queued job, with the return value as its result
+        """
+        job = Job((function, args), kwargs.get('timeout') or self.timeout,
+                  kwargs.get('callback'), kwargs.get('run'))
+        with self._lock:
+            self._purge(time.time())
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._share(job)
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch)
+                self._dispatcher.daemon = True
+                self._dispatcher.start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge(time.time())
+            return self._jobs.get(job_id)
+
+    def state(self, job_id):
+        """Job.as_dict() of a job of this process or, from the shared
+        cache, of another.
+
+        Returns:
+            dict: The job's state, or None if the id is unknown, or if the
+                job is done and its result is no longer stored
+        """
+        job = self.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        if self.shared is None:
+            return None
+        state = self._shared_get(self._key(job_id))
+        if state is None:
+            return None
+        if state['status'] == 'done':
+            result = self._shared_get(state['run'])
+            if result is None:
+                return None
+            return dict(result, job=job_id, status='done', run=state['run'])
+        d = dict(job=job_id, status=state['status'])
+        if state['error'] is not None:
+            d['error'] = state['error']
+        return d
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job leaves the queue or `timeout` seconds pass.
+
+        Returns:
+            Job: The job, or None if the id is unknown
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.event.wait(timeout)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job.
+
+        Returns:
+            Job: The job, or None if the id is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.pending:
+                return job
+            if job.status == 'queued':
+                self._queue.remove(job)
+            else:
+                self._stop(job)
+            self._finish(job, 'cancelled')
+        return job
+
+    def _stop(self, job):
+        job.process.terminate()
+        self._discard(job)
+
+    def _discard(self, job):
+        """Close the worker of a job for good.
+
+        Returns:
+            int: The worker's exit code
+        """
+        self._running.remove(job)
+        job.process.join()
+        job.conn.close()
+        code = job.process.exitcode
+        job.process = job.conn = None
+        return code
+
+    def _release(self, job):
+        """Return the worker of a finished job to the pool."""
+        self._running.remove(job)
+        self._idle.append((job.process, job.conn))
+        job.process = job.conn = None
+
+    @staticmethod
+    def _key(job_id):
+        return 'job:' + job_id
+
+    def _shared_get(self, key):
+        try:
+            return self.shared.get(key)
+        except Exception:
+            return None
+
+    def _share(self, job):
+        """Put the status of a job with a run id in the shared cache.
+        Cache errors are ignored, as by the results cache."""
+        if self.shared is not None and job.run is not None:
+            try:
+                self.shared.set(self._key(job.id), dict(
+                    job=job.id, status=job.status, error=job.error,
+                    run=job.run))
+            except Exception:
+                pass
+
+    def _purge(self, now):
+        for job_id, job in self._jobs.items():
+            if not job.pending and now - job.finished > self.keep:
+                del self._jobs[job_id]
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished = time.time()
+        job.task = None
+        self._share(job)
+        job.event.set()
+
+    def _spawn(self):
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_serve, args=(child, self.store, self.backend))
+        process.daemon = True
+        process.start()
+        child.close()
+        return process, parent
+
+    def _worker(self):
+        """An idle worker that is still alive, or a new one."""
+        while self._idle:
+            process, conn = self._idle.pop()
+            if process.is_alive():
+                return process, conn
+            process.join()
+            conn.close()
+        return self._spawn()
+
+    def _start(self, job):
+        job.process, job.conn = self._worker()
+        job.conn.send(job.task)
+        job.started = time.time()
+        job.status = 'running'
+        self._running.append(job)
+        self._share(job)
+
+    def _collect(self, job, now):
+        try:
+            ready = job.conn.poll()
+            message = job.conn.recv() if ready else None
+        except (EOFError, IOError):
+            self._finish(job, 'failed', error='Worker exited with code {}'
+                         .format(self._discard(job)))
+            return
+        if message is not None:
+            self._release(job)
+            status, payload = message
+            if status == 'done':
+                # Store the result before anyone waiting is told it's done
+                if job.callback is not None:
+                    job.callback(payload)
+                self._finish(job, 'done', result=payload)
+            else:
+                self._finish(job, 'failed', error=payload)
+        elif now - job.started > job.timeout:
+            self._stop(job)
+            self._finish(job, 'timeout', error='Run exceeded {:g} s'.format(
+                job.timeout))
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                now = time.time()
+                for job in list(self._running):
+                    self._collect(job, now)
+                while self._queue and len(self._running) < self.processes:
+                    self._start(self._queue.popleft())
+                self._purge(now)
+                idle = not self._queue and not self._running
+                if idle:
+                    self._dispatcher = None
+            if idle:
+                return
+            time.sleep(self.interval)
+
+
+jobs = JobPool()
@@ -0,0 +1,49 @@
+from __future__ import division
+import glob
+import os
+import re
+from webdice_web.constants import BASE_DIR
+
+# Form fields given in percent
+TREATY_PERCENT = ['e2050', 'e2100', 'e2150', 'p2050', 'p2100', 'p2150']
+ADVANCED_PERCENT = ['depreciation', 'savings', 'prstp', 'backstop_decline',
+                    'productivity_decline', 'intensity_decline_rate',
+                    'prod_frac', ]
+
+ADVANCED_ROOT = os.path.join(
+    BASE_DIR, 'templates', 'modules', 'parameters', 'advanced')
+
+INPUT = re.compile(r'<input\b([^>]*)>')
+ATTRIBUTE = re.compile(r'([\w-]+)=("[^"]*"|\'[^\']*\'|[^\s>]+)')
+
+
+def slider_ranges(root=None):
+    """Range of each slider in the advanced parameter form.
+
+    These are the parameters of the model itself. The policy sliders, for
+    the treaty and the carbon tax, are on a form of their own and are
+    left out. Percent fields are converted to fractions, as the views do
+    with the submitted values.
+
+    Args:
+        root (str): Directory of the form templates, default the
+            advanced parameter templates
+
+    Returns:
+        dict: Parameter name to (min, max), in model units
+    """
+    ranges = {}
+    for path in sorted(glob.glob(os.path.join(root or ADVANCED_ROOT,
+                                              '*.html'))):
+        with open(path) as f:
+            text = f.read()
+        for tag in INPUT.finditer(text):
+            attrs = dict((k, v.strip('\'"'))
+                         for k, v in ATTRIBUTE.findall(tag.group(1)))
+            if attrs.get('type') != 'range':
+                continue
+            low, high = float(attrs['min']), float(attrs['max'])
+            if attrs['name'] in ADVANCED_PERCENT:
+                low, high = low / 100, high / 100
+            ranges[attrs['name']] = (low, high)
+    return ranges
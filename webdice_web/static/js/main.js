@@ -46,6 +46,9 @@
     adjusted_params = [],
     custom_vars = ['damages', 'backstop'],
     show_twin = false,
+    // Or application/x-webdice-float32, at half the size, or
+    // application/json
+    run_encoding = 'application/x-webdice-float64',
 
     height;
 
@@ -392,9 +395,10 @@
     }
   };
 
-  var add_run = function(_data, parameters) {
+  var add_run = function(_data, parameters, run_id) {
     /*
-     Add run to interface.
+     Add run to interface. run_id is the id the server keeps its results
+     under, for CSV export.
      */
 
     var dims = get_dims();
@@ -435,6 +439,7 @@
     add_run_to_list(total_runs);
 
     Options.runs[total_runs] = {
+      id: run_id,
       parameters: parameters,
       data: _data,
       name: 'Run #' + total_runs
@@ -510,16 +515,127 @@
       }
     });
 
-    d3.xhr(form.attr('action'))
-      .mimeType('application/json')
-      .responseType('text')
+    if (form.attr('data-stream')) {
+      stream_run(form.attr('data-stream'), run_params);
+      return;
+    }
+
+    run_xhr(form.attr('action'))
+      .header('Content-Type', 'application/json')
       .post(JSON.stringify(run_params))
       .on('load', load_run)
-      .on('error', function(e) {})
+      .on('error', finish_run)
       .on('progress', function(r) {});
 
   };
 
+  var stream_run = function(url, run_params) {
+    /*
+     Read a streamed run line by line. The run is drawn as soon as the
+     graphed periods have arrived, and SCC is filled in when it is done.
+     */
+
+    var xhr = new XMLHttpRequest(),
+      read = 0,
+      run = {data: {}, parameters: {}},
+      run_index = null,
+      done = false;
+
+    var draw = function() {
+      run_index = total_runs;
+      add_run(run.data, run.parameters);
+    };
+
+    var message = function(m) {
+      if (m.job !== undefined) {
+        done = true;
+        load_run({response: JSON.stringify(m)});
+      } else if (m.parameters !== undefined) {
+        run.parameters = m.parameters;
+      } else if (m.t !== undefined) {
+        for (var dice_variable in m.data) {
+          if (m.data.hasOwnProperty(dice_variable)) {
+            run.data[dice_variable] = run.data[dice_variable] || [];
+            run.data[dice_variable].push(m.data[dice_variable]);
+          }
+        }
+        if (m.t == graph_periods - 1) {
+          draw();
+        }
+      } else if (m.status == 'done') {
+        done = true;
+        run.data.scc = m.scc;
+        if (run_index === null) {
+          draw();
+        } else {
+          update_run_variable(run_index, 'scc', m.scc);
+        }
+        Options.runs[run_index].id = m.run;
+        finish_run();
+        if (unphysical(run)) {
+          show_warning();
+        }
+      }
+    };
+
+    var read_lines = function() {
+      var text = xhr.responseText,
+        end = text.lastIndexOf('\n') + 1;
+      if (end > read) {
+        text.slice(read, end).split('\n').forEach(function(line) {
+          if (line) {
+            message(JSON.parse(line));
+          }
+        });
+        read = end;
+      }
+    };
+
+    xhr.open('POST', url, true);
+    xhr.setRequestHeader('Content-Type', 'application/json');
+    xhr.onprogress = read_lines;
+    xhr.onload = function() {
+      if (xhr.status == 200) {
+        read_lines();
+      }
+      if (!done) {
+        finish_run();
+      }
+    };
+    xhr.onerror = finish_run;
+    xhr.send(JSON.stringify(run_params));
+
+  };
+
+  var update_run_variable = function(run_index, dice_variable, values) {
+    /*
+     Replace the values of one variable of a run that is already drawn
+     */
+
+    var update = function(runs, custom) {
+      runs.forEach(function(r) {
+        if (r.run_index != run_index) {
+          return;
+        }
+        r.data.forEach(function(d, i) {
+          if (r.var == dice_variable) {
+            d.y = values[i];
+          }
+          if (custom && x_custom_domain_var == dice_variable) {
+            d.x = values[i];
+          }
+        });
+      });
+    };
+
+    update(all_data[dice_variable] || [], false);
+    update(custom_data[0], true);
+    update(custom_data[1], true);
+    update_graph(dice_variable);
+    update_custom_graphs();
+
+  };
+
   var unphysical = function(r) {
     var uphys = false;
     r.data['consumption_pc'].forEach(function(d) {
@@ -528,20 +644,90 @@
     return uphys;
   };
 
+  var finish_run = function() {
+    run_model.attr('disabled', null);
+    loader_gif.style('display', 'none');
+  };
+
+  var poll_job = function(job_id) {
+    /*
+     Poll a queued (optimized) run every second until it finishes
+     */
+
+    setTimeout(function() {
+      run_xhr('/run/job/' + job_id)
+        .get()
+        .on('load', load_run)
+        .on('error', finish_run);
+    }, 1000);
+  };
+
+  var run_xhr = function(url) {
+    /*
+     Request for a run, in run_encoding
+     */
+
+    return d3.xhr(url)
+      .header('Accept', run_encoding)
+      .responseType(run_encoding == 'application/json' ? 'text' : 'arraybuffer');
+  };
+
+  var decode_run = function(buffer) {
+    /*
+     Decode a binary run response (see webdice_web/encoding.py) into the
+     object its JSON form would give. Typed arrays read the values in
+     platform byte order, which is little-endian in every browser we run.
+     */
+
+    var length = new DataView(buffer).getUint32(0, true),
+      header = JSON.parse(String.fromCharCode.apply(
+        null, new Uint8Array(buffer, 4, length))),
+      n = header.periods,
+      count = header.variables.length * n,
+      values = header.dtype == 'float32'
+        ? new Float32Array(buffer, 4 + length, count)
+        : new Float64Array(buffer, 4 + length, count);
+
+    header.data = {};
+    header.variables.forEach(function(dice_variable, k) {
+      var column = [];
+      for (var i = 0; i < n; ++i) {
+        var value = values[k * n + i];
+        column.push(isNaN(value) ? null : value);
+      }
+      header.data[dice_variable] = column;
+    });
+    delete header.dtype;
+    delete header.variables;
+    delete header.periods;
+    return header;
+
+  };
+
   var load_run = function(r) {
     /*
      Upon successful run of model, add run and hide parameters pane
      */
 
-    r = JSON.parse(r.response);
+    r = typeof r.response == 'string'
+      ? JSON.parse(r.response)
+      : decode_run(r.response);
+
+    if (r.job !== undefined && r.status != 'done') {
+      if (r.status == 'queued' || r.status == 'running') {
+        poll_job(r.job);
+      } else {
+        finish_run();
+      }
+      return;
+    }
 
-    add_run(r.data, r.parameters);
+    add_run(r.data, r.parameters, r.run);
 
 //    d3.select('#parameters_tab').classed('selected', false);
 //    parameters_wrap.classed('visuallyhidden', true);
 
-    run_model.attr('disabled', null);
-    loader_gif.style('display', 'none');
+    finish_run();
 
     if (unphysical(r)) {
       show_warning();
@@ -4,20 +4,67 @@
   var download_csv = d3.select('#download_csv')
   ;
 
+  var encode = function(fields) {
+    var body = [];
+    for (var name in fields) {
+      if (fields.hasOwnProperty(name)) {
+        body.push(name + '=' +
+                  encodeURIComponent(JSON.stringify(fields[name])));
+      }
+    }
+    return body.join('&');
+  };
+
+  var save = function(text) {
+    var link = document.createElement('a');
+    link.href = URL.createObjectURL(new Blob([text], {type: 'text/csv'}));
+    link.download = 'WebDICE-CSV.csv';
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+    /* Some browsers start the download after click() returns */
+    setTimeout(function() {
+      URL.revokeObjectURL(link.href);
+    }, 1000);
+  };
+
+  var request = function(runs, data, retry) {
+    /* Post run ids, and the server writes their stored results. Only
+       runs without an id go with their data. Runs the server no longer
+       has come back in a 404, and are sent again with theirs. */
+    d3.xhr(download_csv.attr('action'))
+      .header('Content-Type', 'application/x-www-form-urlencoded')
+      .on('load', function(xhr) {
+        save(xhr.responseText);
+      })
+      .on('error', function(xhr) {
+        if (xhr.status != 404 || !retry) {
+          return;
+        }
+        JSON.parse(xhr.responseText).runs.forEach(function(key) {
+          data[key] = Options.runs[key];
+        });
+        request(runs, data, false);
+      })
+      .post(encode({runs: runs, data: data}));
+  };
+
   download_csv.select('input[type="button"]').on('click', function() {
 
     d3.event.preventDefault();
 
-    download_csv.selectAll('input[type="hidden"]').remove();
-
-    download_csv.append('input')
-      .attr({
-        type: 'hidden',
-        name: 'data',
-        value: JSON.stringify(Options.runs)
-      });
-      download_csv.node().submit();
+    var runs = [], data = {};
+    for (var index in Options.runs) {
+      if (Options.runs.hasOwnProperty(index)) {
+        runs.push({id: Options.runs[index].id, key: index,
+                   name: Options.runs[index].name});
+        if (!Options.runs[index].id) {
+          data[index] = Options.runs[index];
+        }
+      }
+    }
+    request(runs, data, true);
 
   });
 
-})();
\ No newline at end of file
+})();
@@ -1,14 +1,18 @@
 from __future__ import division
 import json
-import zipfile
 import csv
-import StringIO
-import os
-from numpy import inf
-from lxml import etree
-from flask import render_template, request, Blueprint, jsonify, send_file
-from webdice.dice import Dice2010
-from webdice_web.constants import BASE_DIR
+import numpy as np
+from flask import (render_template, request, Blueprint, jsonify, Response,
+                   stream_with_context, abort, current_app)
+from webdice.dice import Dice2010, uncertainty
+from webdice_web.cache import results, fingerprint, quantize
+from webdice_web.encoding import JSON, encode, negotiate
+from webdice_web.glossary import glossary_index
+from webdice_web.export import svg_files, zip_stream
+from webdice_web.jobs import (jobs, run_settings, simulate, sweep,
+                              percentile_bands, simulate_stream,
+                              stream_output)
+from webdice_web.parameters import TREATY_PERCENT, ADVANCED_PERCENT
 
 
 mod = Blueprint('webdice', __name__, static_folder='static',
@@ -23,14 +27,15 @@ def validate_number(n):
     else: return n
 
 
-def run_loop(form):
+def configure_run(form):
+    """Dice object set up from the parameter form.
 
+    Returns:
+        tuple: Dice object, and whether the run is optimized
+    """
     dice = Dice2010()
 
-    for field in ['e2050', 'e2100', 'e2150']:
-        form[field] = float(form[field]) / 100
-
-    for field in ['p2050', 'p2100', 'p2150']:
+    for field in TREATY_PERCENT:
         form[field] = float(form[field]) / 100
 
     for p in dice.user_params:
@@ -60,14 +65,65 @@ def run_loop(form):
         opt = True
     elif policy == 'carbon_tax':
         dice.params.carbon_tax = True
-    dice.loop(opt=opt)
-    out = dice.format_output()
-    out['data'] = {
-        k: [l if l > -inf else -999 for l in v] for k, v in out['data'].iteritems()
-    }
-    out['data']['discount_rate'][0] = None
-    out['data']['discount_forward'][0] = None
-    return jsonify(**out)
+    return dice, opt
+
+
+def respond(out, status=200):
+    """Run output as JSON, or in the binary format of encode() when the
+    request's Accept header asks for it."""
+    mimetype = negotiate(request.accept_mimetypes)
+    if mimetype == JSON:
+        response = jsonify(**out)
+    else:
+        response = Response(encode(out, mimetype), mimetype=mimetype)
+    response.status_code = status
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+def run_loop(form):
+    dice, opt = configure_run(form)
+    key = fingerprint(dice, opt)
+    out = results.get(key)
+    if out is not None:
+        return respond(dict(out, run=key))
+    settings = run_settings(dice)
+    if opt:
+        job = jobs.submit(
+            settings, opt, callback=lambda out: results.set(key, out),
+            run=key)
+        return respond(job.as_dict(), 202)
+    out = simulate(settings)
+    results.set(key, out)
+    return respond(dict(out, run=key))
+
+
+def stream_loop(form):
+    """Run the loop, sending each period's values as soon as they are set.
+
+    The response is newline-delimited JSON, one message of
+    simulate_stream() per line, the last with the run id. Cached runs are
+    replayed in the same form. Optimized runs still go to the job pool,
+    and their one line is the queued job, as from run_loop().
+    """
+    dice, opt = configure_run(form)
+    key = fingerprint(dice, opt)
+    out = results.get(key)
+    if out is not None:
+        messages = stream_output(out)
+    elif opt:
+        job = jobs.submit(
+            run_settings(dice), opt,
+            callback=lambda out: results.set(key, out), run=key)
+        messages = iter([job.as_dict()])
+    else:
+        messages = simulate_stream(
+            run_settings(dice), callback=lambda out: results.set(key, out))
+    lines = ('{}\n'.format(json.dumps(
+        dict(m, run=key) if m.get('status') == 'done' else m))
+        for m in messages)
+    return Response(stream_with_context(lines),
+                    mimetype='application/x-ndjson')
 
 
 @mod.route('/')
@@ -105,12 +161,10 @@ def glossary_term(term):
 
 @mod.route('/glossary/advanced/<term>')
 def glossary_advanced_term(term):
-    """Returns index page."""
-    s = ''
-    f = os.path.join(BASE_DIR, 'templates', 'modules', 'glossary', 'terms',
-                     'advanced', '{}.html'.format(term))
-    with open(f) as f:
-        s = f.read()
+    """Returns an advanced term's body."""
+    s = glossary_index.advanced_body(term)
+    if s is None:
+        abort(404)
     return s
 
 
@@ -156,6 +210,17 @@ def graphs_standard():
     return run_loop(form)
 
 
+def advanced_form(form):
+    """Percentages in the advanced form as fractions."""
+    for field in ADVANCED_PERCENT:
+        try:
+            if form[field]:
+                form[field] = float(form[field]) / 100
+        except KeyError:
+            pass
+    return form
+
+
 @mod.route('/run/advanced', methods=['POST', 'GET'])
 def graphs_advanced():
     """
@@ -164,64 +229,288 @@ def graphs_advanced():
     Args:
         None
     Returns:
-        Formatted step values
+        Formatted step values, as JSON or, with an Accept header of
+        application/x-webdice-float32 or -float64, in binary
+    """
+    return run_loop(advanced_form(json.loads(request.data)))
+
+
+@mod.route('/run/advanced/stream', methods=['POST', ])
+def graphs_advanced_stream():
+    """
+    Get data from <form>, run DICE loop, streaming the results.
+    ...
+    Args:
+        None
+    Returns:
+        Newline-delimited JSON: the parameters, the values of each period
+        as it is computed, then SCC. See simulate_stream().
+    """
+    return stream_loop(advanced_form(json.loads(request.data)))
+
+
+def sweep_axes(fields, dice, limit):
+    """(name, values) pairs from the sweep field, in model units.
+
+    Sizes are checked before any values are built.
+
+    Args:
+        fields (list): The sweep field of the request
+        dice (Dice): Dice object, for its user parameters
+        limit (int): Most grid points
+
+    Raises:
+        ValueError: For anything but one or two numeric user parameters,
+            or more than limit grid points
+    """
+    if not isinstance(fields, list) or not 1 <= len(fields) <= 2:
+        raise ValueError('Sweep one or two parameters.')
+    sizes = []
+    for axis in fields:
+        name = axis.get('name')
+        if name not in dice.user_params:
+            raise ValueError('Unknown parameter {}.'.format(name))
+        size = (len(axis['values']) if 'values' in axis
+                else float(axis['num']))
+        if not 1 <= size <= limit:
+            raise ValueError('Sweep {} over 1 to {} values.'.format(
+                name, limit))
+        if size != int(size):
+            raise ValueError('num must be a whole number.')
+        sizes.append(int(size))
+    points = np.prod(sizes)
+    if points > limit:
+        raise ValueError('{} grid points, at most {}.'.format(points, limit))
+    axes = []
+    for axis in fields:
+        name = axis['name']
+        if 'values' in axis:
+            values = [float(v) for v in axis['values']]
+        else:
+            values = np.linspace(float(axis['start']), float(axis['stop']),
+                                 int(axis['num'])).tolist()
+        if name in ADVANCED_PERCENT or name in TREATY_PERCENT:
+            values = [v / 100 for v in values]
+        axes.append((name, [quantize(v) for v in values]))
+    return axes
+
+
+@mod.route('/run/sweep', methods=['POST', ])
+def run_sweep():
+    """
+    Run a grid of parameter values as one batched simulation.
+    ...
+    Args:
+        None
+    Returns:
+        The axes, and for each variable its values indexed [t][i][j] by
+        period and grid point. The body is the advanced form, giving the
+        other parameters, plus:
+            sweep: one or two {"name": ..., "values": [...]} or
+                {"name": ..., "start": ..., "stop": ..., "num": ...}, in
+                the form's units
+            variables: model variables to return, default all
+            scc: whether to calculate SCC, default false
+        400 for a bad sweep, more than SWEEP_MAX_POINTS grid points, or
+        the optimized policy, which can't be batched.
     """
     form = json.loads(request.data)
-    for field in ['depreciation', 'savings', 'prstp', 'backstop_decline',
-                  'productivity_decline', 'intensity_decline_rate',
-                  'prod_frac', ]:
-        try:
-            if form[field]:
-                form[field] = float(form[field]) / 100
-        except KeyError:
-            pass
+    fields = form.pop('sweep', None)
+    variables = form.pop('variables', None)
+    scc = bool(form.pop('scc', False))
+    try:
+        dice, opt = configure_run(advanced_form(form))
+        if opt:
+            raise ValueError('Optimized runs cannot be swept.')
+        axes = sweep_axes(fields, dice, current_app.config.get(
+            'SWEEP_MAX_POINTS', 2500))
+        if variables is not None and (
+                not isinstance(variables, list) or
+                not set(variables) <= set(dice.model_vars)):
+            raise ValueError('Unknown variables.')
+        out = sweep(run_settings(dice), axes, variables, scc)
+    except KeyError as e:
+        return jsonify(error='Missing field {}.'.format(e.args[0])), 400
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(**out)
+
+
+@mod.route('/run/montecarlo', methods=['POST', ])
+def run_monte_carlo():
+    """
+    Draw parameters from distributions and run every draw at once.
+    ...
+    Args:
+        None
+    Returns:
+        The seed, the number of draws, the percentiles, and for each
+        variable its percentiles indexed [t][k] by period and percentile.
+        The body is the advanced form, giving the other parameters, plus:
+            distributions: parameter name to a distribution and its
+                arguments, e.g. {"temp_co2_doubling": ["lognormal", 1.1,
+                0.3]}, for values in the form's units; see
+                webdice.dice.uncertainty
+            n: number of draws, default 1000
+            seed: random seed, default a new one, returned either way
+            variables: model variables to return, default all
+            percentiles: default [5, 25, 50, 75, 95]
+            scc: whether to calculate SCC, default false
+        400 for bad distributions or values, more than MC_MAX_DRAWS
+        draws, or the optimized policy.
+    """
+    form = json.loads(request.data)
+    distributions = form.pop('distributions', None)
+    n = form.pop('n', 1000)
+    seed = form.pop('seed', None)
+    variables = form.pop('variables', None)
+    percentiles = form.pop('percentiles', [5, 25, 50, 75, 95])
+    scc = bool(form.pop('scc', False))
+    try:
+        dice, opt = configure_run(advanced_form(form))
+        if opt:
+            raise ValueError('Optimized runs cannot be batched.')
+        if not isinstance(distributions, dict) or not distributions:
+            raise ValueError('No distributions.')
+        for name in distributions:
+            if name not in dice.user_params:
+                raise ValueError('Unknown parameter {}.'.format(name))
+        n = int(n)
+        limit = current_app.config.get('MC_MAX_DRAWS', 10000)
+        if not 1 <= n <= limit:
+            raise ValueError('{} draws, at most {}.'.format(n, limit))
+        percentiles = [float(q) for q in percentiles]
+        if not all(0 <= q <= 100 for q in percentiles):
+            raise ValueError('Percentiles need to be between 0 and 100.')
+        if variables is not None and (
+                not isinstance(variables, list) or
+                not set(variables) <= set(dice.model_vars)):
+            raise ValueError('Unknown variables.')
+        seed = uncertainty.new_seed() if seed is None else int(seed)
+        draws = uncertainty.draw(distributions, n, seed)
+        for name in draws:
+            if name in ADVANCED_PERCENT or name in TREATY_PERCENT:
+                draws[name] = draws[name] / 100
+        out = percentile_bands(run_settings(dice), draws, variables,
+                               percentiles, scc)
+    except KeyError as e:
+        return jsonify(error='Missing field {}.'.format(e.args[0])), 400
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(seed=seed, n=n, **out)
+
+
+@mod.route('/run/job/<job_id>', methods=['GET', 'DELETE'])
+def run_job(job_id):
+    """
+    Poll, long-poll or cancel a queued run.
+    ...
+    Args:
+        job_id (str): Id returned when the run was submitted
+    Returns:
+        Job status, plus the formatted step values once it is done. Jobs
+        submitted to another web worker are read from memcached, and can
+        only be cancelled by that worker. With ?wait=<seconds>,
+        holds the request, and so a request worker, until the job
+        finishes or the wait (at most 5 s) runs out; clients should poll
+        without it.
+    """
+    if request.method == 'DELETE':
+        jobs.cancel(job_id)
+    else:
+        wait = min(request.args.get('wait', 0, type=float), 5.)
+        if wait > 0:
+            jobs.wait(job_id, wait)
+    state = jobs.state(job_id)
+    if state is None:
+        return jsonify(job=job_id, status='unknown'), 404
+    return respond(state)
 
-    return run_loop(form)
+
+@mod.route('/run/cache')
+def cache_stats():
+    """Hit/miss counters for the results cache."""
+    return jsonify(**results.stats())
 
 
 @mod.route('/get_svg', methods=['POST', ])
 def get_svg():
-    def combine_custom(c, t):
-        ns = 'http://www.w3.org/2000/svg'
-        c = etree.fromstring(c)
-        t = etree.fromstring(t)
-        cg = c.xpath('/n:svg/n:g', namespaces={'n': ns})
-        tg = t.xpath('/n:svg/n:g', namespaces={'n': ns})
-        tgg = tg[1].xpath('./n:g', namespaces={'n': ns})
-        c.append(tg[0])
-        for t in tgg:
-            cg[1].append(t)
-        return etree.tostring(c)
-    form = request.form
-    buffer = StringIO.StringIO()
-    zipped = zipfile.ZipFile(buffer, 'w')
-    for k in form.keys():
-        s = StringIO.StringIO()
-        if k == 'custom_graph':
-            s.write(combine_custom(str(form['custom_graph']),
-                                   str(form['twin_graph'])))
-        else:
-            s.write(str(form[k]))
-        zipped.writestr('{}.svg'.format(k), s.getvalue())
-    zipped.close()
-    buffer.seek(0)
-    return send_file(buffer,
-                     attachment_filename='{}.zip'.format('WebDICE-SVGs'),
-                     as_attachment=True)
+    """
+    Download graphs as a zip of SVGs.
+    ...
+    Args:
+        None
+    Returns:
+        Deflated zip, written as it is sent. 400 if custom_graph is
+        posted without twin_graph.
+    """
+    if 'custom_graph' in request.form and 'twin_graph' not in request.form:
+        return jsonify(error='Missing field twin_graph.'), 400
+    return Response(
+        stream_with_context(zip_stream(svg_files(request.form))),
+        mimetype='application/zip',
+        headers={'Content-Disposition':
+                 'attachment; filename=WebDICE-SVGs.zip'})
+
+
+class Echo(object):
+    """File-like object whose write() returns what it is given, so a
+    csv.writer hands back each row instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def csv_rows(runs):
+    """CSV of runs, one line at a time.
+
+    Args:
+        runs (iterable): (name, output) pairs, output as from simulate()
+
+    Yields:
+        str: Lines of CSV
+    """
+    writer = csv.writer(Echo())
+    for name, out in runs:
+        yield writer.writerow([name])
+        yield writer.writerow(out['parameters'].keys())
+        yield writer.writerow(out['parameters'].values())
+        for var, values in out['data'].iteritems():
+            yield writer.writerow([var] + values)
 
 
 @mod.route('/get_csv', methods=['POST',])
 def get_csv():
-    buffer = StringIO.StringIO()
-    data = json.loads(request.form['data'])
-    writer = csv.writer(buffer)
-    for run in data.keys():
-        writer.writerow([data[run]['name']])
-        writer.writerow(data[run]['parameters'].keys())
-        writer.writerow(data[run]['parameters'].values())
-        for var in data[run]['data'].keys():
-            writer.writerow([var] + data[run]['data'][var])
-    buffer.seek(0)
-    return send_file(buffer,
-                     attachment_filename='{}.csv'.format('WebDICE-CSV'),
-                     as_attachment=True)
\ No newline at end of file
+    """
+    Download runs as CSV.
+    ...
+    Args:
+        None
+    Returns:
+        CSV, written as it is sent. The form's runs field is a JSON list
+        of {"id": ..., "key": ..., "name": ...}, with the run ids the run
+        responses gave, and the outputs are read from the results cache,
+        without counting in its /run hit and miss statistics.
+        The data field holds full outputs by key, only for the runs that
+        have no id or are no longer cached; it can be sent on its own.
+        If a run is in neither, 404 with the keys of those runs in
+        "runs", so the client can send their data.
+    """
+    data = json.loads(request.form.get('data', '{}'))
+    if 'runs' in request.form:
+        runs = json.loads(request.form['runs'])
+        outputs = [
+            (results.lookup(str(run['id'])) if run.get('id') else None) or
+            data.get(str(run.get('key')))
+            for run in runs
+        ]
+        missing = [run.get('key') for run, out in zip(runs, outputs)
+                   if out is None]
+        if missing:
+            return jsonify(error='Runs no longer stored', runs=missing), 404
+        runs = [(run['name'], out) for run, out in zip(runs, outputs)]
+    else:
+        runs = [(data[run]['name'], data[run]) for run in data.keys()]
+    return Response(
+        stream_with_context(csv_rows(runs)), mimetype='text/csv',
+        headers={'Content-Disposition':
+                 'attachment; filename=WebDICE-CSV.csv'})